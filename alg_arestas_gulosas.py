@@ -0,0 +1,254 @@
+import time
+import numpy as np
+from instrumentacao import instrumentacao_padrao
+from distancias import OraculoDistancias, custo_rota, k_vizinhos_mais_proximos, matriz_distancias_numpy
+
+def _custos_fonte(matriz_distancias, cidades):
+    # Listas de listas viram np.ndarray; sem matriz, NumPy ou oráculo conforme o tamanho
+    if matriz_distancias is None:
+        from alg_ils import LIMITE_MATRIZ
+        if len(cidades) <= LIMITE_MATRIZ:
+            return matriz_distancias_numpy(cidades)
+        return OraculoDistancias(cidades)
+    if isinstance(matriz_distancias, OraculoDistancias):
+        return matriz_distancias
+    return np.asarray(matriz_distancias)
+
+def _distancias_para(matriz, origem, destinos):
+    if isinstance(matriz, OraculoDistancias):
+        return matriz.distancias_pares(np.full(len(destinos), origem), destinos).astype(np.float64)
+    return matriz[origem, destinos].astype(np.float64)
+
+def arestas_candidatas(matriz, k):
+    """
+    Arestas ligando cada cidade aos seus k vizinhos mais próximos, sem
+    repetição. Restringir a ordenação a essas O(nk) arestas, em vez das
+    O(n^2) da matriz, é o que deixa as construções em O(n log n).
+
+    Args:
+        matriz (np.ndarray ou OraculoDistancias): Custos simétricos
+        k (int): Vizinhos por cidade
+
+    Returns:
+        tuple: Arrays (origens, destinos, custos) com origens < destinos
+    """
+    n = len(matriz)
+    k = min(k, n - 1)
+    if isinstance(matriz, OraculoDistancias):
+        vizinhos = matriz.vizinhos_mais_proximos(k)[0]
+    else:
+        custos = matriz.astype(np.float64)
+        np.fill_diagonal(custos, np.inf)
+        vizinhos = np.argpartition(custos, k - 1, axis=1)[:, :k]
+    origens = np.repeat(np.arange(n), k)
+    destinos = vizinhos.ravel()
+    chaves = np.unique(np.minimum(origens, destinos) * n + np.maximum(origens, destinos))
+    origens, destinos = np.divmod(chaves, n)
+    if isinstance(matriz, OraculoDistancias):
+        custos = matriz.distancias_pares(origens, destinos)
+    else:
+        custos = matriz[origens, destinos]
+    return origens, destinos, custos.astype(np.float64)
+
+class _Ligacoes:
+    """
+    Caminhos disjuntos montados aresta a aresta: uma aresta é aceita quando
+    nenhuma das pontas já tem grau 2 e ela não fecha ciclo, o que é testado
+    com union-find (compressão de caminho e união por tamanho).
+    """
+    def __init__(self, n, ignorar=None):
+        self.pai = list(range(n))
+        self.tamanho = [1] * n
+        self.grau = [0] * n
+        self.vizinhos = [[] for _ in range(n)]
+        self.ignorar = ignorar
+        if ignorar is not None:
+            self.grau[ignorar] = 2
+        self.componentes = n - (ignorar is not None)
+
+    def _raiz(self, v):
+        pai = self.pai
+        while pai[v] != v:
+            pai[v] = pai[pai[v]]
+            v = pai[v]
+        return v
+
+    def ligar(self, origens, destinos):
+        """
+        Tenta as arestas (origens[t], destinos[t]) na ordem dada.
+
+        Returns:
+            int: Número de arestas aceitas
+        """
+        grau = self.grau
+        aceitas = 0
+        for a, b in zip(origens.tolist(), destinos.tolist()):
+            if grau[a] == 2 or grau[b] == 2:
+                continue
+            raiz_a = self._raiz(a)
+            raiz_b = self._raiz(b)
+            if raiz_a == raiz_b:
+                continue
+            if self.tamanho[raiz_a] < self.tamanho[raiz_b]:
+                raiz_a, raiz_b = raiz_b, raiz_a
+            self.pai[raiz_b] = raiz_a
+            self.tamanho[raiz_a] += self.tamanho[raiz_b]
+            grau[a] += 1
+            grau[b] += 1
+            self.vizinhos[a].append(b)
+            self.vizinhos[b].append(a)
+            aceitas += 1
+            self.componentes -= 1
+            if self.componentes == 1:
+                break
+        return aceitas
+
+    def pontas(self):
+        return np.flatnonzero(np.array(self.grau) < 2)
+
+    def caminho(self):
+        # Com um único componente, o caminho que liga as duas pontas
+        inicio = int(self.pontas()[0])
+        caminho = [inicio]
+        anterior, atual = -1, inicio
+        while True:
+            proximos = [v for v in self.vizinhos[atual] if v != anterior]
+            if not proximos:
+                return caminho
+            anterior, atual = atual, proximos[0]
+            caminho.append(atual)
+
+def _ordem_chaves(origens, destinos, custos, ao_centro):
+    # Arestas gulosas: da mais curta; economias: da maior economia
+    if ao_centro is None:
+        return np.argsort(custos, kind='stable')
+    return np.argsort(custos - ao_centro[origens] - ao_centro[destinos], kind='stable')
+
+def arestas_entre(pontos, matriz, k, limite_completo=2000):
+    """
+    Arestas candidatas dentro de um subconjunto de cidades: os k vizinhos
+    mais próximos de cada uma dentro do subconjunto, ou todos os pares
+    quando ele tem até limite_completo cidades. Com oráculo a grade de
+    k_vizinhos_mais_proximos evita o custo quadrático; nos outros casos as
+    distâncias saem em blocos, com memória O(len(pontos) * k).
+
+    Returns:
+        tuple: Arrays (origens, destinos, custos)
+    """
+    total = len(pontos)
+    vizinhos = total - 1 if total <= limite_completo else min(k, total - 1)
+    if isinstance(matriz, OraculoDistancias) and vizinhos < total - 1:
+        indices, _ = k_vizinhos_mais_proximos(matriz.coordenadas[pontos], vizinhos)
+        origens = np.repeat(pontos, vizinhos)
+        destinos = pontos[indices].ravel()
+        return origens, destinos, matriz.distancias_pares(origens, destinos).astype(np.float64)
+
+    linhas_bloco = max(1, 4_000_000 // total)
+    origens, destinos, custos = [], [], []
+    for inicio in range(0, total, linhas_bloco):
+        linhas = pontos[inicio:inicio + linhas_bloco]
+        if isinstance(matriz, OraculoDistancias):
+            bloco = matriz.distancias_bloco(linhas, pontos).astype(np.float64)
+        else:
+            bloco = matriz[np.ix_(linhas, pontos)].astype(np.float64)
+        bloco[np.arange(len(linhas)), np.arange(inicio, inicio + len(linhas))] = np.inf
+        escolhidos = np.argpartition(bloco, vizinhos - 1, axis=1)[:, :vizinhos]
+        origens.append(np.repeat(linhas, vizinhos))
+        destinos.append(pontos[escolhidos].ravel())
+        custos.append(np.take_along_axis(bloco, escolhidos, axis=1).ravel())
+    return np.concatenate(origens), np.concatenate(destinos), np.concatenate(custos)
+
+def _juntar_pontas(ligacoes, matriz, k, ao_centro=None):
+    # Une os caminhos que sobraram repetindo a regra gulosa só entre as pontas deles
+    while ligacoes.componentes > 1:
+        origens, destinos, custos = arestas_entre(ligacoes.pontas(), matriz, k)
+        ordem = _ordem_chaves(origens, destinos, custos, ao_centro)
+        if ligacoes.ligar(origens[ordem], destinos[ordem]) == 0:
+            # Todas as candidatas ligavam pontas do mesmo caminho
+            k *= 2
+
+def _construir(cidades, matriz_distancias, k, centro, metodo, instrumentacao):
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    inicio = time.perf_counter()
+    matriz = _custos_fonte(matriz_distancias, cidades)
+    n = len(matriz)
+    if n < 4:
+        return list(range(n)), custo_rota(list(range(n)), matriz)
+
+    with instrumentacao.fase('candidatas'):
+        origens, destinos, custos = arestas_candidatas(matriz, k)
+        ao_centro = None
+        if centro is not None:
+            fora_centro = (origens != centro) & (destinos != centro)
+            origens, destinos, custos = origens[fora_centro], destinos[fora_centro], custos[fora_centro]
+            ao_centro = _distancias_para(matriz, centro, np.arange(n))
+        ordem = _ordem_chaves(origens, destinos, custos, ao_centro)
+    ligacoes = _Ligacoes(n, ignorar=centro)
+    with instrumentacao.fase('ligacao'):
+        ligacoes.ligar(origens[ordem], destinos[ordem])
+    fragmentos = ligacoes.componentes
+    with instrumentacao.fase('juncao'):
+        _juntar_pontas(ligacoes, matriz, k, ao_centro)
+    percurso = ligacoes.caminho()
+    if centro is not None:
+        percurso.insert(0, centro)
+    instrumentacao.contar('fragmentos', fragmentos)
+
+    distancia = custo_rota(percurso, matriz)
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('arestas.fim', metodo=metodo, distancia=distancia, fragmentos=fragmentos,
+                              tempo=time.perf_counter() - inicio)
+    return percurso, distancia
+
+def resolver_caixeiro_viajante_arestas_gulosas(cidades, matriz_distancias=None, k=10, instrumentacao=None):
+    """
+    Resolve o problema do caixeiro viajante pela heurística de arestas
+    gulosas (greedy matching): as arestas candidatas são aceitas da mais
+    curta para a mais longa sempre que nenhuma cidade passa de grau 2 e
+    nenhum ciclo se fecha antes da hora. Os caminhos que sobram por falta
+    de candidatas são unidos pela mesma regra aplicada só às suas pontas.
+    Costuma ficar 15 a 20% acima do ótimo, contra cerca de 25% do vizinho
+    mais próximo.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        matriz_distancias (opcional): Matriz de custos simétrica (lista de
+            listas, np.ndarray ou OraculoDistancias)
+        k (int): Vizinhos mais próximos considerados por cidade
+        instrumentacao (Instrumentacao, opcional): Cronômetros e eventos
+
+    Returns:
+        tuple: Percurso construído e distância total
+    """
+    return _construir(cidades, matriz_distancias, k, None, 'arestas gulosas', instrumentacao)
+
+def resolver_caixeiro_viajante_economias(cidades, matriz_distancias=None, k=10, centro=0, instrumentacao=None):
+    """
+    Resolve o problema do caixeiro viajante pelas economias de Clarke-Wright:
+    partindo de viagens centro -> i -> centro, junta as cidades i e j na
+    ordem decrescente da economia d(centro, i) + d(centro, j) - d(i, j),
+    com as mesmas regras de grau e de ciclo das arestas gulosas. O centro
+    é a base dos drones, ligada às duas pontas do caminho final.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        matriz_distancias (opcional): Matriz de custos simétrica (lista de
+            listas, np.ndarray ou OraculoDistancias)
+        k (int): Vizinhos mais próximos considerados por cidade
+        centro (int): Índice da base
+        instrumentacao (Instrumentacao, opcional): Cronômetros e eventos
+
+    Returns:
+        tuple: Percurso construído (começando no centro) e distância total
+    """
+    return _construir(cidades, matriz_distancias, k, centro, 'economias', instrumentacao)
+
+if __name__ == "__main__":
+    from ler_arquivo_tsp import ler_instancia_tsp
+    from distancias import OTIMOS_TSPLIB, gap_percentual, matriz_distancias_instancia
+
+    instancia = ler_instancia_tsp('tsp/bier127.tsp')
+    matriz = matriz_distancias_instancia(instancia, 'tsplib')
+    for resolver in (resolver_caixeiro_viajante_arestas_gulosas, resolver_caixeiro_viajante_economias):
+        percurso, distancia = resolver(instancia.cidades(), matriz)
+        print(f"Gap para o ótimo: {gap_percentual(distancia, OTIMOS_TSPLIB['bier127']):.2f}%")
@@ -0,0 +1,216 @@
+import time
+import numpy as np
+from instrumentacao import instrumentacao_padrao
+from distancias import OraculoDistancias, custo_rota, matriz_distancias_numpy
+from limite_inferior import arvore_geradora_minima
+from alg_arestas_gulosas import arestas_candidatas, arestas_entre
+
+def _raiz(pai, v):
+    while pai[v] != v:
+        pai[v] = pai[pai[v]]
+        v = pai[v]
+    return v
+
+def _kruskal(pai, arestas, origens, destinos, custos):
+    # Acrescenta a `arestas` as arestas dadas que ligam componentes diferentes do union-find
+    ordem = np.argsort(custos, kind='stable')
+    for a, b in zip(origens[ordem].tolist(), destinos[ordem].tolist()):
+        raiz_a, raiz_b = _raiz(pai, a), _raiz(pai, b)
+        if raiz_a != raiz_b:
+            pai[raiz_b] = raiz_a
+            arestas.append((a, b))
+            if len(arestas) == len(pai) - 1:
+                break
+
+def arvore_geradora(matriz, k=10):
+    """
+    Arestas de uma árvore geradora mínima. Com matriz completa usa o Prim
+    vetorizado de limite_inferior (o mesmo da 1-árvore de Held-Karp); com
+    OraculoDistancias usa Kruskal sobre o grafo dos k vizinhos mais
+    próximos, o que dá a árvore mínima exata quando esse grafo é conexo.
+    Componentes que sobrarem são ligados por Kruskal entre uma cidade de
+    cada um.
+
+    Args:
+        matriz: np.ndarray ou OraculoDistancias (simétrica)
+        k (int): Vizinhos por cidade no caso do oráculo
+
+    Returns:
+        list: Pares (a, b) com as n - 1 arestas da árvore
+    """
+    n = len(matriz)
+    if not isinstance(matriz, OraculoDistancias):
+        pais, _ = arvore_geradora_minima(matriz)
+        return [(int(pai), filho) for filho, pai in enumerate(pais.tolist()) if pai >= 0]
+
+    pai = list(range(n))
+    arestas = []
+    _kruskal(pai, arestas, *arestas_candidatas(matriz, k))
+    while len(arestas) < n - 1:
+        representantes = np.unique([_raiz(pai, v) for v in range(n)])
+        _kruskal(pai, arestas, *arestas_entre(representantes, matriz, k))
+    return arestas
+
+def _adjacencias(n, arestas):
+    ligacoes = [[] for _ in range(n)]
+    for a, b in arestas:
+        ligacoes[a].append(b)
+        ligacoes[b].append(a)
+    return ligacoes
+
+def percurso_pre_ordem(n, arestas, raiz=0):
+    """
+    Percurso da árvore dupla: visita a árvore em pré-ordem, o que equivale a
+    percorrer cada aresta duas vezes pulando as cidades já visitadas. Pela
+    desigualdade triangular custa no máximo o dobro do ótimo.
+    """
+    ligacoes = _adjacencias(n, arestas)
+    visitado = [False] * n
+    percurso = []
+    pilha = [raiz]
+    while pilha:
+        v = pilha.pop()
+        if visitado[v]:
+            continue
+        visitado[v] = True
+        percurso.append(v)
+        pilha.extend(reversed(ligacoes[v]))
+    return percurso
+
+def emparelhamento_guloso(vertices, matriz, k=10):
+    """
+    Emparelha os vértices pela aresta mais curta disponível, em rodadas
+    sobre as arestas de arestas_entre até não sobrar ninguém. Substitui o
+    emparelhamento perfeito de custo mínimo do Christofides, que custaria
+    O(n^3).
+
+    Returns:
+        list: Pares (a, b)
+    """
+    livres = np.asarray(vertices)
+    pares = []
+    while len(livres) > 1:
+        origens, destinos, custos = arestas_entre(livres, matriz, k)
+        emparelhado = set()
+        for indice in np.argsort(custos, kind='stable').tolist():
+            a, b = int(origens[indice]), int(destinos[indice])
+            if a not in emparelhado and b not in emparelhado:
+                emparelhado.update((a, b))
+                pares.append((a, b))
+        livres = np.array([v for v in livres.tolist() if v not in emparelhado], dtype=np.int64)
+    return pares
+
+def _circuito_euleriano(n, arestas, raiz=0):
+    # Hierholzer iterativo sobre o multigrafo (árvore + emparelhamento)
+    incidentes = [[] for _ in range(n)]
+    for indice, (a, b) in enumerate(arestas):
+        incidentes[a].append(indice)
+        incidentes[b].append(indice)
+    usada = [False] * len(arestas)
+    circuito = []
+    pilha = [raiz]
+    while pilha:
+        v = pilha[-1]
+        lista = incidentes[v]
+        while lista and usada[lista[-1]]:
+            lista.pop()
+        if not lista:
+            circuito.append(pilha.pop())
+            continue
+        indice = lista.pop()
+        usada[indice] = True
+        a, b = arestas[indice]
+        pilha.append(b if a == v else a)
+    return circuito
+
+def percurso_christofides(n, arestas, matriz, k=10, raiz=0):
+    """
+    Variante do Christofides: árvore geradora mínima mais um emparelhamento
+    guloso dos vértices de grau ímpar, circuito euleriano do multigrafo e
+    atalhos sobre as cidades repetidas. Com o emparelhamento guloso a
+    garantia de 1,5 vezes o ótimo não vale mais, mas na prática o percurso
+    fica bem melhor que o da árvore dupla.
+    """
+    graus = np.bincount(np.array(arestas).ravel(), minlength=n)
+    impares = np.flatnonzero(graus % 2 == 1)
+    pares = emparelhamento_guloso(impares, matriz, k)
+    visitado = [False] * n
+    percurso = []
+    for v in _circuito_euleriano(n, list(arestas) + pares, raiz):
+        if not visitado[v]:
+            visitado[v] = True
+            percurso.append(v)
+    return percurso
+
+def _resolver(cidades, matriz_distancias, k, metodo, instrumentacao):
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    inicio = time.perf_counter()
+    if matriz_distancias is None:
+        from alg_ils import LIMITE_MATRIZ
+        if len(cidades) <= LIMITE_MATRIZ:
+            matriz_distancias = matriz_distancias_numpy(cidades)
+        else:
+            matriz_distancias = OraculoDistancias(cidades)
+    matriz = matriz_distancias
+    if not isinstance(matriz, OraculoDistancias):
+        matriz = np.asarray(matriz)
+    n = len(matriz)
+    if n < 4:
+        return list(range(n)), custo_rota(list(range(n)), matriz)
+
+    with instrumentacao.fase('arvore'):
+        arestas = arvore_geradora(matriz, k)
+    with instrumentacao.fase('percurso'):
+        if metodo == 'christofides':
+            percurso = percurso_christofides(n, arestas, matriz, k)
+        else:
+            percurso = percurso_pre_ordem(n, arestas)
+
+    distancia = custo_rota(percurso, matriz)
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('arvore.fim', metodo=metodo, distancia=distancia, tempo=time.perf_counter() - inicio)
+    return percurso, distancia
+
+def resolver_caixeiro_viajante_arvore_dupla(cidades, matriz_distancias=None, k=10, instrumentacao=None):
+    """
+    Resolve o problema do caixeiro viajante pela heurística da árvore dupla
+    (no máximo o dobro do ótimo em instâncias métricas).
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        matriz_distancias (opcional): Matriz de custos simétrica (lista de
+            listas, np.ndarray ou OraculoDistancias)
+        k (int): Vizinhos por cidade na árvore sobre o oráculo
+        instrumentacao (Instrumentacao, opcional): Cronômetros e eventos
+
+    Returns:
+        tuple: Percurso construído e distância total
+    """
+    return _resolver(cidades, matriz_distancias, k, 'árvore dupla', instrumentacao)
+
+def resolver_caixeiro_viajante_christofides(cidades, matriz_distancias=None, k=10, instrumentacao=None):
+    """
+    Resolve o problema do caixeiro viajante pela variante do Christofides
+    com emparelhamento guloso (ver percurso_christofides).
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        matriz_distancias (opcional): Matriz de custos simétrica (lista de
+            listas, np.ndarray ou OraculoDistancias)
+        k (int): Vizinhos por cidade na árvore e no emparelhamento
+        instrumentacao (Instrumentacao, opcional): Cronômetros e eventos
+
+    Returns:
+        tuple: Percurso construído e distância total
+    """
+    return _resolver(cidades, matriz_distancias, k, 'christofides', instrumentacao)
+
+if __name__ == "__main__":
+    from alg_guloso import comparar_com_forca_bruta, gerar_cidades_aleatorias, resolver_caixeiro_viajante_guloso
+
+    cidades = gerar_cidades_aleatorias(9, 0, 100)
+    comparar_com_forca_bruta(cidades, construtores={
+        'guloso': resolver_caixeiro_viajante_guloso,
+        'árvore dupla': resolver_caixeiro_viajante_arvore_dupla,
+        'christofides': resolver_caixeiro_viajante_christofides,
+    })
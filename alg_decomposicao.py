@@ -0,0 +1,286 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from instrumentacao import Instrumentacao, instrumentacao_padrao
+from distancias import OraculoDistancias, custo_rota, matriz_distancias_numpy
+from percurso import criar_percurso
+from busca_local import busca_local, melhorar_rota
+from alg_curva_espacial import percurso_curva
+
+def particionar_grade(coordenadas, tamanho_cluster):
+    """
+    Grade adaptativa (quadtree): a caixa envolvente é dividida em quatro
+    repetidamente até que cada célula tenha no máximo tamanho_cluster
+    pontos. Regiões densas ficam com células menores, então os clusters
+    saem equilibrados mesmo com entregas concentradas.
+
+    Returns:
+        np.ndarray: Rótulo do cluster de cada ponto (0 .. clusters - 1)
+    """
+    rotulos = np.empty(len(coordenadas), dtype=np.int64)
+    minimo = coordenadas.min(axis=0)
+    maximo = coordenadas.max(axis=0)
+    pendentes = [(np.arange(len(coordenadas)), minimo, maximo)]
+    cluster = 0
+    while pendentes:
+        indices, minimo, maximo = pendentes.pop()
+        pontos = coordenadas[indices]
+        # Pontos repetidos não se separam: a célula fica como está
+        if len(indices) <= tamanho_cluster or np.all(maximo - minimo < 1e-12):
+            rotulos[indices] = cluster
+            cluster += 1
+            continue
+        meio = (minimo + maximo) / 2
+        direita = pontos[:, 0] > meio[0]
+        acima = pontos[:, 1] > meio[1]
+        for quadrante_x in (False, True):
+            for quadrante_y in (False, True):
+                membros = indices[(direita == quadrante_x) & (acima == quadrante_y)]
+                if len(membros):
+                    novo_minimo = np.where([quadrante_x, quadrante_y], meio, minimo)
+                    novo_maximo = np.where([quadrante_x, quadrante_y], maximo, meio)
+                    pendentes.append((membros, novo_minimo, novo_maximo))
+    return rotulos
+
+def particionar_kmeans(coordenadas, numero_clusters, iteracoes=10, bloco=2**22):
+    """
+    K-means de Lloyd vetorizado. Os centros iniciais são os centróides de
+    trechos iguais da curva de Hilbert, o que já dá grupos compactos e
+    dispensa o k-means++. A atribuição usa ‖x‖² − 2x·c + ‖c‖² (um produto
+    de matrizes) em blocos de bloco // numero_clusters pontos, o que limita
+    cada matriz de distâncias intermediária a cerca de bloco valores.
+
+    Returns:
+        np.ndarray: Rótulo do cluster de cada ponto (0 .. clusters - 1)
+    """
+    n = len(coordenadas)
+    numero_clusters = max(1, min(numero_clusters, n))
+    ordem = percurso_curva(coordenadas)
+    trechos = np.array_split(ordem, numero_clusters)
+    centros = np.array([coordenadas[trecho].mean(axis=0) for trecho in trechos])
+    rotulos = np.empty(n, dtype=np.int64)
+    for _ in range(iteracoes):
+        # ‖x‖² é o mesmo para todos os centros e não muda o argmin
+        normas_centros = (centros ** 2).sum(axis=1)
+        passo = max(1, bloco // len(centros))
+        for inicio in range(0, n, passo):
+            pontos = coordenadas[inicio:inicio + passo]
+            distancias = normas_centros - 2 * pontos @ centros.T
+            rotulos[inicio:inicio + passo] = np.argmin(distancias, axis=1)
+        contagem = np.bincount(rotulos, minlength=len(centros))
+        somas_x = np.bincount(rotulos, weights=coordenadas[:, 0], minlength=len(centros))
+        somas_y = np.bincount(rotulos, weights=coordenadas[:, 1], minlength=len(centros))
+        ocupados = contagem > 0
+        centros = np.column_stack([somas_x[ocupados], somas_y[ocupados]]) / contagem[ocupados, None]
+        # Renumera para que clusters que esvaziaram não deixem rótulos vagos
+        rotulos = np.cumsum(ocupados)[rotulos] - 1
+    return rotulos
+
+PARTICOES = ('grade', 'kmeans')
+
+def _silenciosa():
+    return Instrumentacao(saidas=[], medir=False)
+
+def _cluster_guloso(coordenadas, matriz, semente, **parametros):
+    from alg_guloso import resolver_caixeiro_viajante_guloso
+    percurso, _, _ = resolver_caixeiro_viajante_guloso(coordenadas.tolist(), matriz_distancias=matriz,
+                                                        instrumentacao=_silenciosa(), registrar_etapas=False)
+    return percurso
+
+def _cluster_insercao(coordenadas, matriz, semente, criterio='distante'):
+    from alg_insercao import resolver_caixeiro_viajante_insercao
+    percurso, _ = resolver_caixeiro_viajante_insercao(coordenadas, matriz, criterio, instrumentacao=_silenciosa())
+    return percurso
+
+def _cluster_ils(coordenadas, matriz, semente, iteracoes_por_cidade=5, **parametros):
+    from alg_ils import resolver_caixeiro_viajante_ils
+    percurso, _ = resolver_caixeiro_viajante_ils(
+        coordenadas, matriz, tempo_limite=float('inf'), max_iteracoes=iteracoes_por_cidade * len(coordenadas),
+        semente=semente, instrumentacao=_silenciosa(), **parametros)
+    return percurso
+
+def _cluster_lk(coordenadas, matriz, semente, **parametros):
+    from alg_lin_kernighan import resolver_caixeiro_viajante_lk
+    percurso, _ = resolver_caixeiro_viajante_lk(coordenadas, matriz, semente=semente,
+                                                instrumentacao=_silenciosa(), **parametros)
+    return percurso
+
+def _cluster_genetico(coordenadas, matriz, semente, numero_individuos=50, numero_geracoes=100,
+                      taxa_cruzamento=0.9, taxa_mutacao=0.1, criterio_parada=None):
+    import random
+    from alg_genetico import evolucao
+    random.seed(semente)
+    _, _, melhor_rota = evolucao(coordenadas.tolist(), numero_individuos, numero_geracoes, taxa_cruzamento,
+                                 taxa_mutacao, matriz_distancias=matriz, instrumentacao=_silenciosa(),
+                                 criterio_parada=criterio_parada)
+    return melhor_rota
+
+def _cluster_formigas(coordenadas, matriz, semente, quantidade_formigas=10, geracoes=20, criterio_parada=None):
+    import random
+    from alg_formigas import ACO, Grafo
+    random.seed(semente)
+    aco = ACO(quantidade_formigas=quantidade_formigas, geracoes=geracoes, alpha=1.0, beta=2.0, rho=0.5, Q=100,
+              estrategia=2)
+    melhor_solucao, _ = aco.resolver(Grafo(matriz.tolist(), len(coordenadas)), _silenciosa(), criterio_parada)
+    return melhor_solucao
+
+# Solvers que podem resolver cada cluster; todos devolvem o percurso em índices locais
+SOLVERS_CLUSTER = {
+    'guloso': _cluster_guloso,
+    'insercao': _cluster_insercao,
+    'ils': _cluster_ils,
+    'lk': _cluster_lk,
+    'genetico': _cluster_genetico,
+    'formigas': _cluster_formigas,
+}
+
+def _resolver_cluster(tarefa):
+    # Executado nos processos do pool: cada cluster monta a própria matriz, pequena o bastante para o cache
+    coordenadas, solver, parametros, semente = tarefa
+    if len(coordenadas) < 4:
+        return list(range(len(coordenadas)))
+    matriz = matriz_distancias_numpy(coordenadas)
+    resolver = SOLVERS_CLUSTER[solver] if isinstance(solver, str) else solver
+    return list(resolver(coordenadas, matriz, semente, **parametros))
+
+def ordenar_clusters(centros):
+    """
+    Ordem de visita dos clusters: um percurso sobre os centróides, pela curva
+    de Hilbert refinada com a busca local 2-opt + Or-opt.
+    """
+    if len(centros) < 4:
+        return list(range(len(centros)))
+    from alg_ils import LIMITE_MATRIZ
+    matriz = matriz_distancias_numpy(centros) if len(centros) <= LIMITE_MATRIZ else OraculoDistancias(centros)
+    ordem, _ = melhorar_rota(percurso_curva(centros).tolist(), matriz)
+    return ordem
+
+def costurar(coordenadas, membros, percursos, ordem):
+    """
+    Junta os ciclos dos clusters num único percurso. Em cada cluster, na
+    ordem de visita, corta-se a aresta (a, b) que minimiza a entrada vinda
+    do cluster anterior mais a saída em direção ao centróide do próximo
+    menos o custo da aresta cortada; o ciclo vira um caminho de b até a
+    (ou de a até b, no sentido inverso).
+
+    Args:
+        coordenadas (np.ndarray): Coordenadas de todos os pontos
+        membros (list): Índices globais dos pontos de cada cluster
+        percursos (list): Percurso de cada cluster em índices locais
+        ordem (list): Ordem de visita dos clusters
+
+    Returns:
+        tuple: (percurso global, pontos nas costuras)
+    """
+    if len(ordem) == 1:
+        return [int(v) for v in membros[ordem[0]][np.asarray(percursos[ordem[0]], dtype=np.int64)]], []
+    centros = [coordenadas[m].mean(axis=0) for m in membros]
+    percurso = []
+    costuras = []
+    saida = None
+    for posicao, cluster in enumerate(ordem):
+        ciclo = membros[cluster][np.asarray(percursos[cluster], dtype=np.int64)]
+        pontos = coordenadas[ciclo]
+        seguintes = np.roll(pontos, -1, axis=0)
+        cortada = np.hypot(*(pontos - seguintes).T)
+        proximo = centros[ordem[(posicao + 1) % len(ordem)]]
+        # O primeiro cluster é alcançado a partir do último ao fechar o ciclo
+        anterior = coordenadas[saida] if saida is not None else centros[ordem[-1]]
+        # Sentido direto: entra em b = ciclo[i + 1] e sai em a = ciclo[i]
+        direto = np.hypot(*(seguintes - anterior).T) + np.hypot(*(pontos - proximo).T) - cortada
+        inverso = np.hypot(*(pontos - anterior).T) + np.hypot(*(seguintes - proximo).T) - cortada
+        if direto.min() <= inverso.min():
+            i = int(np.argmin(direto))
+            caminho = np.roll(ciclo, -(i + 1))
+        else:
+            i = int(np.argmin(inverso))
+            caminho = np.roll(ciclo, -(i + 1))[::-1]
+        if saida is not None:
+            costuras.extend((saida, int(caminho[0])))
+        percurso.extend(caminho.tolist())
+        saida = percurso[-1]
+    costuras.extend((percurso[-1], percurso[0]))
+    return percurso, costuras
+
+def resolver_caixeiro_viajante_decomposicao(cidades, solver='lk', particao='grade', tamanho_cluster=150,
+                                            parametros_solver=None, processos=None, k=10, semente=None,
+                                            busca_costuras=True, instrumentacao=None):
+    """
+    Resolve instâncias muito grandes por divisão e conquista: particiona os
+    pontos (grade adaptativa ou k-means), resolve cada cluster com um dos
+    solvers existentes em paralelo num pool de processos, ordena os
+    clusters por um percurso sobre os centróides, costura os ciclos e por
+    fim roda a busca local 2-opt + Or-opt a partir dos pontos das
+    costuras, que é onde a junção deixa arestas ruins.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        solver (str ou callable): Chave de SOLVERS_CLUSTER ou função de
+            nível de módulo (coordenadas, matriz, semente, **parametros) ->
+            percurso local
+        particao (str): 'grade' ou 'kmeans'
+        tamanho_cluster (int): Tamanho alvo de cada cluster
+        parametros_solver (dict, opcional): Parâmetros extras do solver
+        processos (int, opcional): Processos do pool (padrão: número de
+            CPUs; 1 resolve tudo no processo atual)
+        k (int): Tamanho das listas de vizinhos da busca nas costuras
+        semente (int, opcional): Semente dos solvers dos clusters
+        busca_costuras (bool): Roda a busca local final
+        instrumentacao (Instrumentacao, opcional): Cronômetros e eventos
+
+    Returns:
+        tuple: Percurso construído e distância total (euclidiana)
+    """
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    inicio = time.perf_counter()
+    coordenadas = np.asarray(cidades, dtype=np.float64)[:, :2]
+    n = len(coordenadas)
+    parametros_solver = parametros_solver or {}
+    processos = processos or os.cpu_count() or 1
+
+    with instrumentacao.fase('particao'):
+        if particao == 'grade':
+            rotulos = particionar_grade(coordenadas, tamanho_cluster)
+        elif particao == 'kmeans':
+            rotulos = particionar_kmeans(coordenadas, max(1, round(n / tamanho_cluster)))
+        else:
+            raise ValueError(f"Partição desconhecida: {particao}")
+        ordem_rotulos = np.argsort(rotulos, kind='stable')
+        limites = np.searchsorted(rotulos[ordem_rotulos], np.arange(rotulos.max() + 2))
+        membros = [ordem_rotulos[limites[c]:limites[c + 1]] for c in range(len(limites) - 1)]
+    instrumentacao.contar('clusters', len(membros))
+
+    with instrumentacao.fase('clusters'):
+        gerador = np.random.default_rng(semente)
+        sementes = gerador.integers(0, 2 ** 31, len(membros)).tolist()
+        tarefas = [(coordenadas[m], solver, parametros_solver, s) for m, s in zip(membros, sementes)]
+        if processos == 1:
+            percursos = [_resolver_cluster(tarefa) for tarefa in tarefas]
+        else:
+            with ProcessPoolExecutor(max_workers=processos) as executor:
+                percursos = list(executor.map(_resolver_cluster, tarefas,
+                                              chunksize=max(1, len(tarefas) // (4 * processos))))
+
+    with instrumentacao.fase('costura'):
+        ordem = ordenar_clusters(np.array([coordenadas[m].mean(axis=0) for m in membros]))
+        percurso, costuras = costurar(coordenadas, membros, percursos, ordem)
+
+    from alg_ils import LIMITE_MATRIZ
+    matriz = matriz_distancias_numpy(coordenadas) if n <= LIMITE_MATRIZ else OraculoDistancias(coordenadas)
+    if busca_costuras and n >= 8:
+        with instrumentacao.fase('busca_costuras'):
+            rota = criar_percurso(percurso)
+            busca_local(rota, matriz, k=k, ativos=set(costuras))
+            percurso = rota.como_lista()
+
+    distancia = custo_rota(percurso, matriz)
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('decomposicao.fim', clusters=len(membros), distancia=distancia,
+                              tempo=time.perf_counter() - inicio)
+    return percurso, distancia
+
+if __name__ == "__main__":
+    pontos = np.random.default_rng(0).random((100000, 2))
+    percurso, distancia = resolver_caixeiro_viajante_decomposicao(pontos, semente=0)
+    print(f"Razão para a estimativa do ótimo (0,7124 * sqrt(n * A)): {distancia / (0.7124 * np.sqrt(len(pontos))):.4f}")
@@ -4,6 +4,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from itertools import permutations
 import time
+from instrumentacao import instrumentacao_padrao
 
 def calcular_distancia(ponto1, ponto2):
     """
@@ -56,16 +57,21 @@ def gerar_cidades_aleatorias(n, min_coord=0, max_coord=100):
              random.uniform(min_coord, max_coord)) 
             for _ in range(n)]
 
-def resolver_caixeiro_viajante_forca_bruta(cidades):
+def resolver_caixeiro_viajante_forca_bruta(cidades, matriz_distancias=None, instrumentacao=None):
     """
     Resolve o problema do caixeiro viajante usando força bruta.
     
     Args:
         cidades (list): Lista de coordenadas (x, y) das cidades
+        matriz_distancias (list, opcional): Matriz de custos já calculada;
+            quando ausente, as distâncias são calculadas a partir das coordenadas
+        instrumentacao (Instrumentacao, opcional): Cronômetros, contadores e
+            saídas de eventos; por padrão apenas imprime o progresso
     
     Returns:
         tuple: Melhor percurso e distância total mínima
     """
+    instrumentacao = instrumentacao_padrao(instrumentacao)
     indices_cidades = list(range(len(cidades)))
     
     menor_distancia = float('inf')
@@ -73,25 +79,35 @@ def resolver_caixeiro_viajante_forca_bruta(cidades):
     total_permutacoes = math.factorial(len(cidades))
     permutacoes_verificadas = 0
     
-    print(f"Calculando {total_permutacoes} permutações possíveis...")
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('forca_bruta.inicio', total=total_permutacoes)
     inicio = time.time()
     
-    for permutacao in permutations(indices_cidades):
-        distancia = calcular_percurso_total(permutacao, cidades)
-        
-        if distancia < menor_distancia:
-            menor_distancia = distancia
-            melhor_percurso = permutacao
-        
-        permutacoes_verificadas += 1
-        if permutacoes_verificadas % 10000 == 0:
-            tempo_decorrido = time.time() - inicio
-            print(f"Progresso: {permutacoes_verificadas}/{total_permutacoes} permutações verificadas "
-                  f"({(permutacoes_verificadas/total_permutacoes)*100:.2f}%), "
-                  f"Tempo: {tempo_decorrido:.2f}s")
-    
+    with instrumentacao.fase('avaliacao'):
+        for permutacao in permutations(indices_cidades):
+            if matriz_distancias is None:
+                distancia = calcular_percurso_total(permutacao, cidades)
+            else:
+                distancia = sum(matriz_distancias[permutacao[i - 1]][permutacao[i]]
+                                for i in range(len(permutacao)))
+            
+            if distancia < menor_distancia:
+                menor_distancia = distancia
+                melhor_percurso = permutacao
+            
+            permutacoes_verificadas += 1
+            if permutacoes_verificadas % 10000 == 0 and instrumentacao.emitindo:
+                instrumentacao.emitir('forca_bruta.progresso',
+                                      verificadas=permutacoes_verificadas,
+                                      total=total_permutacoes,
+                                      percentual=(permutacoes_verificadas/total_permutacoes)*100,
+                                      tempo=time.time() - inicio,
+                                      menor_distancia=menor_distancia)
+    
+    instrumentacao.contar('avaliacoes', permutacoes_verificadas)
     fim = time.time()
-    print(f"Tempo total de execução: {fim - inicio:.2f} segundos")
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('forca_bruta.fim', tempo=fim - inicio, menor_distancia=menor_distancia)
     
     return melhor_percurso, menor_distancia
 
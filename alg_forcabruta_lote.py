@@ -0,0 +1,190 @@
+import time
+from functools import lru_cache
+from itertools import permutations
+import numpy as np
+from instrumentacao import instrumentacao_padrao
+
+# Maior instância resolvida pelo tensor de permutações ((n - 1)!/2 percursos por instância)
+LIMITE_PERMUTACOES = 10
+# Maior instância resolvida pela programação dinâmica (2^(n - 1) subconjuntos por instância)
+LIMITE_HELD_KARP = 16
+# Memória aproximada dos arrays intermediários de cada bloco de instâncias
+MEMORIA_BLOCO = 64 * 2**20
+
+@lru_cache(maxsize=None)
+def percursos_candidatos(n, simetrica=True):
+    """
+    Tensor (T, n) com todos os percursos candidatos, calculado uma vez por
+    tamanho: a cidade 0 é fixada no início e, para custos simétricos, só
+    fica um dos dois sentidos (segunda cidade menor que a última), o que
+    deixa (n - 1)!/2 percursos em vez de n!.
+    """
+    restantes = np.array(list(permutations(range(1, n))), dtype=np.int8).reshape(-1, n - 1)
+    if simetrica:
+        restantes = restantes[restantes[:, 0] < restantes[:, -1]]
+    percursos = np.zeros((len(restantes), n), dtype=np.int8)
+    percursos[:, 1:] = restantes
+    return percursos
+
+@lru_cache(maxsize=None)
+def _indices_arestas(n, simetrica=True):
+    # Índice de cada aresta na matriz achatada: (T, n) com a * n + b para a aresta (a, b)
+    percursos = percursos_candidatos(n, simetrica).astype(np.int64)
+    return percursos * n + np.roll(percursos, -1, axis=1)
+
+def _lote_permutacoes(matrizes, simetrica):
+    b, n, _ = matrizes.shape
+    arestas = _indices_arestas(n, simetrica)
+    planas = matrizes.reshape(b, n * n)
+    # Soma aresta a aresta para manter só um array (b, T) em memória
+    custos = planas[:, arestas[:, 0]].copy()
+    for posicao in range(1, n):
+        custos += planas[:, arestas[:, posicao]]
+    melhores = np.argmin(custos, axis=1)
+    return percursos_candidatos(n, simetrica)[melhores].astype(np.int64), custos[np.arange(b), melhores]
+
+def _lote_held_karp(matrizes):
+    """
+    Programação dinâmica de Held-Karp para um lote de instâncias de mesmo
+    tamanho: os laços em Python percorrem os subconjuntos, e cada passo é
+    uma operação vetorizada sobre o lote inteiro e sobre todas as cidades
+    finais do subconjunto. Vale também para custos assimétricos.
+    """
+    b, n, _ = matrizes.shape
+    m = n - 1
+    # custo[:, S, j]: menor caminho que sai de 0, visita o subconjunto S de {1..m} e termina em j + 1
+    custo = np.full((b, 1 << m, m), np.inf)
+    anterior = np.zeros((b, 1 << m, m), dtype=np.int8)
+    entre = matrizes[:, 1:, 1:]
+    for j in range(m):
+        custo[:, 1 << j, j] = matrizes[:, 0, j + 1]
+    for subconjunto in range(1, 1 << m):
+        finais = np.array([j for j in range(m) if subconjunto >> j & 1])
+        if len(finais) < 2:
+            continue
+        # (b, finais, k): chegar em k sem a cidade final e depois ir de k para ela
+        candidatos = custo[:, subconjunto ^ (1 << finais), :] + entre[:, :, finais].transpose(0, 2, 1)
+        melhores = np.argmin(candidatos, axis=2)
+        custo[:, subconjunto, finais] = np.take_along_axis(candidatos, melhores[:, :, None], axis=2)[:, :, 0]
+        anterior[:, subconjunto, finais] = melhores
+
+    linhas = np.arange(b)
+    completo = (1 << m) - 1
+    totais = custo[:, completo, :] + matrizes[:, 1:, 0]
+    atual = np.argmin(totais, axis=1)
+    distancias = totais[linhas, atual]
+    percursos = np.zeros((b, n), dtype=np.int64)
+    subconjunto = np.full(b, completo)
+    for posicao in range(n - 1, 0, -1):
+        percursos[:, posicao] = atual + 1
+        proximo = anterior[linhas, subconjunto, atual].astype(np.int64)
+        subconjunto = subconjunto ^ (1 << atual)
+        atual = proximo
+    # Sem percurso de custo finito, o caminho acima passa por entradas de anterior nunca preenchidas;
+    # como no tensor de permutações, devolve um percurso válido qualquer com custo infinito
+    percursos[~np.isfinite(distancias)] = np.arange(n)
+    return percursos, distancias
+
+def _tamanho_bloco(n, metodo, simetrica):
+    if metodo == 'permutacoes':
+        por_instancia = len(percursos_candidatos(n, simetrica)) * 16
+    else:
+        por_instancia = (1 << (n - 1)) * (n - 1) * (n + 9) * 8
+    return max(1, MEMORIA_BLOCO // por_instancia)
+
+def resolver_lote(matrizes, metodo='auto', simetrica=None):
+    """
+    Resolve de forma exata um lote de instâncias do mesmo tamanho.
+
+    Args:
+        matrizes (array): Matrizes de custos empilhadas (B, n, n)
+        metodo (str): 'permutacoes' (tensor de percursos candidatos),
+            'held_karp' (programação dinâmica) ou 'auto'
+        simetrica (bool, opcional): Custos simétricos; detectado quando ausente
+
+    Returns:
+        tuple: Percursos ótimos (B, n), começando pela cidade 0, e custos (B,)
+    """
+    matrizes = np.asarray(matrizes, dtype=np.float64)
+    b, n, _ = matrizes.shape
+    if n <= 2:
+        percursos = np.tile(np.arange(n), (b, 1))
+        distancias = matrizes[:, percursos[0], np.roll(percursos[0], -1)].sum(axis=1)
+        return percursos, distancias
+    if simetrica is None:
+        simetrica = bool(np.array_equal(matrizes, matrizes.transpose(0, 2, 1)))
+    if metodo == 'auto':
+        # A programação dinâmica passa à frente a partir de 8 cidades
+        metodo = 'permutacoes' if n < 8 else 'held_karp'
+    if metodo == 'permutacoes' and n > LIMITE_PERMUTACOES:
+        raise ValueError(f"Tensor de permutações limitado a {LIMITE_PERMUTACOES} cidades")
+    if metodo == 'held_karp' and n > LIMITE_HELD_KARP:
+        raise ValueError(f"Held-Karp em lote limitado a {LIMITE_HELD_KARP} cidades")
+
+    percursos = np.empty((b, n), dtype=np.int64)
+    distancias = np.empty(b)
+    bloco = _tamanho_bloco(n, metodo, simetrica)
+    for inicio in range(0, b, bloco):
+        fatia = slice(inicio, inicio + bloco)
+        if metodo == 'permutacoes':
+            percursos[fatia], distancias[fatia] = _lote_permutacoes(matrizes[fatia], simetrica)
+        else:
+            percursos[fatia], distancias[fatia] = _lote_held_karp(matrizes[fatia])
+    return percursos, distancias
+
+def matrizes_lote(coordenadas):
+    # Matrizes euclidianas empilhadas a partir de coordenadas (B, n, 2)
+    coordenadas = np.asarray(coordenadas, dtype=np.float64)
+    return np.linalg.norm(coordenadas[:, :, None, :2] - coordenadas[:, None, :, :2], axis=3)
+
+def resolver_caixeiro_viajante_forca_bruta_lote(instancias=None, matrizes=None, metodo='auto', instrumentacao=None):
+    """
+    Resolve de uma vez milhares de instâncias pequenas (ex.: as viagens de
+    5 a 9 entregas de um drone). As instâncias são agrupadas por tamanho e
+    cada grupo é resolvido em blocos vetorizados: ou todos os percursos
+    candidatos de um tensor pré-calculado são avaliados contra as matrizes
+    empilhadas, ou a programação dinâmica de Held-Karp roda sobre o lote.
+
+    Args:
+        instancias (list, opcional): Listas de coordenadas (x, y), uma por instância
+        matrizes (list, opcional): Matrizes de custos, uma por instância (no
+            lugar das coordenadas)
+        metodo (str): 'permutacoes', 'held_karp' ou 'auto'
+        instrumentacao (Instrumentacao, opcional): Cronômetros, contadores e
+            saídas de eventos
+
+    Returns:
+        tuple: Percursos ótimos (listas) e distâncias, na ordem das instâncias
+    """
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    inicio = time.perf_counter()
+    fontes = matrizes if matrizes is not None else instancias
+    grupos = {}
+    for indice, fonte in enumerate(fontes):
+        grupos.setdefault(len(fonte), []).append(indice)
+
+    percursos = [None] * len(fontes)
+    distancias = np.empty(len(fontes))
+    for n, indices in sorted(grupos.items()):
+        with instrumentacao.fase(f'lote_{n}'):
+            if matrizes is not None:
+                empilhadas = np.stack([np.asarray(matrizes[i], dtype=np.float64) for i in indices])
+            else:
+                empilhadas = matrizes_lote([np.asarray(instancias[i], dtype=np.float64)[:, :2] for i in indices])
+            otimos, custos = resolver_lote(empilhadas, metodo)
+        for indice, percurso, custo in zip(indices, otimos.tolist(), custos):
+            percursos[indice] = percurso
+            distancias[indice] = custo
+        instrumentacao.contar('instancias', len(indices))
+
+    tempo = time.perf_counter() - inicio
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('forca_bruta_lote.fim', instancias=len(fontes), tempo=tempo,
+                              vazao=len(fontes) / tempo if tempo > 0 else float('inf'))
+    return percursos, distancias.tolist()
+
+if __name__ == "__main__":
+    gerador = np.random.default_rng(42)
+    for n in range(5, 10):
+        instancias = gerador.uniform(0, 100, size=(2000, n, 2))
+        resolver_caixeiro_viajante_forca_bruta_lote(instancias)
@@ -2,6 +2,8 @@ import numpy as np
 import math
 import matplotlib.pyplot as plt
 import random
+from instrumentacao import instrumentacao_padrao
+from distancias import matriz_simetrica
 
 class Formiga:
     def __init__(self, aco, grafo):
@@ -9,9 +11,23 @@ class Formiga:
         self.grafo = grafo
         
         self.custo_total = 0.0
+        # Fração do depósito por aresta (estratégias 1 e 2) que a formiga faz; < 1 para rotas com atraso
+        self.fator_deposito = 1.0
         self.tabu = []  
         self.delta_feromonio = np.zeros((grafo.rank, grafo.rank))
         self.nos_permitidos = list(range(grafo.rank))  
+        # Posição de cada nó em nos_permitidos, para removê-lo em O(1)
+        self.posicao_permitidos = list(range(grafo.rank))
+    
+    def visitar(self, no):
+        self.tabu.append(no)
+        
+        # Troca o nó com o último da lista antes de removê-lo
+        posicao = self.posicao_permitidos[no]
+        ultimo = self.nos_permitidos[-1]
+        self.nos_permitidos[posicao] = ultimo
+        self.posicao_permitidos[ultimo] = posicao
+        self.nos_permitidos.pop()
     
     def seleciona_proximo(self):
         no_atual = self.tabu[-1] if self.tabu else 0  
@@ -45,24 +61,36 @@ class Formiga:
             proximo = self.tabu[i + 1]
             
             if self.aco.estrategia == 1:
-                self.delta_feromonio[atual][proximo] = self.aco.Q
-                self.delta_feromonio[proximo][atual] = self.aco.Q  
+                self.delta_feromonio[atual][proximo] = self.aco.Q * self.fator_deposito
+                if self.grafo.simetrico:
+                    self.delta_feromonio[proximo][atual] = self.aco.Q * self.fator_deposito
             
             elif self.aco.estrategia == 2:
                 distancia = self.grafo.matriz_custos[atual][proximo]
-                self.delta_feromonio[atual][proximo] = self.aco.Q / distancia
-                self.delta_feromonio[proximo][atual] = self.aco.Q / distancia  
+                self.delta_feromonio[atual][proximo] = self.aco.Q / distancia * self.fator_deposito
+                if self.grafo.simetrico:
+                    self.delta_feromonio[proximo][atual] = self.aco.Q / distancia * self.fator_deposito
             
             else:
                 self.delta_feromonio[atual][proximo] = self.aco.Q / self.custo_total
-                self.delta_feromonio[proximo][atual] = self.aco.Q / self.custo_total  
+                if self.grafo.simetrico:
+                    self.delta_feromonio[proximo][atual] = self.aco.Q / self.custo_total
 
 
 class Grafo:
-    def __init__(self, matriz_custos, rank):
+    def __init__(self, matriz_custos, rank, simetrico=None):
         self.matriz_custos = matriz_custos
         self.rank = rank
+        # Com custos assimétricos (vento, ruas de mão única) o feromônio de (a, b) não vale para (b, a)
+        self.simetrico = matriz_simetrica(matriz_custos) if simetrico is None else simetrico
         self.matriz_feromonio = [[0.1 for _ in range(rank)] for _ in range(rank)]
+    
+    def reforcar_percurso(self, percurso, quantidade):
+        # Deposita feromônio nas arestas de um percurso conhecido (ex.: da curva de Hilbert)
+        for atual, proximo in zip(percurso, percurso[1:] + percurso[:1]):
+            self.matriz_feromonio[atual][proximo] += quantidade
+            if self.simetrico:
+                self.matriz_feromonio[proximo][atual] += quantidade
 
 
 class ACO:
@@ -75,46 +103,74 @@ class ACO:
         self.Q = Q          
         self.estrategia = estrategia  
     
-    def atualiza_feromonio(self, grafo, formigas):
+    def evapora_feromonio(self, grafo):
         for i in range(grafo.rank):
             for j in range(grafo.rank):
                 grafo.matriz_feromonio[i][j] *= (1 - self.rho)
-                
+    
+    def deposita_feromonio(self, grafo, formigas):
+        for i in range(grafo.rank):
+            for j in range(grafo.rank):
                 for formiga in formigas:
                     grafo.matriz_feromonio[i][j] += formiga.delta_feromonio[i][j]
     
-    def resolver(self, grafo):
+    def atualiza_feromonio(self, grafo, formigas):
+        self.evapora_feromonio(grafo)
+        self.deposita_feromonio(grafo, formigas)
+    
+    def resolver(self, grafo, instrumentacao=None, criterio_parada=None, janelas=None):
+        # janelas (janelas_tempo.JanelasTempo, opcional): o custo de cada formiga passa a ser a distância
+        # mais a penalidade de atraso. Na estratégia 3 o depósito já é Q / custo; nas estratégias 1 e 2 o
+        # depósito de cada aresta é multiplicado por distância / custo penalizado, então as rotas com atraso
+        # deixam menos feromônio e as pontuais são favorecidas em todas as estratégias
+        instrumentacao = instrumentacao_padrao(instrumentacao)
         melhor_custo = float('inf')
         melhor_solucao = []
         
         for geracao in range(self.geracoes):
             formigas = []
             
-            for _ in range(self.quantidade_formigas):
-                formiga = Formiga(self, grafo)
-                
-                no_inicial = random.randint(0, grafo.rank - 1)
-                formiga.tabu.append(no_inicial)
-                formiga.nos_permitidos.remove(no_inicial)
-                
-                while formiga.nos_permitidos:
-                    proximo = formiga.seleciona_proximo()
-                    formiga.custo_total += grafo.matriz_custos[formiga.tabu[-1]][proximo]
-                    formiga.tabu.append(proximo)
-                    formiga.nos_permitidos.remove(proximo)
-                
-                formiga.custo_total += grafo.matriz_custos[formiga.tabu[-1]][formiga.tabu[0]]
-                
-                if formiga.custo_total < melhor_custo:
-                    melhor_custo = formiga.custo_total
-                    melhor_solucao = formiga.tabu.copy()
-                
-                formiga.atualiza_delta_feromonio()
-                formigas.append(formiga)
+            with instrumentacao.fase('construcao'):
+                for _ in range(self.quantidade_formigas):
+                    formiga = Formiga(self, grafo)
+                    
+                    no_inicial = random.randint(0, grafo.rank - 1)
+                    formiga.visitar(no_inicial)
+                    
+                    while formiga.nos_permitidos:
+                        proximo = formiga.seleciona_proximo()
+                        formiga.custo_total += grafo.matriz_custos[formiga.tabu[-1]][proximo]
+                        formiga.visitar(proximo)
+                    
+                    formiga.custo_total += grafo.matriz_custos[formiga.tabu[-1]][formiga.tabu[0]]
+                    if janelas is not None:
+                        distancia = formiga.custo_total
+                        formiga.custo_total = janelas.custo_penalizado(formiga.tabu)
+                        if formiga.custo_total > 0:
+                            formiga.fator_deposito = min(1.0, distancia / formiga.custo_total)
+                    
+                    if formiga.custo_total < melhor_custo:
+                        melhor_custo = formiga.custo_total
+                        melhor_solucao = formiga.tabu.copy()
+                    
+                    formigas.append(formiga)
+            instrumentacao.contar('formigas', len(formigas))
+            instrumentacao.contar('movimentos', len(formigas) * (grafo.rank - 1))
+            
+            with instrumentacao.fase('evaporacao'):
+                self.evapora_feromonio(grafo)
+            
+            with instrumentacao.fase('deposito'):
+                for formiga in formigas:
+                    formiga.atualiza_delta_feromonio()
+                self.deposita_feromonio(grafo, formigas)
             
-            self.atualiza_feromonio(grafo, formigas)
+            if instrumentacao.emitindo:
+                instrumentacao.emitir('formigas.geracao', geracao=geracao + 1, geracoes=self.geracoes,
+                                      melhor_custo=melhor_custo, melhor_solucao=melhor_solucao)
             
-            print(f"Geração {geracao+1}/{self.geracoes}, Melhor custo: {melhor_custo}")
+            if criterio_parada is not None and criterio_parada(melhor_custo):
+                break
         
         return melhor_solucao, melhor_custo
 
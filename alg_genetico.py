@@ -2,10 +2,13 @@ import random
 import math
 import numpy as np
 import matplotlib.pyplot as plt
+from instrumentacao import instrumentacao_padrao
+from distancias import OraculoDistancias, custo_rota, custos_rotas
 
-def gerar_populacao_inicial(numero_cidades, numero_individuos):
-    populacao = []
-    for _ in range(numero_individuos):
+def gerar_populacao_inicial(numero_cidades, numero_individuos, sementes=None):
+    # Percursos prontos (ex.: alg_curva_espacial.percursos_curva) entram primeiro
+    populacao = [list(semente) for semente in (sementes or [])[:numero_individuos]]
+    for _ in range(numero_individuos - len(populacao)):
         individuo = list(range(numero_cidades))
         random.shuffle(individuo)
         populacao.append(individuo)
@@ -63,7 +66,32 @@ def mutacao_genes(lista_populacao, taxa_mutacao):
     
     return lista_populacao
 
-def aptidao(lista_populacao, matriz_distancias):
+def mutacao_inversao(lista_populacao, taxa_mutacao):
+    # Inverte um trecho aleatório da rota (movimento 2-opt)
+    for elemento in lista_populacao:
+        if random.random() <= taxa_mutacao:
+            a = random.randint(0, len(elemento) - 1)
+            b = random.randint(0, len(elemento) - 1)
+            
+            while a == b:
+                b = random.randint(0, len(elemento) - 1)
+            
+            a, b = min(a, b), max(a, b)
+            elemento[a:b + 1] = elemento[a:b + 1][::-1]
+    
+    return lista_populacao
+
+def aptidao(lista_populacao, matriz_distancias, janelas=None):
+    # Com janelas de entrega (janelas_tempo.JanelasTempo) o custo é a distância mais a penalidade de atraso
+    if janelas is not None:
+        custos = janelas.custos_penalizados(lista_populacao)
+        return [1 / (custo + 0.00001) for custo in custos.tolist()]
+    
+    # Matrizes NumPy (inclusive int32/float32) e o oráculo avaliam a população inteira de uma vez
+    if isinstance(matriz_distancias, (np.ndarray, OraculoDistancias)):
+        custos = custos_rotas(lista_populacao, matriz_distancias)
+        return [1 / (custo + 0.00001) for custo in custos.tolist()]
+    
     lista_aptidao = []
     
     for rota in lista_populacao:
@@ -106,14 +134,21 @@ def PMX(pai1, pai2):
     
     for i in range(punto_corte1, punto_corte2 + 1):
         filho[i] = pai2[i]
+    
+    # Índice de posições de pai2 e conjunto do segmento copiado: cada passo do
+    # mapeamento passa a custar O(1) em vez de percorrer as listas
+    posicao_pai2 = [0] * tamanho
+    for i, cidade in enumerate(pai2):
+        posicao_pai2[cidade] = i
+    segmento = set(filho[punto_corte1:punto_corte2 + 1])
         
     for i in range(tamanho):
         if i >= punto_corte1 and i <= punto_corte2:
             continue
             
         item = pai1[i]
-        while item in filho[punto_corte1:punto_corte2 + 1]:
-            idx = pai2.index(item)
+        while item in segmento:
+            idx = posicao_pai2[item]
             item = pai1[idx]
         
         filho[i] = item
@@ -136,48 +171,73 @@ def cruzamento_todos_pais(lista_pais, taxa_cruzamento):
     
     return lista_filho
 
-def calcular_distancia_rota(rota, matriz_distancias):
+def calcular_distancia_rota(rota, matriz_distancias, janelas=None):
+    if janelas is not None:
+        return janelas.custo_penalizado(rota)
+    
+    if isinstance(matriz_distancias, (np.ndarray, OraculoDistancias)):
+        return custo_rota(rota, matriz_distancias)
+    
     distancia_total = 0
     for i in range(len(rota) - 1):
         distancia_total += matriz_distancias[rota[i]][rota[i + 1]]
     distancia_total += matriz_distancias[rota[-1]][rota[0]]
     return distancia_total
 
-def evolucao(lista_cidades, numero_individuo, numero_geracoes, taxa_cruzamento, taxa_mutacao, sel_func=torneio):
-    matriz_distancias = calcular_todas_distancias(lista_cidades)
+def evolucao(lista_cidades, numero_individuo, numero_geracoes, taxa_cruzamento, taxa_mutacao, sel_func=torneio,
+             matriz_distancias=None, instrumentacao=None, mut_func=mutacao_genes, criterio_parada=None,
+             populacao_inicial=None, janelas=None):
+    instrumentacao = instrumentacao_padrao(instrumentacao)
     
-    populacao = gerar_populacao_inicial(len(lista_cidades), numero_individuo)
+    if matriz_distancias is None:
+        with instrumentacao.fase('matriz'):
+            matriz_distancias = calcular_todas_distancias(lista_cidades)
+    
+    populacao = gerar_populacao_inicial(len(lista_cidades), numero_individuo, populacao_inicial)
     
     menor_caminho = float('inf')
     melhor_rota = None
     
     for geracao in range(numero_geracoes):
-        lista_aptidao = aptidao(populacao, matriz_distancias)
-        lista_aptidao_escalada = escala_apt(lista_aptidao)
+        with instrumentacao.fase('aptidao'):
+            lista_aptidao = aptidao(populacao, matriz_distancias, janelas)
+            lista_aptidao_escalada = escala_apt(lista_aptidao)
+        instrumentacao.contar('avaliacoes', len(populacao))
         
         melhor_idx = lista_aptidao.index(max(lista_aptidao))
         melhor_individuo = populacao[melhor_idx]
-        distancia_atual = calcular_distancia_rota(melhor_individuo, matriz_distancias)
+        distancia_atual = calcular_distancia_rota(melhor_individuo, matriz_distancias, janelas)
         
         if distancia_atual < menor_caminho:
             menor_caminho = distancia_atual
             melhor_rota = melhor_individuo.copy()
         
-        if geracao % 10 == 0 or geracao == numero_geracoes - 1:
-            print(f"Geração {geracao}: Menor caminho = {menor_caminho:.2f}")
+        if instrumentacao.emitindo:
+            instrumentacao.emitir('genetico.geracao', geracao=geracao, menor_caminho=menor_caminho,
+                                  populacao=populacao, aptidao=lista_aptidao)
+            if geracao % 10 == 0 or geracao == numero_geracoes - 1:
+                instrumentacao.emitir('genetico.progresso', geracao=geracao, menor_caminho=menor_caminho)
+        
+        # Ex.: limite_inferior.criterio_gap, que para ao atingir um gap certificado
+        if criterio_parada is not None and criterio_parada(menor_caminho):
+            break
         
-        pares = selecao_pais(populacao, lista_aptidao_escalada, sel_func)
+        with instrumentacao.fase('selecao'):
+            pares = selecao_pais(populacao, lista_aptidao_escalada, sel_func)
         
-        filhos = cruzamento_todos_pais(pares, taxa_cruzamento)
+        with instrumentacao.fase('cruzamento'):
+            filhos = cruzamento_todos_pais(pares, taxa_cruzamento)
         
-        filhos_mutados = mutacao_genes(filhos, taxa_mutacao)
+        with instrumentacao.fase('mutacao'):
+            filhos_mutados = mut_func(filhos, taxa_mutacao)
         
         populacao = filhos_mutados
         
         if melhor_rota is not None:
             populacao[0] = melhor_rota.copy()
     
-    print(f"Menor caminho encontrado: {menor_caminho:.2f}")
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('genetico.fim', menor_caminho=menor_caminho, melhor_rota=melhor_rota)
     
     melhor_caminho_cidades = [lista_cidades[idx] for idx in melhor_rota]
     
@@ -3,6 +3,8 @@ import math
 import numpy as np
 import matplotlib.pyplot as plt
 import time
+from instrumentacao import instrumentacao_padrao
+from distancias import OraculoDistancias, custo_rota
 
 def calcular_distancia(ponto1, ponto2):
     """
@@ -55,7 +57,8 @@ def gerar_cidades_aleatorias(n, min_coord=0, max_coord=100):
              random.uniform(min_coord, max_coord)) 
             for _ in range(n)]
 
-def resolver_caixeiro_viajante_guloso(cidades, cidade_inicial=0):
+def resolver_caixeiro_viajante_guloso(cidades, cidade_inicial=0, matriz_distancias=None, instrumentacao=None,
+                                      registrar_etapas=True):
     """
     Resolve o problema do caixeiro viajante usando algoritmo guloso
     (sempre escolhe a cidade mais próxima ainda não visitada).
@@ -63,10 +66,17 @@ def resolver_caixeiro_viajante_guloso(cidades, cidade_inicial=0):
     Args:
         cidades (list): Lista de coordenadas (x, y) das cidades
         cidade_inicial (int): Índice da cidade de início
+        matriz_distancias (list, opcional): Matriz de custos já calculada;
+            quando ausente, as distâncias são calculadas a partir das coordenadas
+        instrumentacao (Instrumentacao, opcional): Cronômetros, contadores e
+            saídas de eventos; por padrão apenas imprime o tempo de execução
+        registrar_etapas (bool): Guarda o percurso parcial de cada etapa para
+            a animação; desligar evita memória quadrática em instâncias grandes
     
     Returns:
         tuple: Percurso construído e distância total
     """
+    instrumentacao = instrumentacao_padrao(instrumentacao)
     inicio = time.time()
     
     n = len(cidades)
@@ -78,34 +88,58 @@ def resolver_caixeiro_viajante_guloso(cidades, cidade_inicial=0):
     etapas = []
     etapas.append(list(percurso))  # Estado inicial
     
-    # Enquanto houver cidades não visitadas
-    while cidades_nao_visitadas:
-        cidade_atual = percurso[-1]
+    with instrumentacao.fase('construcao'):
+        # Com matriz NumPy ou oráculo, cada passo é um argmin vetorizado sobre a
+        # linha da cidade atual; o empate fica com o menor índice, como no laço
+        if isinstance(matriz_distancias, (np.ndarray, OraculoDistancias)):
+            visitadas = np.zeros(n, dtype=bool)
+            visitadas[cidade_inicial] = True
+            for _ in range(n - 1):
+                linha = np.where(visitadas, np.inf, matriz_distancias[percurso[-1]])
+                cidade_mais_proxima = int(np.argmin(linha))
+                visitadas[cidade_mais_proxima] = True
+                percurso.append(cidade_mais_proxima)
+                if registrar_etapas:
+                    etapas.append(list(percurso))
+            cidades_nao_visitadas.clear()
         
-        # Encontrar a cidade mais próxima não visitada
-        cidade_mais_proxima = None
-        menor_distancia = float('inf')
-        
-        for proxima_cidade in cidades_nao_visitadas:
-            dist = calcular_distancia(cidades[cidade_atual], cidades[proxima_cidade])
-            if dist < menor_distancia:
-                menor_distancia = dist
-                cidade_mais_proxima = proxima_cidade
-        
-        # Adicionar a cidade mais próxima ao percurso
-        percurso.append(cidade_mais_proxima)
-        cidades_nao_visitadas.remove(cidade_mais_proxima)
-        
-        # Salvar esta etapa para visualização
-        etapas.append(list(percurso))
+        # Enquanto houver cidades não visitadas
+        while cidades_nao_visitadas:
+            cidade_atual = percurso[-1]
+            
+            # Encontrar a cidade mais próxima não visitada
+            cidade_mais_proxima = None
+            menor_distancia = float('inf')
+            
+            for proxima_cidade in cidades_nao_visitadas:
+                if matriz_distancias is None:
+                    dist = calcular_distancia(cidades[cidade_atual], cidades[proxima_cidade])
+                else:
+                    dist = matriz_distancias[cidade_atual][proxima_cidade]
+                if dist < menor_distancia:
+                    menor_distancia = dist
+                    cidade_mais_proxima = proxima_cidade
+            
+            # Adicionar a cidade mais próxima ao percurso
+            percurso.append(cidade_mais_proxima)
+            cidades_nao_visitadas.remove(cidade_mais_proxima)
+            
+            # Salvar esta etapa para visualização
+            if registrar_etapas:
+                etapas.append(list(percurso))
     
+    instrumentacao.contar('avaliacoes', n * (n - 1) // 2)
     fim = time.time()
     tempo_execucao = fim - inicio
     
     # Calcular a distância total
-    distancia_total = calcular_percurso_total(percurso, cidades)
+    if matriz_distancias is None:
+        distancia_total = calcular_percurso_total(percurso, cidades)
+    else:
+        distancia_total = custo_rota(percurso, matriz_distancias)
     
-    print(f"Tempo de execução: {tempo_execucao:.6f} segundos")
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('guloso.fim', tempo=tempo_execucao, distancia=distancia_total)
     
     return percurso, distancia_total, etapas
 
@@ -265,23 +299,32 @@ def visualizar_construcao_percurso(cidades, etapas, intervalo=0.5):
     
     plt.show()
 
-def comparar_com_forca_bruta(cidades):
+def comparar_com_forca_bruta(cidades, construtores=None):
     """
-    Compara o algoritmo guloso com o algoritmo de força bruta.
+    Compara o algoritmo guloso (ou outros construtores) com o algoritmo de
+    força bruta.
     
     Args:
         cidades (list): Lista de coordenadas das cidades
+        construtores (dict, opcional): Nome -> função que recebe as cidades e
+            devolve (percurso, distância, ...), como resolver_caixeiro_viajante_guloso
+            ou resolver_caixeiro_viajante_christofides; padrão: só o guloso
         
     Returns:
-        tuple: (percurso_guloso, dist_guloso, percurso_forca_bruta, dist_forca_bruta)
+        tuple: (percurso, distância) do primeiro construtor seguidos de
+            (percurso_forca_bruta, dist_forca_bruta)
     """
     from itertools import permutations
     
-    # Algoritmo guloso
-    print("Executando algoritmo guloso...")
-    inicio_guloso = time.time()
-    percurso_guloso, dist_guloso, _ = resolver_caixeiro_viajante_guloso(cidades)
-    tempo_guloso = time.time() - inicio_guloso
+    if construtores is None:
+        construtores = {'guloso': resolver_caixeiro_viajante_guloso}
+    
+    resultados = {}
+    for nome, construtor in construtores.items():
+        print(f"Executando algoritmo {nome}...")
+        inicio_construtor = time.time()
+        percurso, distancia = construtor(cidades)[:2]
+        resultados[nome] = (percurso, distancia, time.time() - inicio_construtor)
     
     # Algoritmo de força bruta
     print("Executando algoritmo de força bruta...")
@@ -301,27 +344,31 @@ def comparar_com_forca_bruta(cidades):
     
     # Resultados
     print("\nComparação de resultados:")
-    print(f"Algoritmo Guloso:")
-    print(f"  Percurso: {percurso_guloso}")
-    print(f"  Distância: {dist_guloso:.2f}")
-    print(f"  Tempo de execução: {tempo_guloso:.6f} segundos")
-    
-    print(f"\nAlgoritmo de Força Bruta:")
+    for nome, (percurso, distancia, tempo) in resultados.items():
+        print(f"Algoritmo {nome.capitalize()}:")
+        print(f"  Percurso: {percurso}")
+        print(f"  Distância: {distancia:.2f}")
+        print(f"  Tempo de execução: {tempo:.6f} segundos")
+        print()
+    
+    print(f"Algoritmo de Força Bruta:")
     print(f"  Percurso: {melhor_percurso}")
     print(f"  Distância: {menor_distancia:.2f}")
     print(f"  Tempo de execução: {tempo_fb:.6f} segundos")
     
     # Mostrar ganho/perda de qualidade
-    diferenca_percentual = ((dist_guloso - menor_distancia) / menor_distancia) * 100
-    
-    if diferenca_percentual > 0:
-        print(f"\nO algoritmo guloso produziu um percurso {diferenca_percentual:.2f}% pior que o ótimo.")
-    else:
-        print("\nO algoritmo guloso encontrou o percurso ótimo!")
-    
-    print(f"O algoritmo guloso foi {tempo_fb/tempo_guloso:.2f}x mais rápido.")
+    for nome, (percurso, distancia, tempo) in resultados.items():
+        diferenca_percentual = ((distancia - menor_distancia) / menor_distancia) * 100
+        
+        if diferenca_percentual > 1e-9:
+            print(f"\nO algoritmo {nome} produziu um percurso {diferenca_percentual:.2f}% pior que o ótimo.")
+        else:
+            print(f"\nO algoritmo {nome} encontrou o percurso ótimo!")
+        
+        print(f"O algoritmo {nome} foi {tempo_fb/max(tempo, 1e-9):.2f}x mais rápido.")
     
-    return percurso_guloso, dist_guloso, melhor_percurso, menor_distancia
+    primeiro_percurso, primeira_distancia, _ = next(iter(resultados.values()))
+    return primeiro_percurso, primeira_distancia, melhor_percurso, menor_distancia
 
 def main():
     # Configuração para reprodutibilidade
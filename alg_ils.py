@@ -0,0 +1,225 @@
+import math
+import random
+import time
+from functools import partial
+from instrumentacao import instrumentacao_padrao
+from distancias import (OraculoDistancias, custo_rota, funcao_distancia, matriz_distancias_numpy,
+                        matriz_simetrica, vizinhos_candidatos)
+from percurso import Percurso
+from busca_local import busca_local, mover_segmento
+from alg_guloso import resolver_caixeiro_viajante_guloso
+
+# Acima deste tamanho as distâncias vêm do oráculo em vez de uma matriz n x n
+LIMITE_MATRIZ = 5000
+
+def ponte_dupla(percurso, distancia, gerador, comprimento_maximo):
+    """
+    Perturbação "double bridge": troca de lugar dois segmentos consecutivos
+    (A B C D vira A C B D). Nenhuma sequência de movimentos 2-opt ou Or-opt
+    desfaz esse movimento diretamente, então a busca local não volta ao
+    mesmo ótimo local. Os segmentos ficam próximos entre si para que o
+    custo da perturbação não cresça com n.
+
+    Args:
+        percurso (Percurso): Percurso modificado no lugar
+        distancia (callable): Função d(a, b)
+        gerador (random.Random): Gerador de números aleatórios
+        comprimento_maximo (int): Maior tamanho de cada segmento
+
+    Returns:
+        tuple: (variação do custo, cidades nas pontas das arestas alteradas)
+    """
+    n = len(percurso)
+    comprimento_maximo = max(1, min(comprimento_maximo, (n - 2) // 2))
+    a = gerador.randrange(n)
+    b1 = percurso.proximo(a)
+    b2 = b1
+    for _ in range(gerador.randint(1, comprimento_maximo) - 1):
+        b2 = percurso.proximo(b2)
+    c1 = percurso.proximo(b2)
+    c2 = c1
+    for _ in range(gerador.randint(1, comprimento_maximo) - 1):
+        c2 = percurso.proximo(c2)
+    d = percurso.proximo(c2)
+
+    delta = (distancia(a, c1) + distancia(c2, b1) + distancia(b2, d)
+             - distancia(a, b1) - distancia(b2, c1) - distancia(c2, d))
+    mover_segmento(percurso, b1, b2, c2, d)
+    return delta, (a, b1, b2, c1, c2, d)
+
+def inversao_segmento(percurso, distancia, gerador, comprimento_maximo):
+    """
+    Perturbação que inverte um segmento aleatório de até comprimento_maximo cidades.
+
+    Returns:
+        tuple: (variação do custo, cidades nas pontas das arestas alteradas)
+    """
+    n = len(percurso)
+    comprimento_maximo = max(2, min(comprimento_maximo, n - 2))
+    a = gerador.randrange(n)
+    b = a
+    for _ in range(gerador.randint(2, comprimento_maximo) - 1):
+        b = percurso.proximo(b)
+    p = percurso.anterior(a)
+    nx = percurso.proximo(b)
+
+    delta = distancia(p, b) + distancia(a, nx) - distancia(p, a) - distancia(b, nx)
+    percurso.mover_2opt(p, a, b, nx)
+    return delta, (p, a, b, nx)
+
+PERTURBACOES = {
+    'ponte_dupla': ponte_dupla,
+    'inversao': inversao_segmento,
+}
+
+def criterio_aceitacao(nome, parametro=None, gerador=random):
+    """
+    Monta o critério que decide se o ótimo local obtido após a perturbação
+    substitui o atual.
+
+    Args:
+        nome (str): 'melhor' (aceita se não piorar), 'sempre' (passeio
+            aleatório), 'limiar' (aceita até parametro acima do melhor, em
+            fração; padrão 0.01) ou 'recozimento' (aceita pioras com
+            probabilidade exp(-delta/T), com T igual a parametro vezes o
+            custo médio de uma aresta; padrão 0.5)
+        parametro (float, opcional): Parâmetro do critério
+        gerador (random.Random): Gerador usado pelo critério 'recozimento'
+
+    Returns:
+        callable: Função (custo_novo, custo_atual, melhor_custo, n) -> bool
+    """
+    if nome == 'melhor':
+        return lambda novo, atual, melhor, n: novo <= atual
+    if nome == 'sempre':
+        return lambda novo, atual, melhor, n: True
+    if nome == 'limiar':
+        limiar = 0.01 if parametro is None else parametro
+        return lambda novo, atual, melhor, n: novo <= melhor * (1 + limiar)
+    if nome == 'recozimento':
+        fator = 0.5 if parametro is None else parametro
+
+        def aceitar(novo, atual, melhor, n):
+            if novo <= atual:
+                return True
+            temperatura = fator * atual / n
+            return gerador.random() < math.exp(-(novo - atual) / temperatura)
+        return aceitar
+    raise ValueError(f"Critério de aceitação desconhecido: {nome}")
+
+def resolver_caixeiro_viajante_ils(cidades, matriz_distancias=None, tempo_limite=10.0, max_iteracoes=None,
+                                   perturbacao='ponte_dupla', aceitacao='melhor', parametro_aceitacao=None,
+                                   comprimento_perturbacao=50, k=10, percurso_inicial=None, semente=None,
+                                   melhoria=busca_local, criterio_parada=None, instrumentacao=None):
+    """
+    Resolve o problema do caixeiro viajante com Iterated Local Search: parte
+    do percurso guloso, aplica a busca local 2-opt + Or-opt e repete
+    perturbação seguida de busca local até esgotar o tempo. Depois de cada
+    perturbação só as cidades tocadas por ela entram na fila da busca local,
+    então cada iteração custa quase o mesmo para qualquer n.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        matriz_distancias (opcional): Matriz de custos (lista de listas,
+            np.ndarray ou OraculoDistancias); quando ausente é calculada a
+            partir das coordenadas
+        tempo_limite (float): Orçamento de tempo em segundos
+        max_iteracoes (int, opcional): Limite de perturbações
+        perturbacao (str): 'ponte_dupla' ou 'inversao' (só com custos
+            simétricos; a ponte dupla preserva o sentido dos segmentos)
+        aceitacao (str ou callable): Nome do critério (ver criterio_aceitacao)
+            ou função (custo_novo, custo_atual, melhor_custo, n) -> bool
+        parametro_aceitacao (float, opcional): Parâmetro do critério
+        comprimento_perturbacao (int): Maior segmento movido pela perturbação
+        k (int): Tamanho das listas de vizinhos da busca local
+        percurso_inicial (list, opcional): Percurso de partida no lugar do guloso
+        semente (int, opcional): Semente do gerador aleatório
+        melhoria (callable): Busca local usada entre as perturbações, com a
+            assinatura de busca_local (percurso, matriz, vizinhos, ativos=...)
+        criterio_parada (callable, opcional): Função custo -> bool que encerra
+            a busca antes do tempo (ex.: limite_inferior.criterio_gap)
+        instrumentacao (Instrumentacao, opcional): Cronômetros, contadores e
+            saídas de eventos
+
+    Returns:
+        tuple: Melhor percurso encontrado e distância total
+    """
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    inicio = time.perf_counter()
+    gerador = random.Random(semente)
+    n = len(cidades)
+
+    if matriz_distancias is None:
+        with instrumentacao.fase('matriz'):
+            if n <= LIMITE_MATRIZ:
+                matriz_distancias = matriz_distancias_numpy(cidades)
+            else:
+                matriz_distancias = OraculoDistancias(cidades)
+
+    if percurso_inicial is None:
+        percurso_inicial, _, _ = resolver_caixeiro_viajante_guloso(
+            cidades, matriz_distancias=matriz_distancias, instrumentacao=instrumentacao, registrar_etapas=False)
+    if n < 8:
+        return list(percurso_inicial), custo_rota(percurso_inicial, matriz_distancias)
+
+    distancia = funcao_distancia(matriz_distancias)
+    with instrumentacao.fase('vizinhos'):
+        vizinhos = vizinhos_candidatos(matriz_distancias, k)
+    perturbar = PERTURBACOES[perturbacao]
+    # A simetria é verificada uma vez aqui, e não a cada chamada da busca local
+    simetrica = matriz_simetrica(matriz_distancias)
+    if not simetrica and perturbar is inversao_segmento:
+        raise ValueError("A perturbação por inversão supõe custos simétricos; use 'ponte_dupla'")
+    if melhoria is busca_local:
+        melhoria = partial(busca_local, simetrica=simetrica)
+    aceitar = aceitacao if callable(aceitacao) else criterio_aceitacao(aceitacao, parametro_aceitacao, gerador)
+
+    atual = Percurso(percurso_inicial, sentido_fixo=not simetrica)
+    with instrumentacao.fase('busca_local'):
+        melhoria(atual, matriz_distancias, vizinhos)
+    custo_atual = custo_rota(atual.ordem, matriz_distancias)
+    melhor_custo = custo_atual
+    melhor_percurso = atual.como_lista()
+
+    iteracao = 0
+    while time.perf_counter() - inicio < tempo_limite and (max_iteracoes is None or iteracao < max_iteracoes):
+        if criterio_parada is not None and criterio_parada(melhor_custo):
+            break
+        iteracao += 1
+        candidato = atual.copia()
+        with instrumentacao.fase('perturbacao'):
+            delta, afetadas = perturbar(candidato, distancia, gerador, comprimento_perturbacao)
+        with instrumentacao.fase('busca_local'):
+            ganho = melhoria(candidato, matriz_distancias, vizinhos, ativos=afetadas)
+        custo_candidato = custo_atual + delta - ganho
+
+        if custo_candidato < melhor_custo - 1e-9:
+            melhor_custo = custo_candidato
+            melhor_percurso = candidato.como_lista()
+            if instrumentacao.emitindo:
+                instrumentacao.emitir('ils.melhoria', iteracao=iteracao, melhor_custo=melhor_custo,
+                                      tempo=time.perf_counter() - inicio)
+        if aceitar(custo_candidato, custo_atual, melhor_custo, n):
+            atual = candidato
+            custo_atual = custo_candidato
+            instrumentacao.contar('aceitas')
+    instrumentacao.contar('iteracoes', iteracao)
+
+    # Recalcula o custo para não acumular erros de arredondamento dos deltas
+    melhor_custo = custo_rota(melhor_percurso, matriz_distancias)
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('ils.fim', melhor_custo=melhor_custo, iteracoes=iteracao,
+                              tempo=time.perf_counter() - inicio)
+    return melhor_percurso, melhor_custo
+
+if __name__ == "__main__":
+    from ler_arquivo_tsp import ler_instancia_tsp
+    from distancias import OTIMOS_TSPLIB, gap_percentual, matriz_distancias_instancia
+    from limite_inferior import gap_certificado, limite_held_karp
+
+    instancia = ler_instancia_tsp('tsp/berlin52.tsp')
+    matriz = matriz_distancias_instancia(instancia, 'tsplib')
+    percurso, distancia = resolver_caixeiro_viajante_ils(instancia.cidades(), matriz, tempo_limite=5.0, semente=0)
+    print(f"Melhor rota: {percurso}")
+    print(f"Gap para o ótimo: {gap_percentual(distancia, OTIMOS_TSPLIB['berlin52']):.2f}%")
+    print(f"Gap certificado: {gap_certificado(distancia, limite_held_karp(matriz)[0]):.2f}%")
@@ -0,0 +1,147 @@
+import time
+import numpy as np
+from instrumentacao import instrumentacao_padrao
+from distancias import OraculoDistancias, custo_rota, matriz_distancias_numpy, matriz_simetrica
+
+CRITERIOS = ('proxima', 'distante', 'barata')
+
+def _fonte_linhas(matriz):
+    # Linha i (custos saindo de i), coluna i (custos chegando em i) e submatriz (linhas x colunas)
+    # em float64 para qualquer fonte de custos; com custos simétricos a coluna é a própria linha
+    if isinstance(matriz, OraculoDistancias):
+        linha = lambda i: matriz.linha(i).astype(np.float64, copy=False)
+        return (linha, linha, lambda linhas, colunas: matriz.distancias_bloco(linhas, colunas).astype(np.float64))
+    linha = lambda i: matriz[i].astype(np.float64, copy=False)
+    coluna = linha if matriz_simetrica(matriz) else lambda i: matriz[:, i].astype(np.float64)
+    return linha, coluna, lambda linhas, colunas: matriz[np.ix_(linhas, colunas)].astype(np.float64)
+
+def resolver_caixeiro_viajante_insercao(cidades, matriz_distancias=None, criterio='distante', cidade_inicial=0,
+                                        instrumentacao=None):
+    """
+    Resolve o problema do caixeiro viajante por inserção: o percurso começa
+    na cidade inicial e cresce uma cidade por vez, sempre na posição que
+    menos aumenta o custo. O critério decide qual cidade entra:
+
+    - 'proxima': a mais próxima do percurso atual
+    - 'distante': a mais distante do percurso atual; desenha primeiro o
+      contorno da região e costuma ficar 10 a 15% acima do ótimo em áreas
+      espalhadas, contra cerca de 25% do vizinho mais próximo
+    - 'barata': a que tem a inserção mais barata
+
+    A distância de cada cidade ao percurso (e, na inserção mais barata, o
+    melhor custo e a aresta de inserção) fica em arrays NumPy atualizados
+    com uma linha da matriz por passo, então a construção custa O(n^2) no
+    total, sem reavaliar todas as cidades contra todas as arestas. Com
+    custos assimétricos cada aresta é avaliada no sentido em que o
+    percurso a usa.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        matriz_distancias (opcional): Matriz de custos (lista de listas,
+            np.ndarray ou OraculoDistancias)
+        criterio (str): 'proxima', 'distante' ou 'barata'
+        cidade_inicial (int): Índice da cidade de início
+        instrumentacao (Instrumentacao, opcional): Cronômetros e eventos
+
+    Returns:
+        tuple: Percurso construído e distância total
+    """
+    if criterio not in CRITERIOS:
+        raise ValueError(f"Critério de inserção desconhecido: {criterio}")
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    inicio = time.perf_counter()
+    if matriz_distancias is None:
+        from alg_ils import LIMITE_MATRIZ
+        if len(cidades) <= LIMITE_MATRIZ:
+            matriz_distancias = matriz_distancias_numpy(cidades)
+        else:
+            matriz_distancias = OraculoDistancias(cidades)
+    matriz = matriz_distancias
+    if not isinstance(matriz, OraculoDistancias):
+        matriz = np.asarray(matriz)
+    linha, coluna, bloco = _fonte_linhas(matriz)
+    n = len(matriz)
+
+    # O percurso é uma lista ligada: proximo[i] e o custo da aresta (i, proximo[i])
+    proximo = np.full(n, -1, dtype=np.int64)
+    custo_aresta = np.zeros(n)
+    no_percurso = np.zeros(n, dtype=bool)
+    nos = np.empty(n, dtype=np.int64)
+    proximo[cidade_inicial] = cidade_inicial
+    no_percurso[cidade_inicial] = True
+    nos[0] = cidade_inicial
+    tamanho = 1
+
+    linha_inicial = linha(cidade_inicial)
+    distancia_percurso = linha_inicial.copy()
+    # Inserção mais barata: melhor acréscimo de cada cidade e a aresta (i, proximo[i]) onde ele ocorre
+    melhor_custo = linha_inicial + coluna(cidade_inicial)
+    melhor_aresta = np.full(n, cidade_inicial, dtype=np.int64)
+
+    with instrumentacao.fase('construcao'):
+        for _ in range(n - 1):
+            if criterio == 'proxima':
+                c = int(np.argmin(np.where(no_percurso, np.inf, distancia_percurso)))
+            elif criterio == 'distante':
+                c = int(np.argmax(np.where(no_percurso, -np.inf, distancia_percurso)))
+            else:
+                c = int(np.argmin(np.where(no_percurso, np.inf, melhor_custo)))
+
+            linha_c = linha(c)
+            coluna_c = coluna(c)
+            if criterio == 'barata':
+                i = int(melhor_aresta[c])
+            else:
+                arestas = nos[:tamanho]
+                acrescimos = coluna_c[arestas] + linha_c[proximo[arestas]] - custo_aresta[arestas]
+                i = int(arestas[np.argmin(acrescimos)])
+
+            j = int(proximo[i])
+            proximo[i] = c
+            proximo[c] = j
+            custo_aresta[i] = coluna_c[i]
+            custo_aresta[c] = linha_c[j]
+            no_percurso[c] = True
+            nos[tamanho] = c
+            tamanho += 1
+
+            if criterio == 'barata':
+                # Só as cidades que usavam a aresta removida (i, j) precisam de recálculo completo
+                afetadas = np.flatnonzero((melhor_aresta == i) & ~no_percurso)
+                livres = ~no_percurso
+                via_i = linha(i) + coluna_c - custo_aresta[i]
+                via_c = linha_c + coluna(j) - custo_aresta[c]
+                melhora_i = livres & (via_i < melhor_custo)
+                melhor_custo[melhora_i] = via_i[melhora_i]
+                melhor_aresta[melhora_i] = i
+                melhora_c = livres & (via_c < melhor_custo)
+                melhor_custo[melhora_c] = via_c[melhora_c]
+                melhor_aresta[melhora_c] = c
+                if len(afetadas):
+                    arestas = nos[:tamanho]
+                    acrescimos = (bloco(arestas, afetadas).T + bloco(afetadas, proximo[arestas])
+                                  - custo_aresta[arestas])
+                    escolhidas = np.argmin(acrescimos, axis=1)
+                    melhor_custo[afetadas] = acrescimos[np.arange(len(afetadas)), escolhidas]
+                    melhor_aresta[afetadas] = arestas[escolhidas]
+            else:
+                np.minimum(distancia_percurso, linha_c, out=distancia_percurso)
+
+    percurso = [cidade_inicial]
+    for _ in range(n - 1):
+        percurso.append(int(proximo[percurso[-1]]))
+    distancia = custo_rota(percurso, matriz)
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('insercao.fim', criterio=criterio, distancia=distancia,
+                              tempo=time.perf_counter() - inicio)
+    return percurso, distancia
+
+if __name__ == "__main__":
+    from ler_arquivo_tsp import ler_instancia_tsp
+    from distancias import OTIMOS_TSPLIB, gap_percentual, matriz_distancias_instancia
+
+    instancia = ler_instancia_tsp('tsp/bier127.tsp')
+    matriz = matriz_distancias_instancia(instancia, 'tsplib')
+    for criterio in CRITERIOS:
+        percurso, distancia = resolver_caixeiro_viajante_insercao(instancia.cidades(), matriz, criterio)
+        print(f"Gap para o ótimo: {gap_percentual(distancia, OTIMOS_TSPLIB['bier127']):.2f}%")
@@ -0,0 +1,241 @@
+from collections import deque
+from functools import partial
+
+from instrumentacao import instrumentacao_padrao
+from distancias import (OraculoDistancias, funcao_distancia, matriz_distancias_numpy, matriz_simetrica,
+                        vizinhos_candidatos)
+
+_EPSILON = 1e-9
+
+def _aresta(a, b):
+    return (a, b) if a < b else (b, a)
+
+def _candidatos(percurso, distancia, vizinhos, t1, t2, ganho, adicionadas, removidas):
+    """
+    Próximos passos possíveis da cadeia a partir da ponta livre t2, do mais
+    promissor para o menos promissor. Cada passo adiciona a aresta (t2, t3)
+    e remove (t3, t4), escolhida de forma que fechar o ciclo com (t4, t1)
+    dê um percurso válido (um movimento 2-opt).
+    """
+    frente = percurso.proximo(t1) == t2
+    vizinhos_t2 = (percurso.proximo(t2), percurso.anterior(t2))
+    candidatos = []
+    for t3 in vizinhos[t2]:
+        g1 = ganho - distancia(t2, t3)
+        # Critério de ganho positivo; a lista está ordenada por distância
+        if g1 <= _EPSILON:
+            break
+        if t3 == t1 or t3 in vizinhos_t2 or _aresta(t2, t3) in removidas:
+            continue
+        t4 = percurso.anterior(t3) if frente else percurso.proximo(t3)
+        if t4 == t1 or _aresta(t3, t4) in adicionadas:
+            continue
+        candidatos.append((g1 + distancia(t3, t4), t3, t4, g1))
+    candidatos.sort(reverse=True)
+    return candidatos
+
+def _melhorar_a_partir_de(percurso, distancia, vizinhos, t1, t2, profundidade_maxima, largura):
+    """
+    Tenta uma melhoria de profundidade variável começando pela remoção da
+    aresta (t1, t2). Cada nível aplica de fato um movimento 2-opt no
+    percurso; ao fim a cadeia é desfeita até a profundidade de maior ganho.
+    O primeiro nível tenta até `largura` alternativas (com retrocesso); os
+    demais seguem só o melhor candidato.
+
+    Returns:
+        tuple: (ganho, cidades tocadas) ou None quando não há melhora
+    """
+    ganho_inicial = distancia(t1, t2)
+    primeiros = _candidatos(percurso, distancia, vizinhos, t1, t2, ganho_inicial, set(), {_aresta(t1, t2)})
+
+    for _, t3, t4, g1 in primeiros[:largura]:
+        movimentos = []
+        adicionadas = set()
+        removidas = {_aresta(t1, t2)}
+        melhor_ganho = 0.0
+        melhor_profundidade = 0
+        ponta, ganho = t2, ganho_inicial
+
+        while True:
+            percurso.mover_2opt(t1, ponta, t4, t3)
+            movimentos.append((ponta, t3, t4))
+            adicionadas.add(_aresta(ponta, t3))
+            removidas.add(_aresta(t3, t4))
+            ganho = g1 + distancia(t3, t4)
+            ganho_fechado = ganho - distancia(t4, t1)
+            if ganho_fechado > melhor_ganho + _EPSILON:
+                melhor_ganho = ganho_fechado
+                melhor_profundidade = len(movimentos)
+
+            ponta = t4
+            if len(movimentos) >= profundidade_maxima:
+                break
+            proximos = _candidatos(percurso, distancia, vizinhos, t1, ponta, ganho, adicionadas, removidas)
+            if not proximos:
+                break
+            _, t3, t4, g1 = proximos[0]
+
+        # Desfaz os movimentos além da profundidade de maior ganho
+        while len(movimentos) > melhor_profundidade:
+            ponta, t3, t4 = movimentos.pop()
+            percurso.mover_2opt(t1, t4, ponta, t3)
+
+        if melhor_ganho > _EPSILON:
+            tocadas = [t1, t2]
+            for ponta, t3, t4 in movimentos:
+                tocadas.extend((t3, t4))
+            return melhor_ganho, tocadas
+    return None
+
+def lin_kernighan(percurso, matriz_distancias, vizinhos=None, k=8, ativos=None, profundidade_maxima=50,
+                  largura=5):
+    """
+    Busca local de profundidade variável no estilo Lin-Kernighan: cada
+    melhoria é uma cadeia de movimentos 2-opt sequenciais em que o ganho
+    parcial precisa continuar positivo, o que permite atravessar passos
+    intermediários que pioram o percurso. Os candidatos vêm das listas de
+    vizinhos mais próximos e as cidades são examinadas por uma fila com
+    "don't look bits", como em busca_local.
+
+    Args:
+        percurso (Percurso ou PercursoDoisNiveis): Percurso modificado no lugar
+        matriz_distancias: Lista de listas, np.ndarray ou OraculoDistancias
+        vizinhos (list, opcional): Listas de candidatos por cidade
+        k (int): Tamanho das listas de candidatos quando não informadas
+        ativos (iterable, opcional): Cidades examinadas no início (padrão: todas)
+        profundidade_maxima (int): Maior número de movimentos de uma cadeia
+        largura (int): Alternativas tentadas no primeiro nível da cadeia
+
+    Returns:
+        float: Redução total do custo do percurso
+    """
+    n = len(percurso)
+    if n < 5:
+        return 0.0
+    distancia = funcao_distancia(matriz_distancias)
+    if vizinhos is None:
+        vizinhos = vizinhos_candidatos(matriz_distancias, k)
+
+    fila = deque(range(n) if ativos is None else ativos)
+    na_fila = [False] * n
+    for cidade in fila:
+        na_fila[cidade] = True
+
+    ganho_total = 0.0
+    while fila:
+        t1 = fila.popleft()
+        na_fila[t1] = False
+        for t2 in (percurso.proximo(t1), percurso.anterior(t1)):
+            resultado = _melhorar_a_partir_de(percurso, distancia, vizinhos, t1, t2, profundidade_maxima, largura)
+            if resultado is None:
+                continue
+            ganho, tocadas = resultado
+            ganho_total += ganho
+            for cidade in tocadas:
+                if not na_fila[cidade]:
+                    na_fila[cidade] = True
+                    fila.append(cidade)
+            break
+    return ganho_total
+
+def _inicial_guloso(cidades, matriz_distancias, instrumentacao):
+    from alg_guloso import resolver_caixeiro_viajante_guloso
+    percurso, _, _ = resolver_caixeiro_viajante_guloso(cidades, matriz_distancias=matriz_distancias,
+                                                        instrumentacao=instrumentacao, registrar_etapas=False)
+    return percurso
+
+def _inicial_curva(cidades, matriz_distancias, instrumentacao):
+    from alg_curva_espacial import resolver_caixeiro_viajante_curva
+    percurso, _ = resolver_caixeiro_viajante_curva(cidades, matriz_distancias, instrumentacao=instrumentacao)
+    return percurso
+
+def _inicial_insercao(cidades, matriz_distancias, instrumentacao):
+    from alg_insercao import resolver_caixeiro_viajante_insercao
+    percurso, _ = resolver_caixeiro_viajante_insercao(cidades, matriz_distancias, instrumentacao=instrumentacao)
+    return percurso
+
+def _inicial_genetico(cidades, matriz_distancias, instrumentacao):
+    from alg_genetico import evolucao
+    _, _, melhor_rota = evolucao(cidades, 50, 100, 0.9, 0.1, matriz_distancias=matriz_distancias,
+                                 instrumentacao=instrumentacao)
+    return melhor_rota
+
+def _inicial_formigas(cidades, matriz_distancias, instrumentacao):
+    from alg_formigas import ACO, Grafo
+    aco = ACO(quantidade_formigas=10, geracoes=20, alpha=1.0, beta=2.0, rho=0.5, Q=100, estrategia=2)
+    melhor_solucao, _ = aco.resolver(Grafo(matriz_distancias, len(cidades)), instrumentacao)
+    return melhor_solucao
+
+# Solvers existentes que podem fornecer o percurso de partida
+PERCURSOS_INICIAIS = {
+    'guloso': _inicial_guloso,
+    'curva': _inicial_curva,
+    'insercao': _inicial_insercao,
+    'genetico': _inicial_genetico,
+    'formigas': _inicial_formigas,
+}
+
+def resolver_caixeiro_viajante_lk(cidades, matriz_distancias=None, percurso_inicial='guloso', tempo_limite=0.0,
+                                  k=8, profundidade_maxima=50, largura=5, semente=None, criterio_parada=None,
+                                  instrumentacao=None):
+    """
+    Resolve o problema do caixeiro viajante com Lin-Kernighan a partir do
+    percurso de outro solver. Com tempo_limite positivo, continua no
+    esquema "chained LK": perturbações double bridge seguidas de LK apenas
+    nas cidades tocadas, aceitando o resultado quando não piora.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        matriz_distancias (opcional): Matriz de custos (lista de listas,
+            np.ndarray ou OraculoDistancias)
+        percurso_inicial (str ou list): Chave de PERCURSOS_INICIAIS ('guloso',
+            'curva', 'insercao', 'genetico', 'formigas') ou um percurso pronto
+            (ex.: o devolvido por evolucao ou ACO.resolver)
+        tempo_limite (float): Tempo para as perturbações após a primeira
+            otimização; zero executa uma única passada de LK
+        k (int): Tamanho das listas de vizinhos
+        profundidade_maxima (int): Maior número de movimentos de uma cadeia
+        largura (int): Alternativas tentadas no primeiro nível da cadeia
+        semente (int, opcional): Semente das perturbações
+        criterio_parada (callable, opcional): Função custo -> bool que encerra
+            as perturbações antes do tempo
+        instrumentacao (Instrumentacao, opcional): Cronômetros, contadores e
+            saídas de eventos
+
+    Returns:
+        tuple: Melhor percurso encontrado e distância total
+    """
+    from alg_ils import LIMITE_MATRIZ, resolver_caixeiro_viajante_ils
+
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    if matriz_distancias is None:
+        with instrumentacao.fase('matriz'):
+            if len(cidades) <= LIMITE_MATRIZ:
+                matriz_distancias = matriz_distancias_numpy(cidades)
+            else:
+                matriz_distancias = OraculoDistancias(cidades)
+    # Os ganhos das cadeias supõem c(a, b) == c(b, a); com custos assimétricos a busca não converge
+    if not matriz_simetrica(matriz_distancias):
+        raise ValueError("Lin-Kernighan supõe custos simétricos; use o ILS para custos assimétricos")
+
+    if isinstance(percurso_inicial, str):
+        with instrumentacao.fase('percurso_inicial'):
+            percurso_inicial = PERCURSOS_INICIAIS[percurso_inicial](cidades, matriz_distancias, instrumentacao)
+
+    melhoria = partial(lin_kernighan, profundidade_maxima=profundidade_maxima, largura=largura)
+    return resolver_caixeiro_viajante_ils(
+        cidades, matriz_distancias, tempo_limite=tempo_limite, max_iteracoes=None if tempo_limite > 0 else 0,
+        k=k, percurso_inicial=list(percurso_inicial), semente=semente, melhoria=melhoria,
+        criterio_parada=criterio_parada, instrumentacao=instrumentacao)
+
+if __name__ == "__main__":
+    from ler_arquivo_tsp import ler_instancia_tsp
+    from distancias import OTIMOS_TSPLIB, gap_percentual, matriz_distancias_instancia
+    from limite_inferior import gap_certificado, limite_held_karp
+
+    instancia = ler_instancia_tsp('tsp/bier127.tsp')
+    matriz = matriz_distancias_instancia(instancia, 'tsplib')
+    percurso, distancia = resolver_caixeiro_viajante_lk(instancia.cidades(), matriz, tempo_limite=2.0, semente=0)
+    print(f"Melhor rota: {percurso}")
+    print(f"Gap para o ótimo: {gap_percentual(distancia, OTIMOS_TSPLIB['bier127']):.2f}%")
+    print(f"Gap certificado: {gap_certificado(distancia, limite_held_karp(matriz)[0]):.2f}%")
@@ -0,0 +1,382 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from instrumentacao import instrumentacao_padrao
+from distancias import (OraculoDistancias, custo_rota, funcao_distancia, matriz_distancias_numpy,
+                        matriz_simetrica, vizinhos_candidatos)
+from percurso import Percurso
+from busca_local import mover_segmento
+
+# Acima deste tamanho as distâncias vêm do oráculo em vez de uma matriz n x n
+LIMITE_MATRIZ = 5000
+
+# Quantidade de sorteios gerados de uma vez pelo Generator do NumPy
+_TAMANHO_LOTE = 8192
+
+_DOIS_OPT, _OR_OPT, _TROCA = 0, 1, 2
+
+def _executar_passos(percurso, custo, distancia, vizinhos, gerador, temperatura, passos, probabilidades,
+                     melhor, simetrica=True):
+    """
+    Executa passos movimentos de Metropolis a temperatura fixa. Cada
+    movimento é avaliado pela variação das poucas arestas que ele troca, sem
+    recalcular o percurso inteiro. Os sorteios (tipo de movimento, cidade,
+    vizinho, tamanho do segmento e aceitação) são gerados em lotes.
+
+    Args:
+        melhor (list): [melhor custo, ordem do melhor percurso], atualizado no lugar
+        simetrica (bool): Com custos assimétricos o Or-opt só insere o
+            segmento no sentido original (o 2-opt, que inverte um trecho,
+            deve ter probabilidade zero) e o percurso deve ter sentido fixo
+
+    Returns:
+        tuple: (custo atual, movimentos aceitos, pioras propostas, pioras aceitas)
+    """
+    n = len(percurso)
+    k = len(vizinhos[0])
+    proximo = percurso.proximo
+    anterior = percurso.anterior
+    temperatura = max(temperatura, 1e-12)
+    aceitos = pioras = pioras_aceitas = 0
+
+    restantes = passos
+    while restantes > 0:
+        lote = min(restantes, _TAMANHO_LOTE)
+        restantes -= lote
+        tipos = gerador.choice(3, size=lote, p=probabilidades).tolist()
+        origens = gerador.integers(n, size=lote).tolist()
+        escolhas = gerador.integers(k, size=lote).tolist()
+        tamanhos = gerador.integers(1, 4, size=lote).tolist()
+        sorteios = gerador.random(lote).tolist()
+
+        for tipo, a, escolha, tamanho, sorteio in zip(tipos, origens, escolhas, tamanhos, sorteios):
+            c = vizinhos[a][escolha]
+
+            if tipo == _DOIS_OPT:
+                b = proximo(a)
+                d = proximo(c)
+                if c == b or d == a:
+                    continue
+                delta = distancia(a, c) + distancia(b, d) - distancia(a, b) - distancia(c, d)
+
+            elif tipo == _OR_OPT:
+                s2 = a
+                segmento = [a]
+                for _ in range(tamanho - 1):
+                    s2 = proximo(s2)
+                    segmento.append(s2)
+                y = proximo(c)
+                if c in segmento or y in segmento:
+                    continue
+                p = anterior(a)
+                nx = proximo(s2)
+                d_cy = distancia(c, y)
+                direto = distancia(c, a) + distancia(s2, y) - d_cy
+                invertido = distancia(c, s2) + distancia(a, y) - d_cy if simetrica else math.inf
+                delta = (distancia(p, nx) - distancia(p, a) - distancia(s2, nx)
+                         + min(direto, invertido))
+
+            else:
+                pa, na = anterior(a), proximo(a)
+                pc, nc = anterior(c), proximo(c)
+                # Vizinhas: a aresta entre as duas só muda de sentido (diferença nula se simétrica)
+                if na == c:
+                    delta = (distancia(pa, c) + distancia(c, a) + distancia(a, nc)
+                             - distancia(pa, a) - distancia(a, c) - distancia(c, nc))
+                elif nc == a:
+                    delta = (distancia(pc, a) + distancia(a, c) + distancia(c, na)
+                             - distancia(pc, c) - distancia(c, a) - distancia(a, na))
+                else:
+                    delta = (distancia(pa, c) + distancia(c, na) + distancia(pc, a) + distancia(a, nc)
+                             - distancia(pa, a) - distancia(a, na) - distancia(pc, c) - distancia(c, nc))
+
+            if delta > 0:
+                pioras += 1
+                if sorteio >= math.exp(-delta / temperatura):
+                    continue
+                pioras_aceitas += 1
+
+            if tipo == _DOIS_OPT:
+                percurso.mover_2opt(a, b, c, d)
+            elif tipo == _OR_OPT:
+                mover_segmento(percurso, a, s2, c, y, direto <= invertido)
+            else:
+                percurso.trocar(a, c)
+            custo += delta
+            aceitos += 1
+            if custo < melhor[0] - 1e-9:
+                melhor[0] = custo
+                melhor[1] = percurso.ordem.copy()
+
+    return custo, aceitos, pioras, pioras_aceitas
+
+def _temperatura_inicial(percurso, distancia, vizinhos, gerador, aceitacao_inicial, amostras=500,
+                         simetrica=True):
+    # Temperatura em que uma piora média de 2-opt (ou, com custos assimétricos, de
+    # realocação de uma cidade) é aceita com a probabilidade pedida
+    n = len(percurso)
+    pioras = []
+    for a, escolha in zip(gerador.integers(n, size=amostras).tolist(),
+                          gerador.integers(len(vizinhos[0]), size=amostras).tolist()):
+        c = vizinhos[a][escolha]
+        b, d = percurso.proximo(a), percurso.proximo(c)
+        if c == b or d == a:
+            continue
+        if simetrica:
+            delta = distancia(a, c) + distancia(b, d) - distancia(a, b) - distancia(c, d)
+        else:
+            p = percurso.anterior(a)
+            delta = (distancia(p, b) - distancia(p, a) - distancia(a, b)
+                     + distancia(c, a) + distancia(a, d) - distancia(c, d))
+        if delta > 0:
+            pioras.append(delta)
+    if not pioras:
+        return 1.0
+    return -sum(pioras) / len(pioras) / math.log(aceitacao_inicial)
+
+def _preparar(cidades, matriz_distancias, k, percurso_inicial, gerador, instrumentacao):
+    n = len(cidades)
+    if matriz_distancias is None:
+        with instrumentacao.fase('matriz'):
+            if n <= LIMITE_MATRIZ:
+                matriz_distancias = matriz_distancias_numpy(cidades)
+            else:
+                matriz_distancias = OraculoDistancias(cidades)
+    with instrumentacao.fase('vizinhos'):
+        vizinhos = vizinhos_candidatos(matriz_distancias, k)
+    if percurso_inicial is None:
+        percurso_inicial = gerador.permutation(n).tolist()
+    return matriz_distancias, vizinhos, percurso_inicial
+
+def _probabilidades(movimentos, simetrica=True):
+    probabilidades = np.asarray(movimentos, dtype=np.float64)
+    if not simetrica:
+        # O 2-opt inverte um trecho, o que muda o custo de todas as suas arestas
+        probabilidades[_DOIS_OPT] = 0.0
+        if probabilidades.sum() <= 0:
+            raise ValueError("Com custos assimétricos o recozimento precisa de Or-opt ou troca")
+    return probabilidades / probabilidades.sum()
+
+def resolver_caixeiro_viajante_recozimento(cidades, matriz_distancias=None, tempo_limite=10.0, max_iteracoes=None,
+                                           resfriamento='geometrica', temperatura_inicial=None,
+                                           aceitacao_inicial=0.3, razao_final=1e-3, passos_por_temperatura=None,
+                                           movimentos=(0.5, 0.3, 0.2), k=10, percurso_inicial=None,
+                                           semente=None, criterio_parada=None, instrumentacao=None):
+    """
+    Resolve o problema do caixeiro viajante com recozimento simulado. Os
+    movimentos 2-opt, Or-opt (segmentos de 1 a 3 cidades) e troca de duas
+    cidades ligam uma cidade a um dos seus k vizinhos mais próximos e são
+    avaliados em O(1) pela variação das arestas trocadas.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        matriz_distancias (opcional): Matriz de custos (lista de listas,
+            np.ndarray ou OraculoDistancias)
+        tempo_limite (float): Orçamento de tempo em segundos
+        max_iteracoes (int, opcional): Limite de movimentos propostos
+        resfriamento (str): 'geometrica' (T cai de T0 a T0 * razao_final ao
+            longo do orçamento) ou 'adaptativa' (T é ajustada para que a taxa
+            de aceitação de pioras siga uma curva decrescente)
+        temperatura_inicial (float, opcional): T0; por padrão é estimada para
+            aceitar pioras médias com probabilidade aceitacao_inicial
+        aceitacao_inicial (float): Aceitação de pioras no início
+        razao_final (float): Temperatura (ou aceitação) final relativa à inicial
+        passos_por_temperatura (int, opcional): Movimentos entre ajustes de T
+            (padrão: 10 * n)
+        movimentos (tuple): Pesos de 2-opt, Or-opt e troca (com custos
+            assimétricos o 2-opt é desligado)
+        k (int): Tamanho das listas de vizinhos
+        percurso_inicial (list, opcional): Percurso de partida (padrão: aleatório)
+        semente (int, opcional): Semente do Generator do NumPy
+        criterio_parada (callable, opcional): Função custo -> bool verificada a
+            cada ajuste de temperatura (ex.: limite_inferior.criterio_gap)
+        instrumentacao (Instrumentacao, opcional): Cronômetros, contadores e
+            saídas de eventos
+
+    Returns:
+        tuple: Melhor percurso encontrado e distância total
+    """
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    inicio = time.perf_counter()
+    gerador = np.random.default_rng(semente)
+    matriz_distancias, vizinhos, percurso_inicial = _preparar(
+        cidades, matriz_distancias, k, percurso_inicial, gerador, instrumentacao)
+    n = len(cidades)
+    if n < 8:
+        return list(percurso_inicial), custo_rota(percurso_inicial, matriz_distancias)
+
+    distancia = funcao_distancia(matriz_distancias)
+    simetrica = matriz_simetrica(matriz_distancias)
+    probabilidades = _probabilidades(movimentos, simetrica)
+    passos_por_temperatura = passos_por_temperatura or max(1000, 10 * n)
+    percurso = Percurso(percurso_inicial, sentido_fixo=not simetrica)
+    custo = custo_rota(percurso.ordem, matriz_distancias)
+    melhor = [custo, percurso.ordem.copy()]
+
+    if temperatura_inicial is None:
+        temperatura_inicial = _temperatura_inicial(percurso, distancia, vizinhos, gerador, aceitacao_inicial,
+                                                   simetrica=simetrica)
+    temperatura = temperatura_inicial
+    iteracoes = 0
+    progresso = 0.0
+
+    while progresso < 1.0:
+        with instrumentacao.fase('movimentos'):
+            custo, aceitos, pioras, pioras_aceitas = _executar_passos(
+                percurso, custo, distancia, vizinhos, gerador, temperatura, passos_por_temperatura,
+                probabilidades, melhor, simetrica)
+        iteracoes += passos_por_temperatura
+        instrumentacao.contar('movimentos', passos_por_temperatura)
+        instrumentacao.contar('aceitos', aceitos)
+        taxa = pioras_aceitas / pioras if pioras else 0.0
+
+        if instrumentacao.emitindo:
+            instrumentacao.emitir('recozimento.temperatura', temperatura=temperatura, custo=custo,
+                                  melhor_custo=melhor[0], taxa_aceitacao=taxa)
+
+        progresso = (time.perf_counter() - inicio) / tempo_limite
+        if max_iteracoes is not None:
+            progresso = max(progresso, iteracoes / max_iteracoes)
+        if criterio_parada is not None and criterio_parada(melhor[0]):
+            break
+
+        if resfriamento == 'geometrica':
+            temperatura = temperatura_inicial * razao_final ** min(progresso, 1.0)
+        elif resfriamento == 'adaptativa':
+            alvo = aceitacao_inicial * razao_final ** min(progresso, 1.0)
+            # Ajuste proporcional em escala logarítmica, limitado a um fator 2
+            fator = min(2.0, max(0.5, (alvo + 1e-4) / (taxa + 1e-4)))
+            temperatura *= math.sqrt(fator)
+        else:
+            raise ValueError(f"Resfriamento desconhecido: {resfriamento}")
+
+    melhor_percurso = melhor[1].tolist()
+    melhor_custo = custo_rota(melhor_percurso, matriz_distancias)
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('recozimento.fim', melhor_custo=melhor_custo, iteracoes=iteracoes,
+                              tempo=time.perf_counter() - inicio)
+    return melhor_percurso, melhor_custo
+
+# Estado de cada processo da têmpera paralela, definido uma única vez pelo inicializador
+_TRABALHADOR = {}
+
+def _inicializar_trabalhador(matriz_distancias, vizinhos, probabilidades, simetrica=True):
+    _TRABALHADOR['distancia'] = funcao_distancia(matriz_distancias)
+    _TRABALHADOR['vizinhos'] = vizinhos
+    _TRABALHADOR['probabilidades'] = probabilidades
+    _TRABALHADOR['simetrica'] = simetrica
+
+def _executar_replica(ordem, custo, temperatura, passos, semente):
+    simetrica = _TRABALHADOR['simetrica']
+    percurso = Percurso(ordem, sentido_fixo=not simetrica)
+    melhor = [custo, percurso.ordem.copy()]
+    custo, _, _, _ = _executar_passos(
+        percurso, custo, _TRABALHADOR['distancia'], _TRABALHADOR['vizinhos'],
+        np.random.default_rng(semente), temperatura, passos, _TRABALHADOR['probabilidades'], melhor, simetrica)
+    return percurso.ordem, custo, melhor[1], melhor[0]
+
+def recozimento_paralelo(cidades, matriz_distancias=None, replicas=4, temperaturas=None, tempo_limite=10.0,
+                         max_rodadas=None, passos_por_troca=None, razao_final=1e-3, movimentos=(0.5, 0.3, 0.2),
+                         k=10, processos=None, semente=None, criterio_parada=None, instrumentacao=None):
+    """
+    Têmpera paralela (parallel tempering): várias réplicas do recozimento
+    rodam em processos separados, cada uma a uma temperatura fixa, e a cada
+    rodada réplicas vizinhas trocam de temperatura pelo critério de
+    Metropolis. A matriz e as listas de vizinhos são enviadas uma única vez
+    para cada processo pelo inicializador do pool.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        matriz_distancias (opcional): Matriz de custos (lista de listas,
+            np.ndarray ou OraculoDistancias)
+        replicas (int): Quantidade de réplicas
+        temperaturas (list, opcional): Temperatura de cada réplica; por
+            padrão uma escala geométrica de T0 até T0 * razao_final
+        tempo_limite (float): Orçamento de tempo em segundos
+        max_rodadas (int, opcional): Limite de rodadas de troca
+        passos_por_troca (int, opcional): Movimentos de cada réplica por
+            rodada (padrão: 10 * n)
+        processos (int, opcional): Processos do pool (padrão: um por réplica,
+            limitado ao número de CPUs)
+        semente (int, opcional): Semente do Generator do NumPy
+        criterio_parada (callable, opcional): Função custo -> bool verificada a
+            cada rodada
+
+    Returns:
+        tuple: Melhor percurso encontrado e distância total
+    """
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    inicio = time.perf_counter()
+    gerador = np.random.default_rng(semente)
+    matriz_distancias, vizinhos, percurso_inicial = _preparar(
+        cidades, matriz_distancias, k, None, gerador, instrumentacao)
+    n = len(cidades)
+    if n < 8:
+        return list(percurso_inicial), custo_rota(percurso_inicial, matriz_distancias)
+
+    simetrica = matriz_simetrica(matriz_distancias)
+    probabilidades = _probabilidades(movimentos, simetrica)
+    passos_por_troca = passos_por_troca or max(1000, 10 * n)
+    if temperaturas is None:
+        temperatura_inicial = _temperatura_inicial(Percurso(percurso_inicial), funcao_distancia(matriz_distancias),
+                                                   vizinhos, gerador, 0.3, simetrica=simetrica)
+        temperaturas = (temperatura_inicial * np.geomspace(1.0, razao_final, replicas)).tolist()
+    replicas = len(temperaturas)
+
+    custo_inicial = custo_rota(percurso_inicial, matriz_distancias)
+    estados = [(np.asarray(percurso_inicial), custo_inicial) for _ in range(replicas)]
+    melhor_custo, melhor_ordem = custo_inicial, np.asarray(percurso_inicial)
+    processos = processos or min(replicas, os.cpu_count() or 1)
+
+    rodada = 0
+    with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_trabalhador,
+                             initargs=(matriz_distancias, vizinhos, probabilidades, simetrica)) as executor:
+        while time.perf_counter() - inicio < tempo_limite and (max_rodadas is None or rodada < max_rodadas):
+            sementes = gerador.integers(2**32, size=replicas).tolist()
+            with instrumentacao.fase('replicas'):
+                resultados = list(executor.map(
+                    _executar_replica,
+                    [ordem for ordem, _ in estados], [custo for _, custo in estados],
+                    temperaturas, [passos_por_troca] * replicas, sementes))
+            estados = [(ordem, custo) for ordem, custo, _, _ in resultados]
+            for _, _, ordem, custo in resultados:
+                if custo < melhor_custo:
+                    melhor_custo, melhor_ordem = custo, ordem
+
+            # Trocas entre temperaturas vizinhas, alternando pares pares e ímpares
+            with instrumentacao.fase('trocas'):
+                for i in range(rodada % 2, replicas - 1, 2):
+                    expoente = (1 / temperaturas[i] - 1 / temperaturas[i + 1]) * (estados[i][1] - estados[i + 1][1])
+                    if expoente >= 0 or gerador.random() < math.exp(expoente):
+                        estados[i], estados[i + 1] = estados[i + 1], estados[i]
+                        instrumentacao.contar('trocas')
+            rodada += 1
+            instrumentacao.contar('movimentos', replicas * passos_por_troca)
+
+            if instrumentacao.emitindo:
+                instrumentacao.emitir('recozimento.rodada', rodada=rodada, melhor_custo=melhor_custo,
+                                      custos=[custo for _, custo in estados])
+            if criterio_parada is not None and criterio_parada(melhor_custo):
+                break
+
+    melhor_percurso = melhor_ordem.tolist()
+    melhor_custo = custo_rota(melhor_percurso, matriz_distancias)
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('recozimento.fim', melhor_custo=melhor_custo,
+                              iteracoes=rodada * replicas * passos_por_troca, tempo=time.perf_counter() - inicio)
+    return melhor_percurso, melhor_custo
+
+if __name__ == "__main__":
+    from ler_arquivo_tsp import ler_instancia_tsp
+    from distancias import OTIMOS_TSPLIB, gap_percentual, matriz_distancias_instancia
+    from limite_inferior import gap_certificado, limite_held_karp
+
+    instancia = ler_instancia_tsp('tsp/berlin52.tsp')
+    matriz = matriz_distancias_instancia(instancia, 'tsplib')
+    percurso, distancia = resolver_caixeiro_viajante_recozimento(instancia.cidades(), matriz, tempo_limite=5.0,
+                                                                 semente=0)
+    print(f"Melhor rota: {percurso}")
+    print(f"Gap para o ótimo: {gap_percentual(distancia, OTIMOS_TSPLIB['berlin52']):.2f}%")
+    print(f"Gap certificado: {gap_certificado(distancia, limite_held_karp(matriz)[0]):.2f}%")
@@ -0,0 +1,279 @@
+from collections import deque
+
+import numpy as np
+from distancias import custo_rota, funcao_distancia, matriz_simetrica, vizinhos_candidatos
+from percurso import Percurso, criar_percurso
+
+_EPSILON = 1e-9
+
+def mover_segmento(percurso, s1, s2, x, y, direto=True):
+    """
+    Move o segmento s1 ... s2 (no sentido do percurso) para entre x e y,
+    com y = proximo(x) fora do segmento. A realocação vira duas ou três
+    trocas 2-opt seguidas, o que mantém a inversão rápida do percurso como
+    única operação de escrita.
+
+    Args:
+        direto (bool): Insere como x, s1 ... s2, y; senão como x, s2 ... s1, y
+    """
+    p = percurso.anterior(s1)
+    nx = percurso.proximo(s2)
+    percurso.mover_2opt(p, s1, x, y)
+    percurso.mover_2opt(p, x, nx, s2)
+    if direto:
+        percurso.mover_2opt(x, s2, s1, y)
+
+def _tentar_2opt(percurso, distancia, vizinhos, a):
+    """
+    Procura, entre os vizinhos de a, uma troca 2-opt que melhore o percurso
+    e a aplica. Testa a aresta de a para o sucessor e para o antecessor.
+
+    Returns:
+        tuple: (ganho, cidades afetadas) ou None quando não há melhora
+    """
+    for sentido in (percurso.proximo, percurso.anterior):
+        b = sentido(a)
+        d_ab = distancia(a, b)
+        for c in vizinhos[a]:
+            d_ac = distancia(a, c)
+            # A lista está ordenada: daqui em diante nenhum c reduz o custo
+            if d_ac >= d_ab:
+                break
+            d = sentido(c)
+            if c == b or d == a:
+                continue
+            delta = d_ac + distancia(b, d) - d_ab - distancia(c, d)
+            if delta < -_EPSILON:
+                percurso.mover_2opt(a, b, c, d)
+                return -delta, (a, b, c, d)
+    return None
+
+def _tentar_or_opt(percurso, distancia, vizinhos, a, tamanho_maximo):
+    """
+    Procura uma realocação de segmento (Or-opt) começando em a, com até
+    tamanho_maximo cidades, para junto de um dos vizinhos de suas pontas.
+    O segmento pode entrar nos dois sentidos.
+
+    Returns:
+        tuple: (ganho, cidades afetadas) ou None quando não há melhora
+    """
+    n = len(percurso)
+    s1 = a
+    s2 = a
+    segmento = {a}
+    for tamanho in range(1, tamanho_maximo + 1):
+        if tamanho > 1:
+            s2 = percurso.proximo(s2)
+            segmento.add(s2)
+        if n < tamanho + 3:
+            break
+        p = percurso.anterior(s1)
+        nx = percurso.proximo(s2)
+        ganho_remocao = distancia(p, s1) + distancia(s2, nx) - distancia(p, nx)
+        if ganho_remocao <= _EPSILON:
+            continue
+
+        melhor = None
+        for ponta in (s1, s2):
+            for c in vizinhos[ponta]:
+                if distancia(ponta, c) >= ganho_remocao:
+                    break
+                if c in segmento:
+                    continue
+                for x, y in ((c, percurso.proximo(c)), (percurso.anterior(c), c)):
+                    if x in segmento or y in segmento or x == nx or y == p:
+                        continue
+                    d_xy = distancia(x, y)
+                    # Entrada invertida (x, s2 ... s1, y) ou direta (x, s1 ... s2, y)
+                    invertido = distancia(x, s2) + distancia(s1, y) - d_xy
+                    direto = distancia(x, s1) + distancia(s2, y) - d_xy
+                    acrescimo = min(invertido, direto)
+                    if acrescimo - ganho_remocao < -_EPSILON and \
+                            (melhor is None or acrescimo < melhor[0]):
+                        melhor = (acrescimo, x, y, direto < invertido)
+        if melhor is None:
+            continue
+
+        acrescimo, x, y, direto = melhor
+        mover_segmento(percurso, s1, s2, x, y, direto)
+        return ganho_remocao - acrescimo, (p, nx, s1, s2, x, y)
+    return None
+
+class _CustosSentido:
+    """
+    Somas de prefixo, pela posição no percurso, dos custos de cada aresta
+    no sentido de percurso e no sentido contrário. Com custos assimétricos
+    inverter um trecho muda o custo das arestas internas; a diferença sai
+    em O(1) destas somas, refeitas (em O(n), vetorizado) só depois de cada
+    movimento aplicado.
+    """
+    def __init__(self, percurso, matriz):
+        self.percurso = percurso
+        self.matriz = matriz
+        self._ida = None
+
+    def invalidar(self):
+        self._ida = None
+
+    def variacao_inversao(self, b, c):
+        # Custo do trecho b ... c percorrido ao contrário menos o custo no sentido atual
+        if self._ida is None:
+            ordem = self.percurso.ordem
+            seguintes = np.roll(ordem, -1)
+            self._ida = np.concatenate([[0.0], np.cumsum(self.matriz[ordem, seguintes], dtype=np.float64)])
+            self._volta = np.concatenate([[0.0], np.cumsum(self.matriz[seguintes, ordem], dtype=np.float64)])
+        i = int(self.percurso.posicao[b])
+        j = int(self.percurso.posicao[c])
+        if i <= j:
+            return float(self._volta[j] - self._volta[i] - self._ida[j] + self._ida[i])
+        return float(self._volta[-1] - self._volta[i] + self._volta[j]
+                     - self._ida[-1] + self._ida[i] - self._ida[j])
+
+def _tentar_2opt_assimetrico(percurso, distancia, vizinhos, a, sentido):
+    """
+    2-opt para custos assimétricos: troca (a, b) e (c, d) por (a, c) e
+    (b, d), com b = proximo(a) e d = proximo(c), e soma ao ganho a mudança
+    de custo do trecho b ... c, que passa a ser percorrido ao contrário.
+    """
+    b = percurso.proximo(a)
+    d_ab = distancia(a, b)
+    for c in vizinhos[a]:
+        d_ac = distancia(a, c)
+        if d_ac >= d_ab:
+            break
+        d = percurso.proximo(c)
+        if c == b or d == a:
+            continue
+        delta = d_ac + distancia(b, d) - d_ab - distancia(c, d) + sentido.variacao_inversao(b, c)
+        if delta < -_EPSILON:
+            percurso.inverter(b, c)
+            return -delta, (a, b, c, d)
+    return None
+
+def _tentar_or_opt_assimetrico(percurso, distancia, vizinhos, a, tamanho_maximo):
+    """
+    Or-opt para custos assimétricos: o segmento só entra no sentido
+    original, então apenas as três arestas trocadas mudam de custo.
+    """
+    n = len(percurso)
+    s2 = a
+    segmento = {a}
+    for tamanho in range(1, tamanho_maximo + 1):
+        if tamanho > 1:
+            s2 = percurso.proximo(s2)
+            segmento.add(s2)
+        if n < tamanho + 3:
+            break
+        p = percurso.anterior(a)
+        nx = percurso.proximo(s2)
+        ganho_remocao = distancia(p, a) + distancia(s2, nx) - distancia(p, nx)
+        if ganho_remocao <= _EPSILON:
+            continue
+
+        melhor = None
+        for ponta in (a, s2):
+            for c in vizinhos[ponta]:
+                if c in segmento:
+                    continue
+                for x, y in ((c, percurso.proximo(c)), (percurso.anterior(c), c)):
+                    if x in segmento or y in segmento or x == nx or y == p:
+                        continue
+                    acrescimo = distancia(x, a) + distancia(s2, y) - distancia(x, y)
+                    if acrescimo - ganho_remocao < -_EPSILON and (melhor is None or acrescimo < melhor[0]):
+                        melhor = (acrescimo, x, y)
+        if melhor is None:
+            continue
+
+        acrescimo, x, y = melhor
+        mover_segmento(percurso, a, s2, x, y, True)
+        return ganho_remocao - acrescimo, (p, nx, a, s2, x, y)
+    return None
+
+def busca_local(percurso, matriz_distancias, vizinhos=None, k=10, ativos=None, or_opt=True,
+                tamanho_segmento=3, simetrica=None):
+    """
+    Busca local 2-opt + Or-opt com listas de vizinhos e "don't look bits":
+    só as cidades da fila são examinadas, e uma cidade volta para a fila
+    apenas quando uma aresta sua muda. Assim uma rota já boa é refinada em
+    tempo quase linear.
+
+    Args:
+        percurso (Percurso ou PercursoDoisNiveis): Percurso modificado no lugar
+        matriz_distancias: Lista de listas, np.ndarray ou OraculoDistancias
+        vizinhos (list, opcional): Listas de candidatos por cidade
+        k (int): Tamanho das listas de candidatos quando não informadas
+        ativos (iterable, opcional): Cidades examinadas no início (padrão: todas)
+        or_opt (bool): Também tenta realocar segmentos
+        tamanho_segmento (int): Maior segmento movido pelo Or-opt
+        simetrica (bool, opcional): Se os custos são simétricos; por padrão
+            verifica a matriz. Com custos assimétricos o percurso (que deve
+            ser um Percurso) passa a ter sentido fixo e os ganhos levam em
+            conta o sentido de cada aresta
+
+    Returns:
+        float: Redução total do custo do percurso
+    """
+    n = len(percurso)
+    if n < 5:
+        return 0.0
+    distancia = funcao_distancia(matriz_distancias)
+    if vizinhos is None:
+        vizinhos = vizinhos_candidatos(matriz_distancias, k)
+    if simetrica is None:
+        simetrica = matriz_simetrica(matriz_distancias)
+    sentido = None
+    if not simetrica:
+        if not isinstance(percurso, Percurso):
+            raise ValueError("Custos assimétricos exigem um Percurso (lista de um nível)")
+        percurso.sentido_fixo = True
+        sentido = _CustosSentido(percurso, np.asarray(matriz_distancias))
+
+    fila = deque(range(n) if ativos is None else ativos)
+    na_fila = [False] * n
+    for cidade in fila:
+        na_fila[cidade] = True
+
+    ganho_total = 0.0
+    while fila:
+        a = fila.popleft()
+        na_fila[a] = False
+
+        if sentido is None:
+            resultado = _tentar_2opt(percurso, distancia, vizinhos, a)
+            if resultado is None and or_opt:
+                resultado = _tentar_or_opt(percurso, distancia, vizinhos, a, tamanho_segmento)
+        else:
+            resultado = _tentar_2opt_assimetrico(percurso, distancia, vizinhos, a, sentido)
+            if resultado is None and or_opt:
+                resultado = _tentar_or_opt_assimetrico(percurso, distancia, vizinhos, a, tamanho_segmento)
+        if resultado is None:
+            continue
+        if sentido is not None:
+            sentido.invalidar()
+
+        ganho, afetadas = resultado
+        ganho_total += ganho
+        for cidade in afetadas:
+            if not na_fila[cidade]:
+                na_fila[cidade] = True
+                fila.append(cidade)
+    return ganho_total
+
+def melhorar_rota(rota, matriz_distancias, k=10, or_opt=True):
+    """
+    Aplica a busca local a uma rota em forma de lista (com custos
+    assimétricos, mantendo o sentido em que a rota é percorrida).
+
+    Args:
+        rota (list): Índices das cidades na ordem de visita
+        matriz_distancias: Lista de listas, np.ndarray ou OraculoDistancias
+        k (int): Tamanho das listas de candidatos
+        or_opt (bool): Também tenta realocar segmentos
+
+    Returns:
+        tuple: (rota melhorada, custo)
+    """
+    percurso = criar_percurso(rota)
+    busca_local(percurso, matriz_distancias, k=k, or_opt=or_opt)
+    rota = percurso.como_lista()
+    return rota, custo_rota(rota, matriz_distancias)
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+
+from ler_arquivo_tsp import InstanciaTSP, ler_instancia_tsp
+from distancias import matriz_distancias_instancia
+from limite_inferior import limite_held_karp
+
+DIRETORIO_CACHE = os.environ.get('FLYFOOD_CACHE',
+                                 os.path.join(os.path.expanduser('~'), '.cache', 'flyfood'))
+TAMANHO_MAXIMO_CACHE = 2 * 2**30
+
+class CacheInstancias:
+    """
+    Cache em disco de instâncias já lidas e de suas matrizes de custos.
+
+    Cada instância fica em um diretório nomeado pelo hash SHA-256 do conteúdo
+    do arquivo .tsp, com as coordenadas e cada matriz (uma por tipo de
+    distância) salvas em .npy e lidas de volta com memory mapping. Quando o
+    tamanho total passa do limite, as entradas usadas há mais tempo são
+    removidas.
+
+    Args:
+        diretorio (str): Raiz do cache (padrão: $FLYFOOD_CACHE ou ~/.cache/flyfood)
+        tamanho_maximo (int): Limite em bytes para o cache inteiro
+    """
+    def __init__(self, diretorio=None, tamanho_maximo=TAMANHO_MAXIMO_CACHE):
+        self.diretorio = diretorio or DIRETORIO_CACHE
+        self.tamanho_maximo = tamanho_maximo
+        self._hashes = {}
+
+    def chave(self, caminho_arquivo):
+        """
+        Hash do conteúdo do arquivo, memorizado por caminho, tamanho e data de
+        modificação para não reler o arquivo a cada chamada.
+        """
+        estado = os.stat(caminho_arquivo)
+        identificador = (os.path.abspath(caminho_arquivo), estado.st_size, estado.st_mtime_ns)
+        if identificador not in self._hashes:
+            resumo = hashlib.sha256()
+            with open(caminho_arquivo, 'rb') as arquivo:
+                for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+                    resumo.update(bloco)
+            self._hashes[identificador] = resumo.hexdigest()
+        return self._hashes[identificador]
+
+    def _diretorio_entrada(self, chave):
+        return os.path.join(self.diretorio, chave[:32])
+
+    def _salvar(self, caminho, array):
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as arquivo:
+            np.save(arquivo, np.ascontiguousarray(array))
+        os.replace(temporario, caminho)
+
+    def _marcar_uso(self, entrada):
+        os.utime(entrada)
+
+    def carregar_instancia(self, caminho_arquivo):
+        """
+        Lê a instância do cache ou, na primeira vez, do arquivo .tsp.
+
+        Args:
+            caminho_arquivo (str): Caminho do arquivo TSPLIB
+
+        Returns:
+            InstanciaTSP: Instância com as coordenadas em memory mapping
+        """
+        entrada = self._diretorio_entrada(self.chave(caminho_arquivo))
+        arquivo_metadados = os.path.join(entrada, 'instancia.json')
+
+        if not os.path.exists(arquivo_metadados):
+            instancia = ler_instancia_tsp(caminho_arquivo)
+            os.makedirs(entrada, exist_ok=True)
+            for nome in ('coordenadas', 'matriz_pesos', 'demandas'):
+                valor = getattr(instancia, nome)
+                if valor is not None:
+                    self._salvar(os.path.join(entrada, f'{nome}.npy'), valor)
+            temporario = arquivo_metadados + '.tmp'
+            with open(temporario, 'w') as arquivo:
+                json.dump({
+                    'nome': instancia.nome,
+                    'dimensao': instancia.dimensao,
+                    'tipo_peso': instancia.tipo_peso,
+                    'depositos': instancia.depositos,
+                    'metadados': instancia.metadados,
+                }, arquivo)
+            os.replace(temporario, arquivo_metadados)
+            self._despejar(manter=entrada)
+
+        self._marcar_uso(entrada)
+        with open(arquivo_metadados) as arquivo:
+            dados = json.load(arquivo)
+
+        def carregar(nome):
+            caminho = os.path.join(entrada, f'{nome}.npy')
+            return np.load(caminho, mmap_mode='r') if os.path.exists(caminho) else None
+
+        return InstanciaTSP(
+            nome=dados['nome'],
+            dimensao=dados['dimensao'],
+            tipo_peso=dados['tipo_peso'],
+            coordenadas=carregar('coordenadas'),
+            matriz_pesos=carregar('matriz_pesos'),
+            demandas=carregar('demandas'),
+            depositos=dados['depositos'],
+            metadados=dados['metadados'],
+        )
+
+    def carregar_matriz(self, caminho_arquivo, tipo='euclidiana', tipo_custo=None):
+        """
+        Devolve a matriz de custos da instância, calculando e salvando-a
+        apenas na primeira vez para cada tipo de distância e de custo.
+
+        Args:
+            caminho_arquivo (str): Caminho do arquivo TSPLIB
+            tipo (str): Tipo de distância aceito por matriz_distancias_instancia
+            tipo_custo (str): 'float64', 'float32' ou 'int32' (padrão: float64
+                para 'euclidiana' e int32 para os demais)
+
+        Returns:
+            np.ndarray: Matriz n x n somente leitura em memory mapping
+        """
+        tipo_custo = tipo_custo or ('float64' if tipo == 'euclidiana' else 'int32')
+        instancia = self.carregar_instancia(caminho_arquivo)
+        entrada = self._diretorio_entrada(self.chave(caminho_arquivo))
+        caminho_matriz = os.path.join(entrada, f'matriz_{tipo}_{tipo_custo}.npy')
+
+        if not os.path.exists(caminho_matriz):
+            self._salvar(caminho_matriz, matriz_distancias_instancia(instancia, tipo, tipo_custo))
+            self._despejar(manter=entrada)
+
+        return np.load(caminho_matriz, mmap_mode='r')
+
+    def carregar_limite_inferior(self, caminho_arquivo, tipo='tsplib', tipo_custo=None):
+        """
+        Limitante de Held-Karp da instância, calculado uma única vez por tipo
+        de distância e guardado junto com a matriz.
+
+        Returns:
+            float: Limitante inferior para o custo de qualquer percurso
+        """
+        tipo_custo = tipo_custo or ('float64' if tipo == 'euclidiana' else 'int32')
+        matriz = self.carregar_matriz(caminho_arquivo, tipo, tipo_custo)
+        entrada = self._diretorio_entrada(self.chave(caminho_arquivo))
+        caminho_limite = os.path.join(entrada, f'limite_{tipo}_{tipo_custo}.json')
+
+        if not os.path.exists(caminho_limite):
+            limite, _ = limite_held_karp(matriz)
+            temporario = caminho_limite + '.tmp'
+            with open(temporario, 'w') as arquivo:
+                json.dump({'limite_held_karp': limite}, arquivo)
+            os.replace(temporario, caminho_limite)
+
+        with open(caminho_limite) as arquivo:
+            return json.load(arquivo)['limite_held_karp']
+
+    def tamanho(self):
+        return sum(tamanho for _, _, tamanho in self._entradas())
+
+    def _entradas(self):
+        if not os.path.isdir(self.diretorio):
+            return []
+        entradas = []
+        for nome in os.listdir(self.diretorio):
+            entrada = os.path.join(self.diretorio, nome)
+            if not os.path.isdir(entrada):
+                continue
+            tamanho = sum(os.path.getsize(os.path.join(entrada, arquivo))
+                          for arquivo in os.listdir(entrada))
+            entradas.append((os.path.getmtime(entrada), entrada, tamanho))
+        return entradas
+
+    def _despejar(self, manter=None):
+        entradas = sorted(self._entradas())
+        total = sum(tamanho for _, _, tamanho in entradas)
+        for _, entrada, tamanho in entradas:
+            if total <= self.tamanho_maximo:
+                break
+            if entrada == manter:
+                continue
+            shutil.rmtree(entrada, ignore_errors=True)
+            self._despejada(entrada)
+            total -= tamanho
+
+    def _despejada(self, entrada):
+        # Ponto de extensão para subclasses que mantêm índices das entradas em memória
+        pass
+
+    def limpar(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+
+_cache_padrao = None
+
+def cache_padrao():
+    global _cache_padrao
+    if _cache_padrao is None:
+        _cache_padrao = CacheInstancias()
+    return _cache_padrao
+
+def carregar_instancia(caminho_arquivo):
+    return cache_padrao().carregar_instancia(caminho_arquivo)
+
+def carregar_matriz(caminho_arquivo, tipo='euclidiana', tipo_custo=None):
+    return cache_padrao().carregar_matriz(caminho_arquivo, tipo, tipo_custo)
+
+def carregar_limite_inferior(caminho_arquivo, tipo='tsplib', tipo_custo=None):
+    return cache_padrao().carregar_limite_inferior(caminho_arquivo, tipo, tipo_custo)
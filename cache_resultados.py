@@ -0,0 +1,371 @@
+import hashlib
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+import numpy as np
+
+from cache_instancias import DIRETORIO_CACHE, TAMANHO_MAXIMO_CACHE, CacheInstancias
+from distancias import OraculoDistancias, custo_rota, matriz_distancias_numpy
+from instrumentacao import Instrumentacao, instrumentacao_padrao
+
+# Coordenadas são comparadas depois de arredondadas para esta quantidade de casas decimais
+CASAS_DECIMAIS = 6
+RESULTADOS_EM_MEMORIA = 256
+# Fração mínima de pontos em comum para aproveitar um percurso de outro conjunto
+LIMIAR_SEMELHANCA = 0.8
+
+def configuracao_solver(solver, tipo='euclidiana', parametros=None, resumo_matriz=None):
+    # A semente fica de fora: execuções com sementes diferentes compartilham o cache
+    configuracao = {'solver': solver, 'tipo': tipo, 'parametros': parametros or {}}
+    if resumo_matriz is not None:
+        # Matriz própria (vento, obstáculos...): o tipo sozinho não diz quais são os custos
+        configuracao['matriz'] = resumo_matriz
+    return json.dumps(configuracao, sort_keys=True, default=str)
+
+def quantizar(cidades, casas=CASAS_DECIMAIS):
+    return np.round(np.asarray(cidades, dtype=np.float64)[:, :2] * 10.0**casas).astype(np.int64)
+
+def _ordem_canonica(pontos):
+    return np.lexsort((pontos[:, 1], pontos[:, 0]))
+
+def resumo_matriz(cidades, matriz_distancias, casas=CASAS_DECIMAIS):
+    """
+    Hash de uma matriz de custos com as linhas e colunas na ordem canônica
+    das cidades, para que a mesma matriz com as cidades em outra ordem dê a
+    mesma chave. O oráculo calcula distâncias euclidianas das próprias
+    coordenadas e não tem resumo (None).
+    """
+    if isinstance(matriz_distancias, OraculoDistancias):
+        return None
+    ordem = _ordem_canonica(quantizar(cidades, casas))
+    matriz = np.asarray(matriz_distancias, dtype=np.float64)[np.ix_(ordem, ordem)]
+    return hashlib.sha256(np.ascontiguousarray(matriz).tobytes()).hexdigest()
+
+def impressao_digital(cidades, configuracao, casas=CASAS_DECIMAIS):
+    """
+    Identificador do conjunto de pontos que não depende da ordem das
+    cidades: as coordenadas arredondadas são ordenadas antes do hash.
+
+    Returns:
+        tuple: (chave do conjunto com a configuração, chave da configuração,
+            ordem canônica: a posição p da forma canônica é a cidade ordem[p])
+    """
+    pontos = quantizar(cidades, casas)
+    ordem = _ordem_canonica(pontos)
+    chave_configuracao = hashlib.sha256(configuracao.encode()).hexdigest()
+    resumo = hashlib.sha256(chave_configuracao.encode())
+    resumo.update(np.ascontiguousarray(pontos[ordem]).tobytes())
+    return resumo.hexdigest(), chave_configuracao, ordem
+
+def _custos_insercao(matriz, a, b, c):
+    # Custo de inserir c entre cada par (a[i], b[i])
+    if isinstance(matriz, OraculoDistancias):
+        cs = np.full(len(a), c)
+        return matriz.distancias_pares(a, cs) + matriz.distancias_pares(cs, b) - matriz.distancias_pares(a, b)
+    return matriz[a, c] + matriz[c, b] - matriz[a, b]
+
+def adaptar_percurso(pontos_antigos, percurso_antigo, cidades, matriz_distancias, casas=CASAS_DECIMAIS):
+    """
+    Aproveita o percurso de um conjunto parecido: as cidades em comum
+    seguem a ordem antiga e as novas entram, uma a uma, na posição de
+    menor acréscimo (inserção mais barata). Cidades que saíram são puladas.
+
+    Args:
+        pontos_antigos (np.ndarray): Coordenadas quantizadas do conjunto antigo
+        percurso_antigo (array): Percurso sobre pontos_antigos
+        cidades (list): Coordenadas do conjunto novo
+        matriz_distancias: Matriz de custos do conjunto novo
+
+    Returns:
+        list: Percurso sobre as cidades novas
+    """
+    matriz = matriz_distancias
+    if not isinstance(matriz, OraculoDistancias):
+        matriz = np.asarray(matriz)
+    posicoes = {}
+    for cidade, ponto in enumerate(map(tuple, quantizar(cidades, casas).tolist())):
+        posicoes.setdefault(ponto, []).append(cidade)
+    percurso = []
+    for ponto in map(tuple, np.asarray(pontos_antigos)[np.asarray(percurso_antigo)].tolist()):
+        if posicoes.get(ponto):
+            percurso.append(posicoes[ponto].pop())
+    novas = [cidade for restantes in posicoes.values() for cidade in restantes]
+    if len(percurso) < 2:
+        return percurso + novas
+    for cidade in novas:
+        rota = np.asarray(percurso)
+        acrescimos = _custos_insercao(matriz, rota, np.roll(rota, -1), cidade)
+        percurso.insert(int(np.argmin(acrescimos)) + 1, cidade)
+    return percurso
+
+class CacheResultados(CacheInstancias):
+    """
+    Cache de percursos já resolvidos, indexado pelo conjunto de pontos (sem
+    depender da ordem das cidades) e pela configuração do solver.
+
+    Os resultados recentes ficam num LRU em memória e todos vão para o
+    disco, uma entrada por diretório, com o despejo das menos usadas de
+    CacheInstancias. O percurso é guardado em índices da ordem canônica,
+    então volta certo mesmo que o pedido traga as cidades em outra ordem.
+    Para quase acertos (poucas entradas ou saídas de cidades), semelhante()
+    procura, entre os resultados da mesma configuração, o de maior
+    sobreposição de pontos e adapta o seu percurso.
+
+    Args:
+        diretorio (str, opcional): Raiz do cache em disco (padrão:
+            $FLYFOOD_CACHE/resultados)
+        tamanho_maximo (int): Limite em bytes para o disco
+        capacidade_memoria (int): Resultados mantidos no LRU em memória
+        casas (int): Casas decimais consideradas nas coordenadas
+    """
+    def __init__(self, diretorio=None, tamanho_maximo=TAMANHO_MAXIMO_CACHE, capacidade_memoria=RESULTADOS_EM_MEMORIA,
+                 casas=CASAS_DECIMAIS):
+        super().__init__(diretorio or os.path.join(DIRETORIO_CACHE, 'resultados'), tamanho_maximo)
+        self.capacidade_memoria = capacidade_memoria
+        self.casas = casas
+        self._memoria = OrderedDict()
+        # Por configuração: chave -> conjunto de pontos, para a busca de quase acertos
+        self._indices = {}
+
+    def _diretorio_entrada(self, chave, chave_configuracao=None):
+        # O prefixo da configuração agrupa no disco as entradas comparáveis entre si
+        return os.path.join(self.diretorio, (chave_configuracao or '')[:16] + chave[:32])
+
+    def _lembrar(self, chave, entrada):
+        self._memoria[chave] = entrada
+        self._memoria.move_to_end(chave)
+        if len(self._memoria) > self.capacidade_memoria:
+            self._memoria.popitem(last=False)
+
+    def _entrada(self, chave, chave_configuracao):
+        chave = chave[:32]
+        if chave in self._memoria:
+            self._memoria.move_to_end(chave)
+            return self._memoria[chave]
+        diretorio = self._diretorio_entrada(chave, chave_configuracao)
+        arquivo = os.path.join(diretorio, 'resultado.npz')
+        if not os.path.exists(arquivo):
+            return None
+        try:
+            with np.load(arquivo) as dados:
+                entrada = {'pontos': dados['pontos'], 'percurso': dados['percurso'], 'custo': float(dados['custo'])}
+        except (OSError, ValueError, KeyError):
+            return None
+        self._marcar_uso(diretorio)
+        self._lembrar(chave, entrada)
+        return entrada
+
+    def buscar(self, cidades, configuracao):
+        """
+        Returns:
+            tuple ou None: (percurso nos índices de cidades, custo guardado)
+        """
+        chave, chave_configuracao, ordem = impressao_digital(cidades, configuracao, self.casas)
+        entrada = self._entrada(chave, chave_configuracao)
+        if entrada is None:
+            return None
+        return ordem[entrada['percurso']].tolist(), entrada['custo']
+
+    def guardar(self, cidades, configuracao, percurso, custo):
+        chave, chave_configuracao, ordem = impressao_digital(cidades, configuracao, self.casas)
+        canonica = np.empty(len(ordem), dtype=np.int64)
+        canonica[ordem] = np.arange(len(ordem))
+        entrada = {'pontos': quantizar(cidades, self.casas)[ordem], 'percurso': canonica[np.asarray(percurso)],
+                   'custo': float(custo)}
+        self._lembrar(chave[:32], entrada)
+        indice = self._indices.get(chave_configuracao)
+        if indice is not None:
+            indice[chave[:32]] = set(map(tuple, entrada['pontos'].tolist()))
+
+        diretorio = self._diretorio_entrada(chave, chave_configuracao)
+        os.makedirs(diretorio, exist_ok=True)
+        arquivo = os.path.join(diretorio, 'resultado.npz')
+        temporario = arquivo + '.tmp'
+        with open(temporario, 'wb') as saida:
+            np.savez(saida, **entrada)
+        os.replace(temporario, arquivo)
+        self._despejar(manter=diretorio)
+
+    def _despejada(self, entrada):
+        nome = os.path.basename(entrada)
+        self._memoria.pop(nome[16:], None)
+        for chave_configuracao, indice in self._indices.items():
+            if chave_configuracao.startswith(nome[:16]):
+                indice.pop(nome[16:], None)
+
+    def _indice(self, chave_configuracao):
+        # Lido do disco uma única vez por configuração e mantido em dia por guardar()
+        if chave_configuracao not in self._indices:
+            indice = {}
+            prefixo = chave_configuracao[:16]
+            for _, diretorio, _ in self._entradas():
+                nome = os.path.basename(diretorio)
+                if not nome.startswith(prefixo):
+                    continue
+                try:
+                    with np.load(os.path.join(diretorio, 'resultado.npz')) as dados:
+                        pontos = dados['pontos']
+                except (OSError, ValueError, KeyError):
+                    continue
+                indice[nome[16:]] = set(map(tuple, pontos.tolist()))
+            self._indices[chave_configuracao] = indice
+        return self._indices[chave_configuracao]
+
+    def semelhante(self, cidades, configuracao, matriz_distancias=None, limiar=LIMIAR_SEMELHANCA):
+        """
+        Quase acerto: o resultado guardado da mesma configuração com mais
+        pontos em comum, se a sobreposição (pontos em comum sobre o maior
+        dos dois conjuntos) atingir o limiar, adaptado às cidades pedidas.
+
+        Returns:
+            tuple ou None: (percurso adaptado, sobreposição)
+        """
+        _, chave_configuracao, _ = impressao_digital(cidades, configuracao, self.casas)
+        pontos = set(map(tuple, quantizar(cidades, self.casas).tolist()))
+        melhor, melhor_sobreposicao = None, limiar
+        for chave, outros in self._indice(chave_configuracao).items():
+            maior = max(len(pontos), len(outros))
+            # Conjuntos de tamanhos muito diferentes não podem atingir o limiar
+            if min(len(pontos), len(outros)) < melhor_sobreposicao * maior:
+                continue
+            sobreposicao = len(pontos & outros) / maior
+            if sobreposicao >= melhor_sobreposicao:
+                melhor, melhor_sobreposicao = chave, sobreposicao
+        if melhor is None:
+            return None
+        entrada = self._entrada(melhor, chave_configuracao)
+        if entrada is None:
+            return None
+        if matriz_distancias is None:
+            matriz_distancias = matriz_distancias_numpy(cidades)
+        percurso = adaptar_percurso(entrada['pontos'], entrada['percurso'], cidades, matriz_distancias, self.casas)
+        return percurso, melhor_sobreposicao
+
+_cache_padrao = None
+
+def cache_padrao():
+    global _cache_padrao
+    if _cache_padrao is None:
+        _cache_padrao = CacheResultados()
+    return _cache_padrao
+
+def _matriz_densa(matriz, solver):
+    # Genético e formigas trabalham sobre listas de listas: o oráculo (instâncias grandes) não cabe nelas
+    if isinstance(matriz, OraculoDistancias):
+        raise ValueError(f"O solver {solver} precisa de uma matriz densa; use 'ils' ou 'lk' com o oráculo")
+    return np.asarray(matriz).tolist()
+
+def _resolver(solver, cidades, matriz, semente, parametros, inicial, reforco):
+    silenciosa = Instrumentacao(saidas=[], medir=False)
+    if solver in ('ils', 'lk'):
+        if solver == 'ils':
+            from alg_ils import resolver_caixeiro_viajante_ils as resolver
+        else:
+            from alg_lin_kernighan import resolver_caixeiro_viajante_lk as resolver
+        if inicial is not None:
+            parametros = dict(parametros, percurso_inicial=inicial)
+        percurso, _ = resolver(cidades, matriz, semente=semente, instrumentacao=silenciosa, **parametros)
+        return percurso
+    if solver == 'genetico':
+        from alg_genetico import evolucao
+        random.seed(semente)
+        parametros = dict({'numero_individuo': 50, 'numero_geracoes': 100, 'taxa_cruzamento': 0.9,
+                           'taxa_mutacao': 0.1}, **parametros)
+        # O percurso aproveitado entra como indivíduo de elite da população inicial
+        _, _, percurso = evolucao(cidades, matriz_distancias=_matriz_densa(matriz, solver), instrumentacao=silenciosa,
+                                  populacao_inicial=None if inicial is None else [inicial], **parametros)
+        return percurso
+    if solver == 'formigas':
+        from alg_formigas import ACO, Grafo
+        random.seed(semente)
+        parametros = dict({'quantidade_formigas': 10, 'geracoes': 20, 'alpha': 1.0, 'beta': 2.0, 'rho': 0.5,
+                           'Q': 100, 'estrategia': 2}, **parametros)
+        grafo = Grafo(_matriz_densa(matriz, solver), len(cidades))
+        if inicial is not None:
+            # Viés inicial de feromônio nas arestas do percurso aproveitado
+            grafo.reforcar_percurso(inicial, reforco)
+        percurso, _ = ACO(**parametros).resolver(grafo, silenciosa)
+        return percurso
+    from alg_decomposicao import SOLVERS_CLUSTER
+    if solver not in SOLVERS_CLUSTER:
+        raise ValueError(f"Solver desconhecido: {solver}")
+    percurso = SOLVERS_CLUSTER[solver](np.asarray(cidades, dtype=np.float64), matriz, semente, **parametros)
+    # Solvers construtivos não partem de um percurso: fica o melhor dos dois
+    if inicial is not None and custo_rota(inicial, matriz) < custo_rota(percurso, matriz):
+        return inicial
+    return percurso
+
+def resolver_com_cache(cidades, solver='lk', matriz_distancias=None, parametros=None, tipo='euclidiana', semente=None,
+                       cache=None, limiar=LIMIAR_SEMELHANCA, reforco=0.5, instrumentacao=None):
+    """
+    Resolve o TSP consultando antes o cache de resultados:
+
+    1. Acerto (mesmo conjunto de pontos, em qualquer ordem, e mesma
+       configuração): devolve o percurso guardado sem rodar o solver
+    2. Quase acerto: o percurso do conjunto mais parecido, adaptado, é o
+       ponto de partida do solver (percurso inicial do ILS/LK, indivíduo de
+       elite do genético ou reforço de feromônio das formigas)
+    3. Falta: resolve do zero
+
+    Em 2 e 3 o resultado é guardado para os próximos pedidos.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        solver (str): 'ils', 'lk', 'genetico', 'formigas' ou outro de
+            alg_decomposicao.SOLVERS_CLUSTER
+        matriz_distancias (opcional): Matriz de custos das cidades
+        parametros (dict, opcional): Parâmetros do solver (fazem parte da chave)
+        tipo (str): Tipo de distância da matriz (faz parte da chave, assim
+            como o resumo da matriz_distancias, quando ela é dada)
+        semente (int, opcional): Semente do solver (não faz parte da chave)
+        cache (CacheResultados, opcional): Padrão: cache_padrao()
+        limiar (float): Sobreposição mínima para um quase acerto
+        reforco (float): Feromônio extra nas arestas aproveitadas pelas formigas
+        instrumentacao (Instrumentacao, opcional): Cronômetros e eventos
+
+    Returns:
+        tuple: Percurso e distância total
+    """
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    inicio = time.perf_counter()
+    cache = cache or cache_padrao()
+    parametros = dict(parametros or {})
+    resumo = None if matriz_distancias is None else resumo_matriz(cidades, matriz_distancias, cache.casas)
+    configuracao = configuracao_solver(solver, tipo, parametros, resumo)
+    if matriz_distancias is None:
+        from alg_ils import LIMITE_MATRIZ
+        if len(cidades) <= LIMITE_MATRIZ:
+            matriz_distancias = matriz_distancias_numpy(cidades)
+        else:
+            matriz_distancias = OraculoDistancias(cidades)
+
+    with instrumentacao.fase('cache'):
+        encontrado = cache.buscar(cidades, configuracao)
+    if encontrado is not None:
+        resultado, percurso = 'acerto', encontrado[0]
+    else:
+        with instrumentacao.fase('cache'):
+            semelhante = cache.semelhante(cidades, configuracao, matriz_distancias, limiar)
+        inicial = None if semelhante is None else semelhante[0]
+        resultado = 'falta' if semelhante is None else 'quase_acerto'
+        with instrumentacao.fase('solver'):
+            percurso = [int(cidade) for cidade in
+                        _resolver(solver, cidades, matriz_distancias, semente, parametros, inicial, reforco)]
+        cache.guardar(cidades, configuracao, percurso, custo_rota(percurso, matriz_distancias))
+    instrumentacao.contar(f'cache_{resultado}')
+
+    distancia = custo_rota(percurso, matriz_distancias)
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('cache.resultado', resultado=resultado, distancia=distancia,
+                              tempo=time.perf_counter() - inicio)
+    return percurso, distancia
+
+if __name__ == "__main__":
+    from ler_arquivo_tsp import ler_instancia_tsp
+
+    cidades = ler_instancia_tsp('tsp/berlin52.tsp').cidades()
+    resolver_com_cache(cidades, 'lk', parametros={'tempo_limite': 1.0}, semente=0)
+    resolver_com_cache(cidades[::-1], 'lk', parametros={'tempo_limite': 1.0}, semente=0)
+    resolver_com_cache(cidades[:-3], 'lk', parametros={'tempo_limite': 1.0}, semente=0)
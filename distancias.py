@@ -0,0 +1,546 @@
+import math
+from collections import OrderedDict
+from functools import partial
+import numpy as np
+
+# Tipos de custo aceitos pelo motor de distâncias. Os inteiros seguem o
+# arredondamento da TSPLIB, então os custos batem com os ótimos publicados.
+TIPOS_CUSTO = {
+    'float64': np.float64,
+    'float32': np.float32,
+    'int32': np.int32,
+}
+
+# Ótimos publicados na TSPLIB para as instâncias do repositório
+OTIMOS_TSPLIB = {
+    'berlin52': 7542,
+    'bier127': 118282,
+}
+
+_RAIO_TERRA_TSPLIB = 6378.388
+# Raio médio da Terra em km, para coordenadas (latitude, longitude) em graus decimais
+RAIO_TERRA_KM = 6371.0088
+_PI_TSPLIB = 3.141592
+
+def converter_custos(distancias, tipo_custo='float64', arredondamento=None):
+    """
+    Converte distâncias reais para o tipo de custo escolhido.
+
+    Args:
+        distancias (np.ndarray): Distâncias em float64
+        tipo_custo (str): 'float64', 'float32' ou 'int32'
+        arredondamento (str): 'nint' (inteiro mais próximo, como na TSPLIB),
+            'ceil' ou None; custos inteiros usam 'nint' por padrão
+
+    Returns:
+        np.ndarray: Custos no tipo pedido
+    """
+    dtype = TIPOS_CUSTO[tipo_custo]
+    if arredondamento is None and np.issubdtype(dtype, np.integer):
+        arredondamento = 'nint'
+    if arredondamento == 'nint':
+        distancias = np.floor(distancias + 0.5)
+    elif arredondamento == 'ceil':
+        distancias = np.ceil(distancias)
+    elif arredondamento is not None:
+        raise ValueError(f"Arredondamento desconhecido: {arredondamento}")
+    return np.asarray(distancias).astype(dtype, copy=False)
+
+def _acumulador(dtype):
+    # Somas de custos inteiros em int64 e de custos reais em float64
+    return np.int64 if np.issubdtype(dtype, np.integer) else np.float64
+
+def matriz_distancias_lista(cidades):
+    """
+    Monta a matriz de distâncias euclidianas como lista de listas,
+    calculando cada par em Python puro.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+
+    Returns:
+        list: Matriz n x n de distâncias
+    """
+    n = len(cidades)
+    matriz = [[0.0 for _ in range(n)] for _ in range(n)]
+    for i in range(n):
+        x_i, y_i = cidades[i]
+        for j in range(i + 1, n):
+            d = math.sqrt((x_i - cidades[j][0])**2 + (y_i - cidades[j][1])**2)
+            matriz[i][j] = d
+            matriz[j][i] = d
+    return matriz
+
+def matriz_distancias_numpy(cidades, tipo_custo='float64', arredondamento=None):
+    """
+    Monta a matriz de distâncias euclidianas de forma vetorizada com NumPy.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades
+        tipo_custo (str): 'float64', 'float32' ou 'int32'
+        arredondamento (str): Ver converter_custos
+
+    Returns:
+        np.ndarray: Matriz n x n de distâncias
+    """
+    coordenadas = np.asarray(cidades, dtype=np.float64)
+    x = coordenadas[:, 0]
+    y = coordenadas[:, 1]
+    distancias = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
+    if tipo_custo == 'float64' and arredondamento is None:
+        return distancias
+    return converter_custos(distancias, tipo_custo, arredondamento)
+
+def _geo_em_radianos(valores):
+    # Coordenadas GEO da TSPLIB vêm em graus.minutos (DDD.MM)
+    graus = np.trunc(valores)
+    minutos = valores - graus
+    return _PI_TSPLIB * (graus + 5.0 * minutos / 3.0) / 180.0
+
+def distancias_tsplib(origens, destinos, tipo_aresta='EUC_2D'):
+    """
+    Distâncias entre dois conjuntos de pontos pelas funções da TSPLIB, já
+    com o arredondamento que faz parte da definição de cada tipo.
+
+    Args:
+        origens (np.ndarray): Coordenadas m x 2
+        destinos (np.ndarray): Coordenadas c x 2
+        tipo_aresta (str): EUC_2D, CEIL_2D, ATT, GEO, MAN_2D ou MAX_2D
+
+    Returns:
+        np.ndarray: Matriz m x c de distâncias (float64 com valores inteiros)
+    """
+    origens = np.asarray(origens, dtype=np.float64)
+    destinos = np.asarray(destinos, dtype=np.float64)
+
+    if tipo_aresta == 'GEO':
+        latitude_o, longitude_o = _geo_em_radianos(origens[:, 0]), _geo_em_radianos(origens[:, 1])
+        latitude_d, longitude_d = _geo_em_radianos(destinos[:, 0]), _geo_em_radianos(destinos[:, 1])
+        q1 = np.cos(longitude_o[:, None] - longitude_d[None, :])
+        q2 = np.cos(latitude_o[:, None] - latitude_d[None, :])
+        q3 = np.cos(latitude_o[:, None] + latitude_d[None, :])
+        argumento = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+        distancias = np.trunc(_RAIO_TERRA_TSPLIB * np.arccos(argumento) + 1.0)
+        # A fórmula dá 1 para um ponto com ele mesmo
+        distancias[np.all(origens[:, None, :] == destinos[None, :, :], axis=2)] = 0.0
+        return distancias
+
+    dx = origens[:, 0, None] - destinos[None, :, 0]
+    dy = origens[:, 1, None] - destinos[None, :, 1]
+
+    if tipo_aresta == 'EUC_2D':
+        return np.floor(np.hypot(dx, dy) + 0.5)
+    if tipo_aresta == 'CEIL_2D':
+        return np.ceil(np.hypot(dx, dy))
+    if tipo_aresta == 'ATT':
+        r = np.sqrt((dx * dx + dy * dy) / 10.0)
+        t = np.floor(r + 0.5)
+        return np.where(t < r, t + 1.0, t)
+    if tipo_aresta == 'MAN_2D':
+        return np.floor(np.abs(dx) + np.abs(dy) + 0.5)
+    if tipo_aresta == 'MAX_2D':
+        return np.maximum(np.floor(np.abs(dx) + 0.5), np.floor(np.abs(dy) + 0.5))
+    raise ValueError(f"EDGE_WEIGHT_TYPE não suportado: {tipo_aresta}")
+
+def distancias_haversine(origens, destinos, raio=RAIO_TERRA_KM):
+    """
+    Distâncias de grande círculo (fórmula de haversine) entre pontos dados
+    como (latitude, longitude) em graus decimais, como vêm do GPS. Ao
+    contrário do GEO da TSPLIB, não há arredondamento nem o formato
+    graus.minutos.
+
+    Args:
+        origens (np.ndarray): Coordenadas m x 2
+        destinos (np.ndarray): Coordenadas c x 2
+        raio (float): Raio da Terra na unidade desejada (padrão: km)
+
+    Returns:
+        np.ndarray: Matriz m x c de distâncias
+    """
+    origens = np.radians(np.asarray(origens, dtype=np.float64)[:, :2])
+    destinos = np.radians(np.asarray(destinos, dtype=np.float64)[:, :2])
+    latitude_o, latitude_d = origens[:, 0, None], destinos[None, :, 0]
+    meia_dlat = 0.5 * (latitude_d - latitude_o)
+    meia_dlon = 0.5 * (destinos[None, :, 1] - origens[:, 1, None])
+    h = np.sin(meia_dlat) ** 2 + np.cos(latitude_o) * np.cos(latitude_d) * np.sin(meia_dlon) ** 2
+    return 2.0 * raio * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+def matriz_distancias_haversine(cidades, tipo_custo='float64', arredondamento=None):
+    """
+    Monta a matriz de distâncias de grande círculo (km) para cidades em
+    (latitude, longitude) decimais.
+
+    Args:
+        cidades (list): Coordenadas (latitude, longitude) das cidades
+        tipo_custo (str): 'float64', 'float32' ou 'int32'
+        arredondamento (str): Ver converter_custos
+
+    Returns:
+        np.ndarray: Matriz n x n de distâncias
+    """
+    coordenadas = np.asarray(cidades, dtype=np.float64)[:, :2]
+    distancias = distancias_haversine(coordenadas, coordenadas)
+    if tipo_custo == 'float64' and arredondamento is None:
+        return distancias
+    return converter_custos(distancias, tipo_custo, arredondamento)
+
+def matriz_tempos_vento(cidades, velocidade, vento=(0.0, 0.0), geografica=False, tipo_custo='float64'):
+    """
+    Matriz assimétrica de tempos de voo com vento. O drone voa a
+    `velocidade` em relação ao ar e corrige o rumo para seguir a reta até o
+    destino, então a velocidade em relação ao solo no trecho de direção u é
+    w·u + sqrt(v² - (w × u)²): vento a favor encurta a ida e alonga a
+    volta. Trechos em que o vento lateral é mais forte que o drone ficam
+    com custo infinito.
+
+    Args:
+        cidades (list): Coordenadas (x, y), ou (latitude, longitude) em
+            graus com geografica=True
+        velocidade (float): Velocidade do drone em relação ao ar
+        vento: Vetor (leste, norte) constante ou campo de vento: função
+            vento(x, y) que recebe arrays com os pontos médios dos trechos
+            (na mesma convenção das cidades) e devolve as duas componentes
+        geografica (bool): Distâncias por haversine (km) e direções no plano
+            tangente local
+        tipo_custo (str): 'float64' ou 'float32'
+
+    Returns:
+        np.ndarray: Matriz n x n de tempos (distância / velocidade em relação ao solo)
+    """
+    coordenadas = np.asarray(cidades, dtype=np.float64)[:, :2]
+    if geografica:
+        distancias = distancias_haversine(coordenadas, coordenadas)
+        radianos = np.radians(coordenadas)
+        latitude_media = 0.5 * (radianos[:, 0, None] + radianos[None, :, 0])
+        leste = (radianos[None, :, 1] - radianos[:, 1, None]) * np.cos(latitude_media)
+        norte = radianos[None, :, 0] - radianos[:, 0, None]
+    else:
+        leste = coordenadas[None, :, 0] - coordenadas[:, 0, None]
+        norte = coordenadas[None, :, 1] - coordenadas[:, 1, None]
+        distancias = np.hypot(leste, norte)
+
+    if callable(vento):
+        meio = 0.5 * (coordenadas[:, None, :] + coordenadas[None, :, :])
+        vento_leste, vento_norte = vento(meio[..., 0], meio[..., 1])
+    else:
+        vento_leste, vento_norte = vento
+
+    comprimento = np.hypot(leste, norte)
+    comprimento[comprimento == 0.0] = 1.0
+    ux, uy = leste / comprimento, norte / comprimento
+    a_favor = vento_leste * ux + vento_norte * uy
+    lateral = vento_leste * uy - vento_norte * ux
+    folga = velocidade ** 2 - lateral ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        solo = a_favor + np.sqrt(np.maximum(folga, 0.0))
+        tempos = np.where((folga > 0.0) & (solo > 0.0), distancias / solo, np.inf)
+    np.fill_diagonal(tempos, 0.0)
+    return tempos.astype(TIPOS_CUSTO[tipo_custo], copy=False)
+
+def matriz_distancias_tsplib(cidades, tipo_aresta='EUC_2D', tipo_custo='int32'):
+    """
+    Monta a matriz de custos segundo a definição da TSPLIB para o tipo de aresta.
+
+    Args:
+        cidades (list): Coordenadas (x, y) das cidades
+        tipo_aresta (str): EDGE_WEIGHT_TYPE da instância
+        tipo_custo (str): 'int32' (padrão), 'float32' ou 'float64'
+
+    Returns:
+        np.ndarray: Matriz n x n de custos
+    """
+    coordenadas = np.asarray(cidades, dtype=np.float64)[:, :2]
+    return converter_custos(distancias_tsplib(coordenadas, coordenadas, tipo_aresta), tipo_custo)
+
+# Formas disponíveis de construir a matriz de custos a partir das coordenadas
+BACKENDS_DISTANCIA = {
+    'lista': matriz_distancias_lista,
+    'numpy': matriz_distancias_numpy,
+    'numpy_float32': partial(matriz_distancias_numpy, tipo_custo='float32'),
+    'numpy_int32': partial(matriz_distancias_numpy, tipo_custo='int32'),
+}
+
+def matriz_distancias_instancia(instancia, tipo='euclidiana', tipo_custo=None):
+    """
+    Monta a matriz de custos de uma instância TSPLIB já lida.
+
+    Args:
+        instancia (InstanciaTSP): Instância de ler_instancia_tsp
+        tipo (str): 'euclidiana' (a partir das coordenadas), 'haversine'
+            (coordenadas em latitude e longitude decimais, km), 'tsplib'
+            (função e arredondamento do EDGE_WEIGHT_TYPE) ou 'explicita'
+            (EDGE_WEIGHT_SECTION do arquivo)
+        tipo_custo (str): Tipo dos custos; por padrão int32 para 'tsplib' e
+            'explicita' e float64 para 'euclidiana' e 'haversine'
+
+    Returns:
+        np.ndarray: Matriz n x n de custos
+    """
+    if tipo == 'euclidiana':
+        return matriz_distancias_numpy(instancia.coordenadas[:, :2], tipo_custo or 'float64')
+    if tipo == 'haversine':
+        return matriz_distancias_haversine(instancia.coordenadas, tipo_custo or 'float64')
+
+    tipo_custo = tipo_custo or 'int32'
+    if tipo == 'tsplib' and instancia.tipo_peso != 'EXPLICIT':
+        return matriz_distancias_tsplib(instancia.coordenadas, instancia.tipo_peso, tipo_custo)
+    if tipo in ('tsplib', 'explicita'):
+        if instancia.matriz_pesos is None:
+            raise ValueError(f"A instância {instancia.nome} não possui EDGE_WEIGHT_SECTION")
+        return converter_custos(np.asarray(instancia.matriz_pesos), tipo_custo)
+    raise ValueError(f"Tipo de distância desconhecido: {tipo}")
+
+def custo_rota(rota, matriz):
+    """
+    Custo do ciclo fechado pela rota, com acumulação em 64 bits quando a
+    matriz é um array NumPy compacto (int32 ou float32).
+
+    Args:
+        rota (list): Índices das cidades na ordem de visita
+        matriz: Matriz de custos (lista de listas, np.ndarray ou OraculoDistancias)
+
+    Returns:
+        float ou int: Custo total do ciclo
+    """
+    if isinstance(matriz, OraculoDistancias):
+        return matriz.custo_percurso(rota)
+    if isinstance(matriz, np.ndarray):
+        rota = np.asarray(rota)
+        return matriz[rota, np.roll(rota, -1)].sum(dtype=_acumulador(matriz.dtype)).item()
+    return sum(matriz[rota[i - 1]][rota[i]] for i in range(len(rota)))
+
+def custos_rotas(rotas, matriz):
+    """
+    Custos de várias rotas de mesmo tamanho em uma única operação vetorizada.
+
+    Args:
+        rotas (list): Lista de rotas (listas de índices)
+        matriz (np.ndarray ou OraculoDistancias): Matriz de custos
+
+    Returns:
+        np.ndarray: Custo de cada rota
+    """
+    rotas = np.asarray(rotas)
+    seguintes = np.roll(rotas, -1, axis=1)
+    if isinstance(matriz, OraculoDistancias):
+        return matriz.distancias_pares(rotas, seguintes).sum(axis=1, dtype=_acumulador(matriz.dtype))
+    return matriz[rotas, seguintes].sum(axis=1, dtype=_acumulador(matriz.dtype))
+
+def funcao_distancia(matriz):
+    """
+    Acesso escalar mais rápido a cada tipo de fonte de custos, para os laços
+    das buscas locais: evita criar escalares NumPy a cada consulta.
+
+    Args:
+        matriz: Lista de listas, np.ndarray ou OraculoDistancias
+
+    Returns:
+        callable: Função d(a, b) que devolve um número Python
+    """
+    if isinstance(matriz, OraculoDistancias):
+        return matriz.distancia
+    if isinstance(matriz, np.ndarray):
+        return matriz.item
+    return lambda a, b: matriz[a][b]
+
+def matriz_simetrica(matriz):
+    """
+    True se c(a, b) == c(b, a) para todo par. O oráculo calcula distâncias
+    euclidianas e é sempre simétrico; matrizes são comparadas com a
+    transposta (O(n^2), então quem chama a busca local em laço deve
+    verificar uma vez só).
+    """
+    if isinstance(matriz, OraculoDistancias):
+        return True
+    matriz = np.asarray(matriz)
+    return bool(np.array_equal(matriz, matriz.T))
+
+def vizinhos_candidatos(matriz, k):
+    """
+    Listas de candidatos das buscas locais: os k vizinhos mais próximos de
+    cada cidade, do mais próximo para o mais distante.
+
+    Args:
+        matriz: Lista de listas, np.ndarray ou OraculoDistancias
+        k (int): Tamanho de cada lista
+
+    Returns:
+        list: Uma lista de índices por cidade
+    """
+    if isinstance(matriz, OraculoDistancias):
+        return matriz.vizinhos_mais_proximos(k)[0].tolist()
+    custos = np.array(matriz, dtype=np.float64)
+    n = len(custos)
+    k = min(k, n - 1)
+    np.fill_diagonal(custos, np.inf)
+    escolhidos = np.argpartition(custos, k - 1, axis=1)[:, :k]
+    ordem = np.argsort(np.take_along_axis(custos, escolhidos, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(escolhidos, ordem, axis=1).tolist()
+
+def k_vizinhos_mais_proximos(coordenadas, k):
+    """
+    Calcula os k vizinhos mais próximos de cada ponto sem montar a matriz
+    n x n: os pontos são distribuídos numa grade e cada célula procura
+    candidatos em anéis crescentes de células até que o k-ésimo vizinho
+    esteja garantidamente dentro do anel.
+
+    Args:
+        coordenadas (array): Coordenadas n x 2
+        k (int): Número de vizinhos por ponto
+
+    Returns:
+        tuple: (indices, distancias), arrays n x k ordenados por distância
+    """
+    pontos = np.asarray(coordenadas, dtype=np.float64)[:, :2]
+    n = len(pontos)
+    k = min(k, n - 1)
+    indices = np.empty((n, k), dtype=np.int64)
+    distancias = np.empty((n, k), dtype=np.float64)
+    if k <= 0:
+        return indices, distancias
+
+    minimo = pontos.min(axis=0)
+    extensao = np.ptp(pontos, axis=0)
+    # Células quadradas com cerca de k/2 pontos cada: o primeiro anel já
+    # costuma conter candidatos suficientes sem gerar blocos grandes demais
+    lado = max(1, int(math.sqrt(n / max(2, k // 2))))
+    tamanho_celula = max(extensao.max() / lado, 1e-12)
+    gx = min(lado, int(extensao[0] / tamanho_celula) + 1)
+    gy = min(lado, int(extensao[1] / tamanho_celula) + 1)
+
+    celula_x = np.minimum(((pontos[:, 0] - minimo[0]) / tamanho_celula).astype(np.int64), gx - 1)
+    celula_y = np.minimum(((pontos[:, 1] - minimo[1]) / tamanho_celula).astype(np.int64), gy - 1)
+    id_celula = celula_x * gy + celula_y
+    ordem = np.argsort(id_celula, kind='stable')
+    inicio = np.searchsorted(id_celula[ordem], np.arange(gx * gy + 1))
+
+    for c in np.unique(id_celula):
+        membros = ordem[inicio[c]:inicio[c + 1]]
+        cx, cy = divmod(int(c), gy)
+        raio = 1
+        while True:
+            x0, x1 = max(cx - raio, 0), min(cx + raio, gx - 1)
+            y0, y1 = max(cy - raio, 0), min(cy + raio, gy - 1)
+            # As células de uma mesma coluna são contíguas em `ordem`
+            candidatos = np.concatenate([
+                ordem[inicio[x * gy + y0]:inicio[x * gy + y1 + 1]] for x in range(x0, x1 + 1)
+            ])
+            cobre_tudo = x0 == 0 and y0 == 0 and x1 == gx - 1 and y1 == gy - 1
+            if len(candidatos) > k:
+                d = np.hypot(pontos[membros, 0, None] - pontos[candidatos, 0],
+                             pontos[membros, 1, None] - pontos[candidatos, 1])
+                d[membros[:, None] == candidatos[None, :]] = np.inf
+                escolhidos = np.argpartition(d, k - 1, axis=1)[:, :k]
+                d_escolhidos = np.take_along_axis(d, escolhidos, axis=1)
+                if cobre_tudo or d_escolhidos.max() <= raio * tamanho_celula:
+                    ordem_linha = np.argsort(d_escolhidos, axis=1)
+                    indices[membros] = candidatos[np.take_along_axis(escolhidos, ordem_linha, axis=1)]
+                    distancias[membros] = np.take_along_axis(d_escolhidos, ordem_linha, axis=1)
+                    break
+            raio += 1
+
+    return indices, distancias
+
+class OraculoDistancias:
+    """
+    Substituto da matriz de distâncias para instâncias grandes demais para
+    uma matriz n x n. As distâncias são calculadas sob demanda a partir das
+    coordenadas, as linhas mais usadas ficam num cache LRU e as tabelas de
+    vizinhos mais próximos são pré-calculadas uma vez por k. A memória
+    cresce linearmente com n.
+
+    Indexar como uma matriz (oraculo[i][j]) funciona, então os solvers que
+    recebem matriz_distancias aceitam o oráculo no lugar dela.
+
+    Args:
+        coordenadas (array): Coordenadas n x 2 das cidades
+        linhas_cache (int): Quantidade de linhas mantidas no cache LRU
+        tipo_custo (str): 'float64', 'float32' ou 'int32'
+        arredondamento (str): Ver converter_custos ('nint' reproduz EUC_2D
+            e 'ceil' reproduz CEIL_2D da TSPLIB)
+    """
+    def __init__(self, coordenadas, linhas_cache=256, tipo_custo='float64', arredondamento=None):
+        self.tipo_custo = tipo_custo
+        self.arredondamento = arredondamento
+        self.dtype = np.dtype(TIPOS_CUSTO[tipo_custo])
+        self._converte = not (tipo_custo == 'float64' and arredondamento is None)
+        self.coordenadas = np.ascontiguousarray(np.asarray(coordenadas, dtype=np.float64)[:, :2])
+        self.x = self.coordenadas[:, 0]
+        self.y = self.coordenadas[:, 1]
+        # Cópias em listas deixam o acesso escalar sem o custo de escalares NumPy
+        self._lista_x = self.x.tolist()
+        self._lista_y = self.y.tolist()
+        self.linhas_cache = linhas_cache
+        self._linhas = OrderedDict()
+        self._vizinhos = {}
+
+    def __len__(self):
+        return len(self.coordenadas)
+
+    def _converter(self, distancias):
+        if self._converte:
+            return converter_custos(distancias, self.tipo_custo, self.arredondamento)
+        return distancias
+
+    def distancia(self, i, j):
+        d = math.hypot(self._lista_x[i] - self._lista_x[j], self._lista_y[i] - self._lista_y[j])
+        if self._converte:
+            return self._converter(np.float64(d)).item()
+        return d
+
+    def linha(self, i):
+        """
+        Distâncias da cidade i para todas as outras, servidas pelo cache LRU.
+        """
+        linha = self._linhas.get(i)
+        if linha is not None:
+            self._linhas.move_to_end(i)
+            return linha
+        linha = self._converter(np.hypot(self.x - self.x[i], self.y - self.y[i]))
+        self._linhas[i] = linha
+        if len(self._linhas) > self.linhas_cache:
+            self._linhas.popitem(last=False)
+        return linha
+
+    __getitem__ = linha
+
+    def distancias_pares(self, origens, destinos):
+        """
+        Distâncias entre os pares (origens[t], destinos[t]) em um único lote vetorizado.
+        """
+        origens = np.asarray(origens)
+        destinos = np.asarray(destinos)
+        return self._converter(np.hypot(self.x[origens] - self.x[destinos],
+                                        self.y[origens] - self.y[destinos]))
+
+    def distancias_bloco(self, origens, destinos=None):
+        """
+        Submatriz de distâncias len(origens) x len(destinos) (todas as cidades
+        quando destinos não é informado).
+        """
+        origens = np.asarray(origens)
+        x = self.x if destinos is None else self.x[destinos]
+        y = self.y if destinos is None else self.y[destinos]
+        return self._converter(np.hypot(self.x[origens, None] - x[None, :],
+                                        self.y[origens, None] - y[None, :]))
+
+    def vizinhos_mais_proximos(self, k):
+        """
+        Tabela (indices, distancias) dos k vizinhos mais próximos, calculada uma vez por k.
+        """
+        if k not in self._vizinhos:
+            indices, distancias = k_vizinhos_mais_proximos(self.coordenadas, k)
+            self._vizinhos[k] = (indices, self._converter(distancias))
+        return self._vizinhos[k]
+
+    def custo_percurso(self, percurso):
+        percurso = np.asarray(percurso)
+        custos = self.distancias_pares(percurso, np.roll(percurso, -1))
+        return custos.sum(dtype=_acumulador(self.dtype)).item()
+
+def gap_percentual(custo, referencia):
+    """
+    Distância percentual de um custo até uma referência (ótimo conhecido ou
+    limitante inferior).
+    """
+    return (custo - referencia) / referencia * 100
@@ -0,0 +1,306 @@
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+
+from alg_forcabruta import gerar_cidades_aleatorias, resolver_caixeiro_viajante_forca_bruta
+from alg_guloso import resolver_caixeiro_viajante_guloso
+from alg_genetico import evolucao
+from alg_formigas import ACO, Grafo
+from distancias import BACKENDS_DISTANCIA
+from instrumentacao import Instrumentacao
+from memoria import MedidorMemoria
+
+def _executar_forca_bruta(cidades, matriz, instrumentacao):
+    return resolver_caixeiro_viajante_forca_bruta(cidades, matriz_distancias=matriz,
+                                                  instrumentacao=instrumentacao)
+
+def _executar_guloso(cidades, matriz, instrumentacao):
+    percurso, distancia, _ = resolver_caixeiro_viajante_guloso(cidades, matriz_distancias=matriz,
+                                                               instrumentacao=instrumentacao)
+    return percurso, distancia
+
+def _executar_genetico(cidades, matriz, instrumentacao):
+    menor_caminho, _, melhor_rota = evolucao(cidades, 30, 30, 0.8, 0.1, matriz_distancias=matriz,
+                                             instrumentacao=instrumentacao)
+    return melhor_rota, menor_caminho
+
+def _executar_formigas(cidades, matriz, instrumentacao):
+    aco = ACO(quantidade_formigas=5, geracoes=10, alpha=1.0, beta=2.0, rho=0.5, Q=100, estrategia=2)
+    return aco.resolver(Grafo(matriz, len(cidades)), instrumentacao)
+
+# Cada solver declara como é executado no estudo, os tamanhos varridos por
+# padrão e o modelo de crescimento usado para prever o maior n viável.
+SOLVERS_ESTUDO = {
+    'forca_bruta': {
+        'executar': _executar_forca_bruta,
+        'tamanhos': [4, 5, 6, 7, 8, 9],
+        'modelo': 'fatorial',
+    },
+    'guloso': {
+        'executar': _executar_guloso,
+        'tamanhos': [10, 30, 100, 300, 1000, 3000],
+        'modelo': 'potencia',
+    },
+    'genetico': {
+        'executar': _executar_genetico,
+        'tamanhos': [10, 30, 100, 300, 1000],
+        'modelo': 'potencia',
+    },
+    'formigas': {
+        'executar': _executar_formigas,
+        'tamanhos': [10, 30, 100, 300],
+        'modelo': 'potencia',
+    },
+}
+
+def ajustar_expoente(tamanhos, tempos):
+    """
+    Ajusta o modelo t = a * n^b por mínimos quadrados em escala log-log.
+
+    Args:
+        tamanhos (list): Números de cidades medidos
+        tempos (list): Tempo médio (segundos) para cada tamanho
+
+    Returns:
+        tuple: (b, a, r2) - expoente empírico, coeficiente e qualidade do ajuste
+    """
+    log_n = np.log(np.asarray(tamanhos, dtype=float))
+    log_t = np.log(np.maximum(np.asarray(tempos, dtype=float), 1e-9))
+    b, log_a = np.polyfit(log_n, log_t, 1)
+    residuos = log_t - (b * log_n + log_a)
+    variacao = np.sum((log_t - log_t.mean())**2)
+    r2 = 1.0 - np.sum(residuos**2) / variacao if variacao > 0 else 1.0
+    return float(b), float(math.exp(log_a)), float(r2)
+
+def ajustar_fatorial(tamanhos, tempos):
+    """
+    Ajusta o modelo t = c * n! por mínimos quadrados em escala logarítmica
+    (com inclinação fixa, c é a média geométrica de t / n!).
+
+    Returns:
+        float: Coeficiente c
+    """
+    log_t = np.log(np.maximum(np.asarray(tempos, dtype=float), 1e-9))
+    log_fatorial = np.array([math.lgamma(n + 1) for n in tamanhos])
+    return float(math.exp(np.mean(log_t - log_fatorial)))
+
+def prever_maior_instancia(modelo, orcamento, tamanhos, tempos, expoente=None, coeficiente=None):
+    """
+    Estima o maior número de cidades resolvido dentro do orçamento de tempo.
+
+    Args:
+        modelo (str): 'potencia' (t = a * n^b) ou 'fatorial' (t = c * n!)
+        orcamento (float): Tempo máximo aceitável por execução (segundos)
+        tamanhos (list): Números de cidades medidos
+        tempos (list): Tempo médio para cada tamanho
+        expoente (float): Expoente b do ajuste em potência
+        coeficiente (float): Coeficiente a do ajuste em potência ou c do
+            ajuste fatorial
+
+    Returns:
+        int: Maior n previsto dentro do orçamento
+    """
+    if modelo == 'fatorial':
+        c = coeficiente if coeficiente is not None else ajustar_fatorial(tamanhos, tempos)
+        n = 1
+        while c * math.factorial(n + 1) <= orcamento:
+            n += 1
+        return n
+
+    if expoente is None or expoente <= 0:
+        return None
+    return int((orcamento / coeficiente) ** (1.0 / expoente))
+
+def estudo_escalabilidade(solvers=None, backends=None, sementes=(0, 1, 2), tamanhos=None,
+                          orcamento=1.0, tempo_maximo=30.0, memoria=False, orcamento_memoria=None):
+    """
+    Mede o tempo de execução de cada solver com cada backend de distância,
+    variando o número de cidades em ordens de grandeza e repetindo cada
+    ponto com várias sementes.
+
+    Args:
+        solvers (list): Nomes dos solvers em SOLVERS_ESTUDO (padrão: todos)
+        backends (list): Nomes dos backends em BACKENDS_DISTANCIA (padrão: todos)
+        sementes (tuple): Sementes aleatórias usadas em cada ponto
+        tamanhos (dict): Tamanhos por solver, substituindo os padrões
+        orcamento (float): Orçamento de latência (segundos) para a previsão
+        tempo_maximo (float): Interrompe a varredura de um par solver/backend
+            quando o tempo médio de um ponto ultrapassa este valor
+        memoria (bool): Mede também o pico de memória e os maiores alocadores
+            de cada fase (torna as execuções mais lentas)
+        orcamento_memoria (float): Limite em MB para o pico rastreado de cada
+            execução; medições acima dele são marcadas no resultado
+
+    Returns:
+        dict: Resultado serializável em JSON com medições e ajustes
+    """
+    solvers = solvers or list(SOLVERS_ESTUDO)
+    backends = backends or list(BACKENDS_DISTANCIA)
+    tamanhos = tamanhos or {}
+
+    medicoes = []
+    ajustes = []
+
+    for nome_solver in solvers:
+        config = SOLVERS_ESTUDO[nome_solver]
+        for nome_backend in backends:
+            construir_matriz = BACKENDS_DISTANCIA[nome_backend]
+            tamanhos_medidos = []
+            tempos_medios = []
+            picos_memoria = []
+
+            for n in tamanhos.get(nome_solver, config['tamanhos']):
+                tempos = []
+                picos = []
+                for semente in sementes:
+                    random.seed(semente)
+                    cidades = gerar_cidades_aleatorias(n)
+
+                    # Sem saídas de eventos: o estudo só guarda tempos e contadores
+                    medidor = MedidorMemoria() if memoria else None
+                    instrumentacao = Instrumentacao(saidas=[], memoria=medidor)
+                    if medidor is not None:
+                        medidor.iniciar()
+                    inicio = time.perf_counter()
+                    with instrumentacao.fase('matriz'):
+                        matriz = construir_matriz(cidades)
+                    tempo_matriz = time.perf_counter() - inicio
+                    _, custo = config['executar'](cidades, matriz, instrumentacao)
+                    tempo = time.perf_counter() - inicio
+                    del matriz
+                    if medidor is not None:
+                        medidor.parar()
+                    relatorio = instrumentacao.relatorio()
+
+                    tempos.append(tempo)
+                    medicao = {
+                        'solver': nome_solver,
+                        'backend': nome_backend,
+                        'n': n,
+                        'semente': semente,
+                        'tempo_matriz': tempo_matriz,
+                        'tempo': tempo,
+                        'custo': float(custo),
+                        'fases': relatorio['tempos'],
+                        'contadores': relatorio['contadores'],
+                    }
+                    if memoria:
+                        medicao['memoria'] = relatorio['memoria']
+                        picos.append(relatorio['memoria']['pico_tracemalloc_mb'])
+                        if orcamento_memoria is not None:
+                            medicao['excede_orcamento_memoria'] = (
+                                relatorio['memoria']['pico_tracemalloc_mb'] > orcamento_memoria)
+                    medicoes.append(medicao)
+
+                tamanhos_medidos.append(n)
+                tempos_medios.append(float(np.mean(tempos)))
+                if picos:
+                    picos_memoria.append(max(picos))
+                print(f"{nome_solver}/{nome_backend} n={n}: {tempos_medios[-1]:.4f} segundos",
+                      file=sys.stderr)
+
+                if tempos_medios[-1] > tempo_maximo:
+                    break
+
+            ajuste = {
+                'solver': nome_solver,
+                'backend': nome_backend,
+                'modelo': config['modelo'],
+                'tamanhos': tamanhos_medidos,
+                'tempos_medios': tempos_medios,
+                'expoente': None,
+                'coeficiente': None,
+                'r2': None,
+                'maior_n_no_orcamento': None,
+            }
+            if memoria:
+                ajuste['picos_memoria_mb'] = picos_memoria
+            if config['modelo'] == 'fatorial' and tamanhos_medidos:
+                # Expoente e r2 de uma lei de potência não dizem nada sobre crescimento n!
+                c = ajustar_fatorial(tamanhos_medidos, tempos_medios)
+                ajuste['coeficiente'] = c
+                ajuste['maior_n_no_orcamento'] = prever_maior_instancia(
+                    'fatorial', orcamento, tamanhos_medidos, tempos_medios, coeficiente=c)
+            elif len(tamanhos_medidos) >= 2:
+                b, a, r2 = ajustar_expoente(tamanhos_medidos, tempos_medios)
+                ajuste.update(expoente=b, coeficiente=a, r2=r2)
+                ajuste['maior_n_no_orcamento'] = prever_maior_instancia(
+                    config['modelo'], orcamento, tamanhos_medidos, tempos_medios, b, a)
+            ajustes.append(ajuste)
+
+    return {
+        'configuracao': {
+            'solvers': solvers,
+            'backends': backends,
+            'sementes': list(sementes),
+            'orcamento': orcamento,
+            'tempo_maximo': tempo_maximo,
+            'memoria': memoria,
+            'orcamento_memoria': orcamento_memoria,
+        },
+        'medicoes': medicoes,
+        'ajustes': ajustes,
+    }
+
+def plotar_escalabilidade(resultado):
+    """
+    Plota em escala log-log o tempo médio de cada par solver/backend.
+
+    Args:
+        resultado (dict): Saída de estudo_escalabilidade
+    """
+    plt.figure(figsize=(12, 6))
+
+    for ajuste in resultado['ajustes']:
+        rotulo = f"{ajuste['solver']}/{ajuste['backend']}"
+        if ajuste['expoente'] is not None:
+            rotulo += f" (b = {ajuste['expoente']:.2f})"
+        elif ajuste['modelo'] == 'fatorial' and ajuste['coeficiente'] is not None:
+            rotulo += f" (t = {ajuste['coeficiente']:.2e} * n!)"
+        plt.plot(ajuste['tamanhos'], ajuste['tempos_medios'], 'o-', label=rotulo)
+
+    plt.xscale('log')
+    plt.yscale('log')
+    plt.title('Tempo de Execução vs. Número de Cidades')
+    plt.xlabel('Número de Cidades - Escala Logarítmica')
+    plt.ylabel('Tempo (segundos) - Escala Logarítmica')
+    plt.grid(True)
+    plt.legend()
+    plt.show()
+
+def main():
+    parser = argparse.ArgumentParser(description="Estudo de escalabilidade dos solvers do FlyFood")
+    parser.add_argument('--solvers', nargs='+', choices=list(SOLVERS_ESTUDO))
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS_DISTANCIA))
+    parser.add_argument('--sementes', nargs='+', type=int, default=[0, 1, 2])
+    parser.add_argument('--orcamento', type=float, default=1.0,
+                        help="Orçamento de latência em segundos")
+    parser.add_argument('--tempo-maximo', type=float, default=30.0)
+    parser.add_argument('--memoria', action='store_true',
+                        help="Mede o pico de memória e os maiores alocadores por fase")
+    parser.add_argument('--orcamento-memoria', type=float,
+                        help="Orçamento de memória por execução em MB")
+    parser.add_argument('--saida', help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument('--grafico', action='store_true')
+    args = parser.parse_args()
+
+    resultado = estudo_escalabilidade(args.solvers, args.backends, tuple(args.sementes),
+                                      orcamento=args.orcamento, tempo_maximo=args.tempo_maximo,
+                                      memoria=args.memoria, orcamento_memoria=args.orcamento_memoria)
+
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+    else:
+        print(json.dumps(resultado, indent=2))
+
+    if args.grafico:
+        plotar_escalabilidade(resultado)
+
+if __name__ == "__main__":
+    main()
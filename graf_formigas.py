@@ -1,24 +1,21 @@
 import matplotlib.pyplot as plt
-import numpy as np
 from alg_formigas import *
-import random
-from ler_arquivo_tsp import ler_arquivo_tsp
+from cache_instancias import carregar_instancia, carregar_limite_inferior, carregar_matriz
+from distancias import OTIMOS_TSPLIB, gap_percentual
+from instrumentacao import Instrumentacao, saida_console
 import time
 
-cidades = ler_arquivo_tsp("tsp/berlin52.tsp")
-# cidades = ler_arquivo_tsp("tsp/bier127.tsp")
+caminho_instancia = "tsp/berlin52.tsp"
+# caminho_instancia = "tsp/bier127.tsp"
+
+instancia = carregar_instancia(caminho_instancia)
+cidades = instancia.cidades()
 
 def principal():
     
     num_cidades = len(cidades)
-    matriz_custos = [[0 for _ in range(num_cidades)] for _ in range(num_cidades)]
-    
-    for i in range(num_cidades):
-        for j in range(num_cidades):
-            if i != j:
-                matriz_custos[i][j] = distancia(cidades[i], cidades[j])
-            else:
-                matriz_custos[i][j] = 0.001  
+    # Custos inteiros da TSPLIB, comparáveis com os ótimos publicados
+    matriz_custos = carregar_matriz(caminho_instancia, 'tsplib').tolist()
     
     aco = ACO(
         quantidade_formigas=10,
@@ -34,45 +31,19 @@ def principal():
     
     evolucao_custo = []
     
-    def resolver_com_evolucao(aco, grafo):
-        melhor_custo = float('inf')
-        melhor_solucao = []
-        
-        for geracao in range(aco.geracoes):
-            formigas = []
-            
-            for _ in range(aco.quantidade_formigas):
-                formiga = Formiga(aco, grafo)
-                
-                no_inicial = random.randint(0, grafo.rank - 1)
-                formiga.tabu.append(no_inicial)
-                formiga.nos_permitidos.remove(no_inicial)
-                
-                while formiga.nos_permitidos:
-                    proximo = formiga.seleciona_proximo()
-                    formiga.custo_total += grafo.matriz_custos[formiga.tabu[-1]][proximo]
-                    formiga.tabu.append(proximo)
-                    formiga.nos_permitidos.remove(proximo)
-                
-                formiga.custo_total += grafo.matriz_custos[formiga.tabu[-1]][formiga.tabu[0]]
-                
-                if formiga.custo_total < melhor_custo:
-                    melhor_custo = formiga.custo_total
-                    melhor_solucao = formiga.tabu.copy()
-                
-                formiga.atualiza_delta_feromonio()
-                formigas.append(formiga)
-            
-            aco.atualiza_feromonio(grafo, formigas)
-            evolucao_custo.append(melhor_custo)
-            
-            print(f"Geração {geracao+1}/{aco.geracoes}, Melhor custo: {melhor_custo}")
-        
-        return melhor_solucao, melhor_custo
-    
-    melhor_solucao, melhor_custo = resolver_com_evolucao(aco, grafo)
+    def registrar_geracao(evento, dados):
+        if evento == 'formigas.geracao':
+            evolucao_custo.append(dados['melhor_custo'])
+    
+    instrumentacao = Instrumentacao(saidas=[saida_console, registrar_geracao], medir=False)
+    
+    melhor_solucao, melhor_custo = aco.resolver(grafo, instrumentacao)
     
     print(f"Melhor custo: {melhor_custo}")
+    if instancia.nome in OTIMOS_TSPLIB:
+        print(f"Gap para o ótimo da TSPLIB: {gap_percentual(melhor_custo, OTIMOS_TSPLIB[instancia.nome]):.2f}%")
+    limite = carregar_limite_inferior(caminho_instancia, 'tsplib')
+    print(f"Gap certificado (limitante de Held-Karp {limite}): {gap_percentual(melhor_custo, limite):.2f}%")
     print(f"Melhor rota: {melhor_solucao}")
     
     plt.figure(figsize=(10, 6))
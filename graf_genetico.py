@@ -2,192 +2,37 @@ import random
 import math
 import numpy as np
 import matplotlib.pyplot as plt
-from ler_arquivo_tsp import ler_arquivo_tsp
+from cache_instancias import carregar_instancia, carregar_limite_inferior, carregar_matriz
+from distancias import OTIMOS_TSPLIB, gap_percentual
 import time
+import alg_genetico
+from alg_genetico import torneio
+from instrumentacao import Instrumentacao, saida_console
 
-def gerar_populacao_inicial(numero_cidades, numero_individuos):
-    populacao = []
-    for _ in range(numero_individuos):
-        individuo = list(range(numero_cidades))
-        random.shuffle(individuo)
-        populacao.append(individuo)
-    return populacao
-
-def calcular_dois_pontos(ponto1, ponto2):
-    diff_x = ponto1[0] - ponto2[0]
-    diff_y = ponto1[1] - ponto2[1]
-    dist_pontos = math.sqrt(diff_x**2 + diff_y**2)
-    return dist_pontos
-
-def calcular_todas_distancias(lista_cidades):
-    distancia_rotas = [[0 for _ in range(len(lista_cidades))] for _ in range(len(lista_cidades))]
-    for i, cidade in enumerate(lista_cidades):
-        for j, outra_cidade in enumerate(lista_cidades):
-            if i != j:
-                distancia = calcular_dois_pontos(cidade, outra_cidade)
-                distancia_rotas[i][j] = distancia
-    return distancia_rotas
-
-def escala_apt(lista):
-    valor_minimo = min(lista)
-    valor_maximo = max(lista)
-    lista_escalada = []
-    
-    if valor_maximo == valor_minimo:
-        return [1 for _ in lista]
-    
-    for valor in lista:
-        valor_escalado = (valor - valor_minimo + 1) / (valor_maximo - valor_minimo + 1)
-        lista_escalada.append(valor_escalado)
-    
-    return lista_escalada
-
-def torneio(aptidao):
-    pai1 = random.randint(0, len(aptidao) - 1)
-    pai2 = random.randint(0, len(aptidao) - 1)
-    
-    if aptidao[pai1] > aptidao[pai2]:
-        return pai1
-    else:
-        return pai2
-
-def mutacao_genes(lista_populacao, taxa_mutacao):
-    for i, elemento in enumerate(lista_populacao):
-        if random.random() <= taxa_mutacao:
-            a = random.randint(0, len(elemento) - 1)
-            b = random.randint(0, len(elemento) - 1)
-            
-            while a == b:
-                b = random.randint(0, len(elemento) - 1)
-            
-            lista_populacao[i][a], lista_populacao[i][b] = lista_populacao[i][b], lista_populacao[i][a]
-    
-    return lista_populacao
-
-def aptidao(lista_populacao, matriz_distancias):
-    lista_aptidao = []
-    
-    for rota in lista_populacao:
-        distancia_total = 0
-        for i in range(len(rota) - 1):
-            cidade_atual = rota[i]
-            proxima_cidade = rota[i + 1]
-            distancia_total += matriz_distancias[cidade_atual][proxima_cidade]
-        
-        distancia_total += matriz_distancias[rota[-1]][rota[0]]
-        
-        lista_aptidao.append(1 / (distancia_total + 0.00001))
-    
-    return lista_aptidao
-
-def selecao_pais(lista_populacao, aptidao, sel_func):
-    lista_pais = []
-    
-    for i in range(0, len(lista_populacao) // 2):
-        idx_pai1_selecionado = sel_func(aptidao)
-        
-        aptidao_sem_pai1 = aptidao.copy()
-        aptidao_sem_pai1[idx_pai1_selecionado] = 0
-        
-        idx_pai2_selecionado = sel_func(aptidao_sem_pai1)
-        
-        lista_pais.append([
-            lista_populacao[idx_pai1_selecionado],
-            lista_populacao[idx_pai2_selecionado]
-        ])
-    
-    return lista_pais
-
-def PMX(pai1, pai2):
-    tamanho = len(pai1)
-    filho = [-1] * tamanho
-    
-    punto_corte1 = random.randint(0, tamanho - 2)
-    punto_corte2 = random.randint(punto_corte1 + 1, tamanho - 1)
-    
-    for i in range(punto_corte1, punto_corte2 + 1):
-        filho[i] = pai2[i]
-        
-    for i in range(tamanho):
-        if i >= punto_corte1 and i <= punto_corte2:
-            continue
-            
-        item = pai1[i]
-        while item in filho[punto_corte1:punto_corte2 + 1]:
-            idx = pai2.index(item)
-            item = pai1[idx]
-        
-        filho[i] = item
-    
-    return filho
-
-def cruzamento_dois_pais(pai1, pai2, taxa_cruzamento):
-    if random.random() < taxa_cruzamento:
-        return PMX(pai1, pai2), PMX(pai2, pai1)
-    else:
-        return pai1.copy(), pai2.copy()
-
-def cruzamento_todos_pais(lista_pais, taxa_cruzamento):
-    lista_filho = []
-    
-    for par in lista_pais:
-        filho1, filho2 = cruzamento_dois_pais(par[0], par[1], taxa_cruzamento)
-        lista_filho.append(filho1)
-        lista_filho.append(filho2)
-    
-    return lista_filho
-
-def calcular_distancia_rota(rota, matriz_distancias):
-    distancia_total = 0
-    for i in range(len(rota) - 1):
-        distancia_total += matriz_distancias[rota[i]][rota[i + 1]]
-    distancia_total += matriz_distancias[rota[-1]][rota[0]]
-    return distancia_total
-
-def evolucao(lista_cidades, numero_individuo, numero_geracoes, taxa_cruzamento, taxa_mutacao, sel_func=torneio):
-    matriz_distancias = calcular_todas_distancias(lista_cidades)
-    
-    populacao = gerar_populacao_inicial(len(lista_cidades), numero_individuo)
-    
-    menor_caminho = float('inf')
-    melhor_rota = None
+def evolucao(lista_cidades, numero_individuo, numero_geracoes, taxa_cruzamento, taxa_mutacao, sel_func=torneio,
+             matriz_distancias=None):
     evolucao_custo = []  
     evolucao_aptidao = []  
     evolucao_diversidade = []  
     
-    for geracao in range(numero_geracoes):
-        lista_aptidao = aptidao(populacao, matriz_distancias)
-        lista_aptidao_escalada = escala_apt(lista_aptidao)
-        
-        melhor_idx = lista_aptidao.index(max(lista_aptidao))
-        melhor_individuo = populacao[melhor_idx]
-        distancia_atual = calcular_distancia_rota(melhor_individuo, matriz_distancias)
-        
-        if distancia_atual < menor_caminho:
-            menor_caminho = distancia_atual
-            melhor_rota = melhor_individuo.copy()
-        
-        evolucao_custo.append(menor_caminho)  
-        evolucao_aptidao.append(np.mean(lista_aptidao))  
-        evolucao_diversidade.append(len(set(map(tuple, populacao)))) 
-        
-        if geracao % 10 == 0 or geracao == numero_geracoes - 1:
-            print(f"Geração {geracao}: Menor caminho = {menor_caminho:.2f}")
-        
-        pares = selecao_pais(populacao, lista_aptidao_escalada, sel_func)
-        
-        filhos = cruzamento_todos_pais(pares, taxa_cruzamento)
-        
-        filhos_mutados = mutacao_genes(filhos, taxa_mutacao)
-        
-        populacao = filhos_mutados
-        
-        if melhor_rota is not None:
-            populacao[0] = melhor_rota.copy()
-    
-    print(f"Menor caminho encontrado: {menor_caminho:.2f}")
-    
-    melhor_caminho_cidades = [lista_cidades[idx] for idx in melhor_rota]
+    def registrar_geracao(evento, dados):
+        if evento == 'genetico.geracao':
+            evolucao_custo.append(dados['menor_caminho'])
+            evolucao_aptidao.append(np.mean(dados['aptidao']))
+            evolucao_diversidade.append(len(set(map(tuple, dados['populacao']))))
+    
+    instrumentacao = Instrumentacao(saidas=[saida_console, registrar_geracao], medir=False)
+    
+    menor_caminho, melhor_caminho_cidades, melhor_rota = alg_genetico.evolucao(
+        lista_cidades,
+        numero_individuo,
+        numero_geracoes,
+        taxa_cruzamento,
+        taxa_mutacao,
+        sel_func,
+        matriz_distancias,
+        instrumentacao
+    )
     
     return menor_caminho, melhor_caminho_cidades, melhor_rota, evolucao_custo, evolucao_aptidao, evolucao_diversidade
 
@@ -253,8 +98,13 @@ def visualizar_matriz_distancias(matriz_distancias):
 if __name__ == "__main__":
     random.seed(42)
     
-    cidade = ler_arquivo_tsp("tsp/berlin52.tsp")
-    # cidade = ler_arquivo_tsp("tsp/bier127.tsp")
+    caminho_instancia = "tsp/berlin52.tsp"
+    # caminho_instancia = "tsp/bier127.tsp"
+    
+    instancia = carregar_instancia(caminho_instancia)
+    cidade = instancia.cidades()
+    # Custos inteiros da TSPLIB, comparáveis com os ótimos publicados
+    matriz_distancias = carregar_matriz(caminho_instancia, 'tsplib')
     
     numero_individuos = 100
     numero_geracoes = 200
@@ -268,13 +118,18 @@ if __name__ == "__main__":
         numero_individuos, 
         numero_geracoes, 
         taxa_cruzamento, 
-        taxa_mutacao
+        taxa_mutacao,
+        matriz_distancias=matriz_distancias.tolist()
     )
     
     end_time = time.time()
     execution_time = end_time - start_time
     
     print(f"Distância total do melhor caminho: {menor_distancia:.2f}")
+    if instancia.nome in OTIMOS_TSPLIB:
+        print(f"Gap para o ótimo da TSPLIB: {gap_percentual(menor_distancia, OTIMOS_TSPLIB[instancia.nome]):.2f}%")
+    limite = carregar_limite_inferior(caminho_instancia, 'tsplib')
+    print(f"Gap certificado (limitante de Held-Karp {limite}): {gap_percentual(menor_distancia, limite):.2f}%")
     print(f"Melhor rota (índices): {melhor_rota}")
     print(f"Tempo de execução: {execution_time:.2f} segundos")
     
@@ -282,4 +137,4 @@ if __name__ == "__main__":
     visualizar_evolucao_custo(evolucao_custo)
     visualizar_aptidao_media(evolucao_aptidao)
     visualizar_diversidade(evolucao_diversidade)
-    visualizar_matriz_distancias(calcular_todas_distancias(cidade))
\ No newline at end of file
+    visualizar_matriz_distancias(matriz_distancias)
\ No newline at end of file
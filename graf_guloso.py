@@ -1,58 +1,6 @@
-import random
-import math
-import numpy as np
 import matplotlib.pyplot as plt
-import time
 from ler_arquivo_tsp import ler_arquivo_tsp
-
-def calcular_distancia(ponto1, ponto2):
-    return math.sqrt((ponto1[0] - ponto2[0])**2 + (ponto1[1] - ponto2[1])**2)
-
-def calcular_percurso_total(percurso, cidades):
-    distancia_total = 0
-    for i in range(len(percurso) - 1):
-        cidade_atual = cidades[percurso[i]]
-        proxima_cidade = cidades[percurso[i + 1]]
-        distancia_total += calcular_distancia(cidade_atual, proxima_cidade)
-    distancia_total += calcular_distancia(cidades[percurso[-1]], cidades[percurso[0]])
-    return distancia_total
-
-def resolver_caixeiro_viajante_guloso(cidades, cidade_inicial=0):
-    inicio = time.time()
-    
-    n = len(cidades)
-    percurso = [cidade_inicial]
-    cidades_nao_visitadas = set(range(n))
-    cidades_nao_visitadas.remove(cidade_inicial)
-    
-    etapas = []
-    etapas.append(list(percurso))  
-    
-    while cidades_nao_visitadas:
-        cidade_atual = percurso[-1]
-        
-        cidade_mais_proxima = None
-        menor_distancia = float('inf')
-        
-        for proxima_cidade in cidades_nao_visitadas:
-            dist = calcular_distancia(cidades[cidade_atual], cidades[proxima_cidade])
-            if dist < menor_distancia:
-                menor_distancia = dist
-                cidade_mais_proxima = proxima_cidade
-        
-        percurso.append(cidade_mais_proxima)
-        cidades_nao_visitadas.remove(cidade_mais_proxima)
-        
-        etapas.append(list(percurso))
-    
-    fim = time.time()
-    tempo_execucao = fim - inicio
-    
-    distancia_total = calcular_percurso_total(percurso, cidades)
-    
-    print(f"Tempo de execução: {tempo_execucao:.6f} segundos")
-    
-    return percurso, distancia_total, etapas
+from alg_guloso import calcular_percurso_total, resolver_caixeiro_viajante_guloso
 
 def plotar_cidades(cidades, titulo="Distribuição das Cidades"):
     x = [cidade[0] for cidade in cidades]
@@ -0,0 +1,171 @@
+import time
+from contextlib import nullcontext
+
+# Mensagens que a saída de console imprime para cada evento dos solvers.
+# Eventos sem formato aqui (como as iterações) só chegam às outras saídas.
+FORMATOS_CONSOLE = {
+    'forca_bruta.inicio': "Calculando {total} permutações possíveis...",
+    'forca_bruta.progresso': "Progresso: {verificadas}/{total} permutações verificadas "
+                             "({percentual:.2f}%), Tempo: {tempo:.2f}s",
+    'forca_bruta.fim': "Tempo total de execução: {tempo:.2f} segundos",
+    'forca_bruta_lote.fim': "{instancias} instâncias resolvidas em {tempo:.2f}s ({vazao:.0f} instâncias/s)",
+    'guloso.fim': "Tempo de execução: {tempo:.6f} segundos",
+    'genetico.progresso': "Geração {geracao}: Menor caminho = {menor_caminho:.2f}",
+    'genetico.fim': "Menor caminho encontrado: {menor_caminho:.2f}",
+    'formigas.geracao': "Geração {geracao}/{geracoes}, Melhor custo: {melhor_custo}",
+    'ils.fim': "Melhor custo: {melhor_custo:.2f} ({iteracoes} iterações em {tempo:.2f}s)",
+    'arestas.fim': "Percurso por {metodo}: {distancia:.2f} ({fragmentos} fragmentos, {tempo:.2f}s)",
+    'arvore.fim': "Percurso por {metodo}: {distancia:.2f} ({tempo:.2f}s)",
+    'insercao.fim': "Inserção {criterio}: {distancia:.2f} ({tempo:.2f}s)",
+    'decomposicao.fim': "Decomposição em {clusters} clusters: {distancia:.2f} ({tempo:.2f}s)",
+    'drones.fim': "{viagens} viagens de drone, custo total {custo:.2f} ({tempo:.2f}s)",
+    'obstaculos.fim': "Custos com obstáculos: {cidades} cidades, {vertices} vértices ({tempo:.2f}s)",
+    'cache.resultado': "Cache de resultados: {resultado}, distância {distancia:.2f} ({tempo:.2f}s)",
+    'curva.fim': "Percurso pela curva de {curva}: {distancia:.2f} ({tempo:.2f}s)",
+    'recozimento.fim': "Melhor custo: {melhor_custo:.2f} ({iteracoes} movimentos em {tempo:.2f}s)",
+}
+
+_SEM_CRONOMETRO = nullcontext()
+
+# Campos com o custo final nos eventos '*.fim', na ordem em que são procurados
+CAMPOS_CUSTO = ('distancia', 'melhor_custo', 'menor_caminho', 'menor_distancia', 'custo')
+
+def saida_console(evento, dados):
+    """
+    Saída que imprime no terminal as mensagens de progresso dos solvers.
+
+    Args:
+        evento (str): Nome do evento emitido
+        dados (dict): Valores associados ao evento
+    """
+    formato = FORMATOS_CONSOLE.get(evento)
+    if formato is not None:
+        mensagem = formato.format(**dados)
+        if 'gap_certificado' in dados:
+            mensagem += f" [gap certificado: {dados['gap_certificado']:.2f}%]"
+        print(mensagem)
+
+class SaidaLista:
+    """
+    Saída que guarda todos os eventos recebidos, útil para gráficos e análises.
+    """
+    def __init__(self, filtro=None):
+        self.filtro = filtro
+        self.eventos = []
+
+    def __call__(self, evento, dados):
+        if self.filtro is None or evento in self.filtro:
+            self.eventos.append((evento, dados))
+
+    def valores(self, evento, chave):
+        return [dados[chave] for nome, dados in self.eventos if nome == evento]
+
+class _Cronometro:
+    __slots__ = ('instrumentacao', 'nome', 'inicio')
+
+    def __init__(self, instrumentacao, nome):
+        self.instrumentacao = instrumentacao
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        duracao = time.perf_counter() - self.inicio
+        tempos = self.instrumentacao.tempos
+        tempos[self.nome] = tempos.get(self.nome, 0.0) + duracao
+        chamadas = self.instrumentacao.chamadas
+        chamadas[self.nome] = chamadas.get(self.nome, 0) + 1
+        return False
+
+class _CronometroMemoria(_Cronometro):
+    __slots__ = ()
+
+    def __enter__(self):
+        self.instrumentacao.memoria.entrar_fase(self.nome)
+        return super().__enter__()
+
+    def __exit__(self, *excecao):
+        super().__exit__(*excecao)
+        self.instrumentacao.memoria.sair_fase(self.nome)
+        return False
+
+class Instrumentacao:
+    """
+    Ponto único de medição dos solvers: cronômetros por fase, contadores e
+    eventos por iteração entregues a uma lista de saídas (callables que
+    recebem o nome do evento e um dicionário de dados).
+
+    Args:
+        saidas (list): Saídas de eventos (padrão: apenas o console)
+        medir (bool): Liga os cronômetros por fase e os contadores
+        memoria (MedidorMemoria, opcional): Mede também a memória de cada fase
+        limite_inferior (float, opcional): Limitante inferior da instância
+            (ex.: limite_inferior.limite_held_karp); com ele todo evento
+            '*.fim' com custo passa a levar o gap certificado
+    """
+    def __init__(self, saidas=None, medir=True, memoria=None, limite_inferior=None):
+        self.saidas = [saida_console] if saidas is None else list(saidas)
+        self.medir = medir or memoria is not None
+        self.memoria = memoria
+        self.limite_inferior = limite_inferior
+        self.gap_certificado = None
+        self.tempos = {}
+        self.chamadas = {}
+        self.contadores = {}
+
+    @property
+    def emitindo(self):
+        # Com limitante os eventos são gerados mesmo sem saídas, para que o gap fique registrado
+        return bool(self.saidas) or self.limite_inferior is not None
+
+    def fase(self, nome):
+        """
+        Gerenciador de contexto que acumula o tempo gasto na fase indicada.
+        Com a medição desligada devolve um contexto vazio compartilhado.
+        """
+        if not self.medir:
+            return _SEM_CRONOMETRO
+        if self.memoria is not None:
+            return _CronometroMemoria(self, nome)
+        return _Cronometro(self, nome)
+
+    def contar(self, nome, quantidade=1):
+        if self.medir:
+            self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def emitir(self, evento, **dados):
+        if self.limite_inferior is not None and evento.endswith('.fim'):
+            custo = next((dados[campo] for campo in CAMPOS_CUSTO if campo in dados), None)
+            if custo is not None and self.limite_inferior > 0:
+                self.gap_certificado = 100.0 * (custo - self.limite_inferior) / self.limite_inferior
+                dados['gap_certificado'] = self.gap_certificado
+        for saida in self.saidas:
+            saida(evento, dados)
+
+    def relatorio(self):
+        """
+        Returns:
+            dict: Tempos acumulados, número de chamadas por fase, contadores e,
+            quando medida, a memória por fase
+        """
+        relatorio = {
+            'tempos': dict(self.tempos),
+            'chamadas': dict(self.chamadas),
+            'contadores': dict(self.contadores),
+        }
+        if self.memoria is not None:
+            relatorio['memoria'] = self.memoria.relatorio()
+        if self.gap_certificado is not None:
+            relatorio['gap_certificado'] = self.gap_certificado
+        return relatorio
+
+def instrumentacao_padrao(instrumentacao):
+    """
+    Devolve a instrumentação recebida ou, na ausência dela, a configuração
+    padrão dos solvers: mensagens no console e nenhuma medição.
+    """
+    if instrumentacao is None:
+        return Instrumentacao(medir=False)
+    return instrumentacao
@@ -0,0 +1,388 @@
+import numpy as np
+from distancias import OraculoDistancias, custo_rota
+
+_EPSILON = 1e-9
+
+def juntar_segmentos(a, b, tempo):
+    """
+    Concatena os resumos de dois trechos de rota em O(1). Cada resumo é
+    (duracao, atraso, cedo, tarde): tempo total do trecho (deslocamento,
+    serviço e espera), atraso acumulado ("time warp", quanto foi preciso
+    voltar no tempo para cumprir as janelas), horário mais cedo e mais
+    tarde para começar o trecho sem espera e sem atraso extras.
+
+    Args:
+        a (tuple): Resumo do primeiro trecho
+        b (tuple): Resumo do segundo trecho
+        tempo (float): Deslocamento da última cidade de a para a primeira de b
+
+    Returns:
+        tuple: Resumo do trecho a + b
+    """
+    delta = a[0] - a[1] + tempo
+    espera = max(b[2] - delta - a[3], 0.0)
+    atraso = max(a[2] + delta - b[3], 0.0)
+    return (a[0] + b[0] + tempo + espera, a[1] + b[1] + atraso,
+            max(b[2] - delta, a[2]) - espera, min(b[3] - delta, a[3]) + atraso)
+
+class JanelasTempo:
+    """
+    Janelas de entrega prometidas para cada cidade. A rota sai da base, faz
+    as entregas e volta; chegar cedo significa esperar a abertura da
+    janela, chegar depois do fechamento gera atraso. O custo penalizado é
+    a distância mais `penalidade` vezes o atraso total, o que permite que
+    GA, colônia de formigas e busca local atravessem rotas inviáveis a
+    caminho das viáveis.
+
+    Args:
+        matriz_distancias: Lista de listas, np.ndarray ou OraculoDistancias
+        abertura (array): Início da janela de cada cidade (a da base é a saída mais cedo)
+        fechamento (array): Fim da janela de cada cidade (o da base é o retorno mais tarde)
+        servico (array, opcional): Tempo de atendimento em cada cidade
+        velocidade (float): Distância percorrida por unidade de tempo
+        deposito (int): Índice da base
+        penalidade (float): Custo por unidade de tempo de atraso
+    """
+    def __init__(self, matriz_distancias, abertura, fechamento, servico=None, velocidade=1.0, deposito=0,
+                 penalidade=100.0):
+        if isinstance(matriz_distancias, OraculoDistancias):
+            self.matriz = matriz_distancias
+        else:
+            self.matriz = np.asarray(matriz_distancias, dtype=np.float64)
+        n = len(self.matriz)
+        self.abertura = np.asarray(abertura, dtype=np.float64)
+        self.fechamento = np.asarray(fechamento, dtype=np.float64)
+        self.servico = np.zeros(n) if servico is None else np.asarray(servico, dtype=np.float64)
+        self.velocidade = velocidade
+        self.deposito = deposito
+        self.penalidade = penalidade
+
+    def distancia(self, i, j):
+        if isinstance(self.matriz, OraculoDistancias):
+            return self.matriz.distancia(i, j)
+        return float(self.matriz[i, j])
+
+    def tempo(self, i, j):
+        return self.distancia(i, j) / self.velocidade
+
+    def _tempos(self, origens, destinos):
+        if isinstance(self.matriz, OraculoDistancias):
+            return self.matriz.distancias_pares(origens, destinos) / self.velocidade
+        return self.matriz[origens, destinos] / self.velocidade
+
+    def no(self, cidade):
+        """Resumo do trecho formado só pela cidade."""
+        return (float(self.servico[cidade]), 0.0, float(self.abertura[cidade]), float(self.fechamento[cidade]))
+
+    def sequencia(self, rota):
+        """
+        Rota como sequência fechada na base: base, entregas na ordem da rota
+        (girada para começar depois da base) e base de novo.
+        """
+        rota = [int(c) for c in rota]
+        if self.deposito in rota:
+            posicao = rota.index(self.deposito)
+            rota = rota[posicao + 1:] + rota[:posicao]
+        return [self.deposito] + rota + [self.deposito]
+
+    def avaliar(self, rota):
+        """
+        Simula a rota uma vez, em O(n).
+
+        Returns:
+            tuple: (distância, atraso total)
+        """
+        sequencia = self.sequencia(rota)
+        resumo = self.no(sequencia[0])
+        for anterior, cidade in zip(sequencia, sequencia[1:]):
+            resumo = juntar_segmentos(resumo, self.no(cidade), self.tempo(anterior, cidade))
+        return custo_rota(sequencia[:-1], self.matriz), resumo[1]
+
+    def custo_penalizado(self, rota):
+        distancia, atraso = self.avaliar(rota)
+        return distancia + self.penalidade * atraso
+
+    def viavel(self, rota):
+        return self.avaliar(rota)[1] <= _EPSILON
+
+    def custos_penalizados(self, rotas):
+        """
+        Custo penalizado de várias rotas de mesmo tamanho de uma vez: as
+        concatenações avançam coluna a coluna sobre a população inteira.
+
+        Args:
+            rotas (list ou np.ndarray): Permutações de todas as cidades (base incluída)
+
+        Returns:
+            np.ndarray: Custo penalizado de cada rota
+        """
+        rotas = np.asarray(rotas, dtype=np.int64)
+        quantidade, n = rotas.shape
+        inicio = np.argmax(rotas == self.deposito, axis=1)
+        indices = (inicio[:, None] + np.arange(n)) % n
+        rotas = np.take_along_axis(rotas, indices, axis=1)
+        rotas = np.concatenate([rotas, rotas[:, :1]], axis=1)
+
+        duracao = np.full(quantidade, self.servico[self.deposito])
+        atraso = np.zeros(quantidade)
+        cedo = np.full(quantidade, self.abertura[self.deposito])
+        tarde = np.full(quantidade, self.fechamento[self.deposito])
+        distancia = np.zeros(quantidade)
+        for k in range(1, n + 1):
+            origens, destinos = rotas[:, k - 1], rotas[:, k]
+            tempo = self._tempos(origens, destinos)
+            distancia += tempo * self.velocidade
+            delta = duracao - atraso + tempo
+            espera = np.maximum(self.abertura[destinos] - delta - tarde, 0.0)
+            extra = np.maximum(cedo + delta - self.fechamento[destinos], 0.0)
+            duracao = duracao + self.servico[destinos] + tempo + espera
+            atraso = atraso + extra
+            cedo = np.maximum(self.abertura[destinos] - delta, cedo) - espera
+            tarde = np.minimum(self.fechamento[destinos] - delta, tarde) + extra
+        return distancia + self.penalidade * atraso
+
+    def perfil(self, rota):
+        return PerfilRota(self, rota)
+
+class PerfilRota:
+    """
+    Folgas de uma rota fixa para testar mudanças em O(1): `frente[i]` resume
+    o trecho da base até a posição i e `tras[i]` o trecho da posição i até
+    o retorno à base (o horário mais tarde de `tras[i]` é a folga para trás
+    de i, o mais cedo de `frente[i]` somado à duração é a chegada para
+    frente). Uma mudança local junta poucos resumos em vez de simular a
+    rota de novo.
+
+    Args:
+        janelas (JanelasTempo): Janelas e custos
+        rota (list): Rota avaliada
+    """
+    def __init__(self, janelas, rota):
+        self.janelas = janelas
+        self.sequencia = janelas.sequencia(rota)
+        tamanho = len(self.sequencia)
+        self.frente = [None] * tamanho
+        self.tras = [None] * tamanho
+        # distancia_frente[i]: distância da base até a posição i
+        self.distancia_frente = [0.0] * tamanho
+
+        self.frente[0] = janelas.no(self.sequencia[0])
+        for i in range(1, tamanho):
+            a, b = self.sequencia[i - 1], self.sequencia[i]
+            self.frente[i] = juntar_segmentos(self.frente[i - 1], janelas.no(b), janelas.tempo(a, b))
+            self.distancia_frente[i] = self.distancia_frente[i - 1] + janelas.distancia(a, b)
+        self.tras[-1] = janelas.no(self.sequencia[-1])
+        for i in range(tamanho - 2, -1, -1):
+            a, b = self.sequencia[i], self.sequencia[i + 1]
+            self.tras[i] = juntar_segmentos(janelas.no(a), self.tras[i + 1], janelas.tempo(a, b))
+
+    @property
+    def distancia(self):
+        return self.distancia_frente[-1]
+
+    @property
+    def atraso(self):
+        return self.frente[-1][1]
+
+    def custo(self):
+        return self.distancia + self.janelas.penalidade * self.atraso
+
+    def rota(self):
+        """Rota sem a base repetida no final."""
+        return self.sequencia[:-1]
+
+    def insercao(self, cidade, posicao):
+        """
+        Efeito de inserir uma cidade entre as posições `posicao` e
+        `posicao + 1`, em O(1).
+
+        Returns:
+            tuple: (acréscimo de distância, atraso total da rota nova)
+        """
+        j = self.janelas
+        a, b = self.sequencia[posicao], self.sequencia[posicao + 1]
+        resumo = juntar_segmentos(self.frente[posicao], j.no(cidade), j.tempo(a, cidade))
+        resumo = juntar_segmentos(resumo, self.tras[posicao + 1], j.tempo(cidade, b))
+        acrescimo = j.distancia(a, cidade) + j.distancia(cidade, b) - j.distancia(a, b)
+        return acrescimo, resumo[1]
+
+    def insercao_viavel(self, cidade, posicao):
+        return self.insercao(cidade, posicao)[1] <= _EPSILON
+
+    def remocao(self, posicao):
+        """
+        Efeito de retirar a cidade da posição dada (nunca a base), em O(1).
+
+        Returns:
+            tuple: (variação de distância, atraso total da rota nova)
+        """
+        j = self.janelas
+        a, c, b = self.sequencia[posicao - 1], self.sequencia[posicao], self.sequencia[posicao + 1]
+        resumo = juntar_segmentos(self.frente[posicao - 1], self.tras[posicao + 1], j.tempo(a, b))
+        return j.distancia(a, b) - j.distancia(a, c) - j.distancia(c, b), resumo[1]
+
+    def dois_opt(self, i, k, invertido):
+        """
+        Efeito de inverter as posições i + 1 .. k, em O(1) dado o resumo do
+        trecho já invertido. Numa varredura com i fixo e k crescente esse
+        resumo cresce uma cidade por passo (ver trecho_invertido), então
+        cada teste custa O(1).
+
+        Args:
+            i (int): Última posição antes do trecho invertido
+            k (int): Última posição do trecho invertido
+            invertido (tuple): (resumo, distância interna) do trecho k .. i + 1
+
+        Returns:
+            tuple: (variação de distância, atraso total da rota nova)
+        """
+        j = self.janelas
+        s = self.sequencia
+        resumo, interna = invertido
+        novo = juntar_segmentos(self.frente[i], resumo, j.tempo(s[i], s[k]))
+        novo = juntar_segmentos(novo, self.tras[k + 1], j.tempo(s[i + 1], s[k + 1]))
+        distancia = (self.distancia_frente[i] + j.distancia(s[i], s[k]) + interna
+                     + j.distancia(s[i + 1], s[k + 1]) + self.distancia - self.distancia_frente[k + 1])
+        return distancia - self.distancia, novo[1]
+
+    def trecho_invertido(self, invertido, k):
+        """Acrescenta a posição k à frente do trecho invertido (k - 1 .. i + 1)."""
+        j = self.janelas
+        s = self.sequencia
+        if invertido is None:
+            return j.no(s[k]), 0.0
+        resumo, interna = invertido
+        return (juntar_segmentos(j.no(s[k]), resumo, j.tempo(s[k], s[k - 1])),
+                interna + j.distancia(s[k], s[k - 1]))
+
+def _tentar_2opt(perfil, custo_atual):
+    penalidade = perfil.janelas.penalidade
+    s = perfil.sequencia
+    for i in range(len(s) - 3):
+        invertido = None
+        for k in range(i + 1, len(s) - 1):
+            invertido = perfil.trecho_invertido(invertido, k)
+            if k == i + 1:
+                continue
+            variacao, atraso = perfil.dois_opt(i, k, invertido)
+            if perfil.distancia + variacao + penalidade * atraso < custo_atual - _EPSILON:
+                return s[:i + 1] + s[i + 1:k + 1][::-1] + s[k + 1:]
+    return None
+
+def _tentar_or_opt(perfil, custo_atual, tamanho_maximo):
+    # Move o trecho p .. q para outra posição; o trecho entre a origem e o
+    # destino é estendido uma cidade por passo, então cada teste é O(1)
+    j = perfil.janelas
+    penalidade = j.penalidade
+    s = perfil.sequencia
+    ultimo = len(s) - 2
+    for p in range(1, ultimo + 1):
+        segmento = None
+        for q in range(p, min(p + tamanho_maximo, ultimo + 1)):
+            segmento = j.no(s[q]) if segmento is None else \
+                juntar_segmentos(segmento, j.no(s[q]), j.tempo(s[q - 1], s[q]))
+            retirada = j.distancia(s[p - 1], s[q + 1]) - j.distancia(s[p - 1], s[p]) - j.distancia(s[q], s[q + 1])
+
+            # Destino antes do trecho: entre x e x + 1, com x < p - 1
+            meio = None
+            for x in range(p - 2, -1, -1):
+                meio = j.no(s[x + 1]) if meio is None else \
+                    juntar_segmentos(j.no(s[x + 1]), meio, j.tempo(s[x + 1], s[x + 2]))
+                novo = juntar_segmentos(perfil.frente[x], segmento, j.tempo(s[x], s[p]))
+                novo = juntar_segmentos(novo, meio, j.tempo(s[q], s[x + 1]))
+                novo = juntar_segmentos(novo, perfil.tras[q + 1], j.tempo(s[p - 1], s[q + 1]))
+                variacao = retirada + j.distancia(s[x], s[p]) + j.distancia(s[q], s[x + 1]) - \
+                    j.distancia(s[x], s[x + 1])
+                if perfil.distancia + variacao + penalidade * novo[1] < custo_atual - _EPSILON:
+                    return s[:x + 1] + s[p:q + 1] + s[x + 1:p] + s[q + 1:]
+
+            # Destino depois do trecho: entre x e x + 1, com x > q
+            meio = None
+            for x in range(q + 1, ultimo + 1):
+                meio = j.no(s[x]) if meio is None else \
+                    juntar_segmentos(meio, j.no(s[x]), j.tempo(s[x - 1], s[x]))
+                novo = juntar_segmentos(perfil.frente[p - 1], meio, j.tempo(s[p - 1], s[q + 1]))
+                novo = juntar_segmentos(novo, segmento, j.tempo(s[x], s[p]))
+                novo = juntar_segmentos(novo, perfil.tras[x + 1], j.tempo(s[q], s[x + 1]))
+                variacao = retirada + j.distancia(s[x], s[p]) + j.distancia(s[q], s[x + 1]) - \
+                    j.distancia(s[x], s[x + 1])
+                if perfil.distancia + variacao + penalidade * novo[1] < custo_atual - _EPSILON:
+                    return s[:p] + s[q + 1:x + 1] + s[p:q + 1] + s[x + 1:]
+    return None
+
+def busca_local_janelas(rota, janelas, or_opt=True, tamanho_segmento=3, instrumentacao=None):
+    """
+    Busca local 2-opt + Or-opt sobre o custo penalizado (distância mais
+    atraso). O perfil da rota é refeito só depois de cada melhora; dentro
+    de uma varredura todo movimento é testado em O(1) pelas folgas, então
+    uma passada completa custa O(n^2) em vez de O(n^3).
+
+    Args:
+        rota (list): Rota inicial (qualquer rotação, base incluída)
+        janelas (JanelasTempo): Janelas e custos
+        or_opt (bool): Também tenta realocar trechos
+        tamanho_segmento (int): Maior trecho movido pelo Or-opt
+        instrumentacao (Instrumentacao, opcional): Contador de melhoras
+
+    Returns:
+        tuple: (rota melhorada começando na base, distância, atraso total)
+    """
+    perfil = janelas.perfil(rota)
+    while True:
+        custo_atual = perfil.custo()
+        sequencia = _tentar_2opt(perfil, custo_atual)
+        if sequencia is None and or_opt:
+            sequencia = _tentar_or_opt(perfil, custo_atual, tamanho_segmento)
+        if sequencia is None:
+            break
+        perfil = janelas.perfil(sequencia[:-1])
+        if instrumentacao is not None:
+            instrumentacao.contar('melhoras_janelas')
+    return perfil.rota(), perfil.distancia, perfil.atraso
+
+def janelas_de_percurso(percurso, matriz_distancias, largura, velocidade=1.0, servico=0.0, deposito=0, semente=None):
+    """
+    Gera janelas que o percurso dado cumpre: cada cidade recebe uma janela
+    de `largura` em volta do horário em que o percurso passa por ela,
+    deslocada ao acaso. Útil para montar instâncias de teste viáveis.
+
+    Returns:
+        JanelasTempo: Janelas com abertura e fechamento por cidade
+    """
+    rng = np.random.default_rng(semente)
+    matriz = np.asarray(matriz_distancias, dtype=np.float64)
+    n = len(matriz)
+    servicos = np.full(n, float(servico))
+    janelas = JanelasTempo(matriz, np.zeros(n), np.full(n, np.inf), servicos, velocidade, deposito)
+    sequencia = janelas.sequencia(percurso)
+    chegada = np.zeros(n)
+    horario = 0.0
+    for anterior, cidade in zip(sequencia, sequencia[1:-1]):
+        horario += servicos[anterior] + matriz[anterior, cidade] / velocidade
+        chegada[cidade] = horario
+    deslocamento = rng.uniform(0.0, largura, n)
+    janelas.abertura = np.maximum(chegada - deslocamento, 0.0)
+    janelas.fechamento = janelas.abertura + largura
+    janelas.abertura[deposito] = 0.0
+    janelas.fechamento[deposito] = np.inf
+    return janelas
+
+if __name__ == "__main__":
+    from ler_arquivo_tsp import ler_instancia_tsp
+    from distancias import matriz_distancias_instancia
+    from alg_guloso import resolver_caixeiro_viajante_guloso
+    from alg_lin_kernighan import resolver_caixeiro_viajante_lk
+    from instrumentacao import Instrumentacao
+
+    instancia = ler_instancia_tsp('tsp/berlin52.tsp')
+    matriz = matriz_distancias_instancia(instancia, 'tsplib')
+    silenciosa = Instrumentacao(saidas=[], medir=False)
+    referencia, _ = resolver_caixeiro_viajante_lk(instancia.cidades(), matriz, instrumentacao=silenciosa)
+    janelas = janelas_de_percurso(referencia, matriz, largura=1500, semente=0)
+
+    inicial, _, _ = resolver_caixeiro_viajante_guloso(instancia.cidades(), matriz_distancias=matriz,
+                                                      instrumentacao=silenciosa, registrar_etapas=False)
+    distancia, atraso = janelas.avaliar(inicial)
+    print(f"Guloso: distância {distancia:.0f}, atraso {atraso:.0f}")
+    rota, distancia, atraso = busca_local_janelas(inicial, janelas)
+    print(f"Busca local com janelas: distância {distancia:.0f}, atraso {atraso:.0f}")
@@ -1,15 +1,173 @@
-def ler_arquivo_tsp(caminho_arquivo):
-    cidades = []
+import re
+import numpy as np
+
+# Linhas de palavra-chave do formato TSPLIB ("CHAVE : valor" ou "NOME_SECTION").
+# Linhas de dados sempre começam com número, então não casam com o padrão.
+_PALAVRA_CHAVE = re.compile(r'^[ \t]*([A-Z][A-Z0-9_]*)[ \t]*(?::[ \t]*(.*?))?[ \t]*\r?$', re.M)
+
+# Formatos por coluna de matrizes simétricas equivalem aos formatos por linha
+# do triângulo oposto.
+_FORMATOS_EQUIVALENTES = {
+    'UPPER_COL': 'LOWER_ROW',
+    'LOWER_COL': 'UPPER_ROW',
+    'UPPER_DIAG_COL': 'LOWER_DIAG_ROW',
+    'LOWER_DIAG_COL': 'UPPER_DIAG_ROW',
+}
+
+class InstanciaTSP:
+    """
+    Instância lida de um arquivo TSPLIB.
+
+    Atributos:
+        nome (str): Valor de NAME
+        dimensao (int): Número de nós (DIMENSION)
+        tipo_peso (str): EDGE_WEIGHT_TYPE (EUC_2D, CEIL_2D, GEO, ATT, EXPLICIT...)
+        coordenadas (np.ndarray): Coordenadas n x 2 (ou n x 3), ou None
+        matriz_pesos (np.ndarray): Matriz n x n de EDGE_WEIGHT_SECTION, ou None
+        demandas (np.ndarray): Demanda por nó (DEMAND_SECTION), ou None
+        depositos (list): Índices (base 0) de DEPOT_SECTION
+        metadados (dict): Todas as chaves do cabeçalho
+    """
+    def __init__(self, nome, dimensao, tipo_peso, coordenadas, matriz_pesos, demandas,
+                 depositos, metadados):
+        self.nome = nome
+        self.dimensao = dimensao
+        self.tipo_peso = tipo_peso
+        self.coordenadas = coordenadas
+        self.matriz_pesos = matriz_pesos
+        self.demandas = demandas
+        self.depositos = depositos
+        self.metadados = metadados
+
+    def __len__(self):
+        return self.dimensao
+
+    def cidades(self):
+        """
+        Returns:
+            list: Coordenadas como lista de tuplas (x, y), formato usado pelos solvers
+        """
+        if self.coordenadas is None:
+            raise ValueError(f"A instância {self.nome} não possui coordenadas")
+        return [tuple(c) for c in self.coordenadas[:, :2].tolist()]
+
+def _ler_por_no(valores, dimensao, colunas):
+    # Cada linha traz o número do nó (base 1) seguido de `colunas` valores
+    tabela = valores.reshape(-1, colunas + 1)
+    if len(tabela) != dimensao:
+        raise ValueError(f"Esperados {dimensao} nós, encontrados {len(tabela)}")
+    dados = np.empty((dimensao, colunas), dtype=np.float64)
+    dados[tabela[:, 0].astype(np.int64) - 1] = tabela[:, 1:]
+    return dados
+
+def _montar_matriz(valores, dimensao, formato, caminho_arquivo):
+    formato = _FORMATOS_EQUIVALENTES.get(formato, formato)
+    n = dimensao
+    if formato == 'FULL_MATRIX':
+        if len(valores) < n * n:
+            raise ValueError(f"{caminho_arquivo}: EDGE_WEIGHT_SECTION incompleta para {formato} com {n} nós "
+                             f"(esperados {n * n} valores, encontrados {len(valores)})")
+        return valores[:n * n].reshape(n, n).copy()
+
+    matriz = np.zeros((n, n), dtype=np.float64)
+    if formato == 'UPPER_ROW':
+        linhas, colunas = np.triu_indices(n, 1)
+    elif formato == 'LOWER_ROW':
+        linhas, colunas = np.tril_indices(n, -1)
+    elif formato == 'UPPER_DIAG_ROW':
+        linhas, colunas = np.triu_indices(n, 0)
+    elif formato == 'LOWER_DIAG_ROW':
+        linhas, colunas = np.tril_indices(n, 0)
+    else:
+        raise ValueError(f"EDGE_WEIGHT_FORMAT não suportado: {formato}")
+
+    if len(valores) < len(linhas):
+        raise ValueError(f"{caminho_arquivo}: EDGE_WEIGHT_SECTION incompleta para {formato} com {n} nós "
+                         f"(esperados {len(linhas)} valores, encontrados {len(valores)})")
+    matriz[linhas, colunas] = valores[:len(linhas)]
+    matriz[colunas, linhas] = valores[:len(linhas)]
+    return matriz
+
+def ler_instancia_tsp(caminho_arquivo):
+    """
+    Lê um arquivo no formato TSPLIB completo. O cabeçalho é lido linha a linha
+    e cada seção de dados é convertida em bloco para arrays NumPy
+    pré-alocados pelo DIMENSION.
+
+    Args:
+        caminho_arquivo (str): Caminho do arquivo .tsp/.atsp/.vrp
+
+    Returns:
+        InstanciaTSP: Coordenadas, matriz explícita e metadados da instância
+    """
     with open(caminho_arquivo, 'r') as arquivo:
-        ler_coordenadas = False
-        for linha in arquivo:
-            if linha.strip() == "NODE_COORD_SECTION":
-                ler_coordenadas = True
-                continue
-            if linha.strip() == "EOF":
+        texto = arquivo.read()
+
+    metadados = {}
+    secoes = {}
+    secao_atual = None
+    inicio_secao = 0
+
+    for correspondencia in _PALAVRA_CHAVE.finditer(texto):
+        chave, valor = correspondencia.group(1), correspondencia.group(2)
+        if secao_atual is not None:
+            secoes[secao_atual] = texto[inicio_secao:correspondencia.start()]
+            secao_atual = None
+        if chave == 'EOF':
+            break
+        if chave.endswith('_SECTION'):
+            secao_atual = chave
+            inicio_secao = correspondencia.end()
+        elif valor is not None:
+            metadados[chave] = valor.strip()
+    if secao_atual is not None:
+        secoes[secao_atual] = texto[inicio_secao:]
+
+    if 'DIMENSION' in metadados:
+        dimensao = int(metadados['DIMENSION'])
+    elif 'NODE_COORD_SECTION' in secoes:
+        dimensao = len(secoes['NODE_COORD_SECTION'].strip().splitlines())
+    else:
+        raise ValueError("Arquivo sem DIMENSION nem NODE_COORD_SECTION")
+
+    tipo_peso = metadados.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+
+    coordenadas = None
+    for nome_secao in ('NODE_COORD_SECTION', 'DISPLAY_DATA_SECTION'):
+        if nome_secao in secoes:
+            valores = np.array(secoes[nome_secao].split(), dtype=np.float64)
+            colunas = len(valores) // dimensao - 1
+            coordenadas = _ler_por_no(valores, dimensao, colunas)
+            break
+
+    matriz_pesos = None
+    if 'EDGE_WEIGHT_SECTION' in secoes:
+        valores = np.array(secoes['EDGE_WEIGHT_SECTION'].split(), dtype=np.float64)
+        formato = metadados.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX')
+        matriz_pesos = _montar_matriz(valores, dimensao, formato, caminho_arquivo)
+
+    demandas = None
+    if 'DEMAND_SECTION' in secoes:
+        valores = np.array(secoes['DEMAND_SECTION'].split(), dtype=np.float64)
+        demandas = _ler_por_no(valores, dimensao, 1)[:, 0]
+
+    depositos = []
+    if 'DEPOT_SECTION' in secoes:
+        for token in secoes['DEPOT_SECTION'].split():
+            if int(token) < 0:
                 break
-            if ler_coordenadas:
-                partes = linha.strip().split()
-                if len(partes) == 3: 
-                    cidades.append((float(partes[1]), float(partes[2])))
-    return cidades
\ No newline at end of file
+            depositos.append(int(token) - 1)
+
+    return InstanciaTSP(
+        nome=metadados.get('NAME', ''),
+        dimensao=dimensao,
+        tipo_peso=tipo_peso,
+        coordenadas=coordenadas,
+        matriz_pesos=matriz_pesos,
+        demandas=demandas,
+        depositos=depositos,
+        metadados=metadados,
+    )
+
+def ler_arquivo_tsp(caminho_arquivo):
+    return ler_instancia_tsp(caminho_arquivo).cidades()
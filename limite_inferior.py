@@ -0,0 +1,185 @@
+import math
+import numpy as np
+from instrumentacao import Instrumentacao, instrumentacao_padrao
+from distancias import OraculoDistancias, gap_percentual
+
+def _funcao_linha(matriz):
+    # Linha i da matriz de custos em float64, para qualquer fonte de custos
+    if isinstance(matriz, OraculoDistancias):
+        return lambda i: matriz.linha(i).astype(np.float64, copy=False)
+    matriz = np.asarray(matriz)
+    return lambda i: matriz[i].astype(np.float64, copy=False)
+
+def _custos_inteiros(matriz):
+    dtype = matriz.dtype if isinstance(matriz, OraculoDistancias) else np.asarray(matriz).dtype
+    return np.issubdtype(dtype, np.integer)
+
+def arvore_geradora_minima(matriz, penalidades=None, excluir=None, raiz=None):
+    """
+    Árvore geradora mínima pelo algoritmo de Prim em O(n^2), com cada passo
+    vetorizado sobre uma linha inteira da matriz: sem heap nem laço Python
+    por aresta.
+
+    Args:
+        matriz: Lista de listas, np.ndarray ou OraculoDistancias
+        penalidades (np.ndarray, opcional): Custo extra somado às duas pontas
+            de cada aresta (os multiplicadores de Held-Karp)
+        excluir (int, opcional): Nó deixado fora da árvore
+        raiz (int, opcional): Nó inicial (padrão: o primeiro não excluído)
+
+    Returns:
+        tuple: (pais, custo), com pais[raiz] = -1 e pais[excluir] = -1
+    """
+    linha = _funcao_linha(matriz)
+    n = len(matriz)
+    if penalidades is None:
+        penalidades = np.zeros(n)
+    if raiz is None:
+        raiz = 1 if excluir == 0 else 0
+
+    na_arvore = np.zeros(n, dtype=bool)
+    if excluir is not None:
+        na_arvore[excluir] = True
+    na_arvore[raiz] = True
+    pais = np.full(n, -1, dtype=np.int64)
+    chave = linha(raiz) + penalidades[raiz] + penalidades
+    chave[na_arvore] = np.inf
+    pais[~na_arvore] = raiz
+
+    custo = 0.0
+    for _ in range(n - 1 - (excluir is not None)):
+        v = int(np.argmin(chave))
+        custo += chave[v]
+        na_arvore[v] = True
+        chave[v] = np.inf
+        nova = linha(v) + penalidades[v] + penalidades
+        melhora = (nova < chave) & ~na_arvore
+        chave[melhora] = nova[melhora]
+        pais[melhora] = v
+    return pais, custo
+
+def um_arvore(matriz, penalidades, especial=0):
+    """
+    1-árvore mínima: árvore geradora dos nós sem o nó especial, mais as duas
+    arestas mais baratas ligando o nó especial a ela.
+
+    Returns:
+        tuple: (custo com penalidades, grau de cada nó, pais da árvore)
+    """
+    n = len(matriz)
+    pais, custo = arvore_geradora_minima(matriz, penalidades, excluir=especial)
+    custos_especial = _funcao_linha(matriz)(especial) + penalidades[especial] + penalidades
+    custos_especial[especial] = np.inf
+    duas = np.argpartition(custos_especial, 1)[:2]
+    custo += custos_especial[duas].sum()
+
+    filhos = np.flatnonzero(pais >= 0)
+    graus = np.bincount(filhos, minlength=n) + np.bincount(pais[filhos], minlength=n)
+    graus[duas] += 1
+    graus[especial] += 2
+    return custo, graus, pais
+
+def limite_held_karp(matriz, limite_superior=None, max_iteracoes=300, especial=0, instrumentacao=None):
+    """
+    Limitante inferior de Held-Karp: maximiza o custo da 1-árvore com
+    penalidades nos nós por subida de subgradiente (passo de Held, Wolfe e
+    Crowder). Qualquer percurso custa pelo menos o valor devolvido, então o
+    gap em relação a ele é um gap certificado. Em instâncias euclidianas o
+    limitante costuma ficar a menos de 1% do ótimo.
+
+    Args:
+        matriz: Lista de listas, np.ndarray ou OraculoDistancias (simétrica)
+        limite_superior (float, opcional): Custo de algum percurso, usado no
+            tamanho do passo; por padrão vem da busca local 2-opt + Or-opt
+        max_iteracoes (int): Limite de iterações do subgradiente
+        especial (int): Nó especial da 1-árvore
+        instrumentacao (Instrumentacao, opcional): Cronômetros e eventos
+
+    Returns:
+        tuple: (limitante inferior, penalidades ótimas encontradas)
+    """
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    n = len(matriz)
+    if limite_superior is None:
+        from busca_local import melhorar_rota
+        with instrumentacao.fase('limite_superior'):
+            _, limite_superior = melhorar_rota(list(range(n)), matriz)
+
+    penalidades = np.zeros(n)
+    melhores_penalidades = penalidades.copy()
+    melhor_limite = -np.inf
+    passo = 2.0
+    sem_melhora = 0
+    paciencia = max(10, n // 10)
+
+    # Mesmo sem iterações de subgradiente a 1-árvore sem penalidades é avaliada: já é um limitante
+    iteracao = 0
+    for iteracao in range(max(1, max_iteracoes)):
+        with instrumentacao.fase('um_arvore'):
+            custo, graus, _ = um_arvore(matriz, penalidades, especial)
+        limite = custo - 2 * penalidades.sum()
+        if limite > melhor_limite + 1e-9:
+            melhor_limite = limite
+            melhores_penalidades = penalidades.copy()
+            sem_melhora = 0
+        else:
+            sem_melhora += 1
+            if sem_melhora >= paciencia:
+                passo /= 2
+                sem_melhora = 0
+
+        if instrumentacao.emitindo:
+            instrumentacao.emitir('limite.iteracao', iteracao=iteracao, limite=limite, melhor_limite=melhor_limite)
+
+        subgradiente = graus - 2
+        norma = float(subgradiente @ subgradiente)
+        # Todos os graus iguais a 2: a 1-árvore é um percurso ótimo
+        if norma == 0 or passo < 1e-6 or melhor_limite >= limite_superior - 1e-9:
+            break
+        penalidades = penalidades + passo * (limite_superior - limite) / norma * subgradiente
+    instrumentacao.contar('iteracoes_subgradiente', iteracao + 1)
+
+    # Com custos inteiros todo percurso tem custo inteiro
+    if _custos_inteiros(matriz):
+        melhor_limite = math.ceil(melhor_limite - 1e-6)
+    return melhor_limite, melhores_penalidades
+
+def gap_certificado(custo, limite):
+    """
+    Gap percentual em relação ao limitante inferior: o ótimo está
+    garantidamente a no máximo essa distância do custo informado.
+    """
+    return gap_percentual(custo, limite)
+
+def instrumentacao_com_limite(matriz=None, caminho_arquivo=None, tipo='tsplib', **argumentos):
+    """
+    Instrumentação que faz toda execução de solver informar o gap
+    certificado no evento '*.fim' (e em relatorio()). O limitante vem do
+    cache de instâncias quando há um arquivo TSPLIB, e só é calculado na
+    primeira vez; senão é calculado a partir da matriz.
+
+    Args:
+        matriz (opcional): Matriz de custos da instância
+        caminho_arquivo (str, opcional): Arquivo .tsp da instância
+        tipo (str): Tipo de distância usado com o arquivo
+        **argumentos: Demais argumentos de Instrumentacao
+
+    Returns:
+        Instrumentacao: Instrumentação com limite_inferior definido
+    """
+    if caminho_arquivo is not None:
+        from cache_instancias import carregar_limite_inferior
+        limite = carregar_limite_inferior(caminho_arquivo, tipo)
+    else:
+        limite, _ = limite_held_karp(matriz, instrumentacao=Instrumentacao(saidas=[], medir=False))
+    return Instrumentacao(limite_inferior=limite, **argumentos)
+
+def criterio_gap(limite, gap_maximo=1.0):
+    """
+    Critério de parada para os solvers que aceitam criterio_parada: para
+    quando o melhor custo está a no máximo gap_maximo % do limitante.
+
+    Returns:
+        callable: Função custo -> bool
+    """
+    return lambda custo: gap_certificado(custo, limite) <= gap_maximo
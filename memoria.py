@@ -0,0 +1,133 @@
+import sys
+import resource
+import tracemalloc
+
+from instrumentacao import Instrumentacao
+
+def pico_rss_mb():
+    """
+    Pico de memória residente (RSS) do processo desde o início, em MB.
+    O valor é monotônico: nunca diminui durante a vida do processo.
+    """
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB e macOS em bytes
+    if sys.platform == 'darwin':
+        pico /= 1024
+    return pico / 1024
+
+class MedidorMemoria:
+    """
+    Mede a memória por fase de um solver com tracemalloc: o pico alocado
+    acima do início da fase, quanto o pico de RSS do processo cresceu
+    durante ela (o pico de RSS é acumulado desde o início do processo, então
+    fases que não passam do recorde anterior crescem 0) e os maiores
+    alocadores (arquivo:linha) do momento em que a fase bateu seu próprio
+    recorde.
+
+    Args:
+        top (int): Quantidade de alocadores guardados por fase
+        quadros (int): Profundidade da pilha registrada pelo tracemalloc
+    """
+    def __init__(self, top=5, quadros=1):
+        self.top = top
+        self.quadros = quadros
+        self.fases = {}
+        self.pico_total = 0
+        self._iniciou_tracemalloc = False
+        self._pilha = []
+
+    def iniciar(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.quadros)
+            self._iniciou_tracemalloc = True
+        tracemalloc.reset_peak()
+
+    def parar(self):
+        self._atualizar_pico_total()
+        if self._iniciou_tracemalloc:
+            tracemalloc.stop()
+            self._iniciou_tracemalloc = False
+
+    def _atualizar_pico_total(self):
+        if tracemalloc.is_tracing():
+            self.pico_total = max(self.pico_total, tracemalloc.get_traced_memory()[1])
+
+    def entrar_fase(self, nome):
+        if not tracemalloc.is_tracing():
+            self.iniciar()
+        atual, pico = tracemalloc.get_traced_memory()
+        self.pico_total = max(self.pico_total, pico)
+        # Guarda o pico da fase externa antes de zerá-lo para a fase interna
+        if self._pilha:
+            self._pilha[-1][2] = max(self._pilha[-1][2], pico)
+        self._pilha.append([nome, atual, 0, pico_rss_mb()])
+        tracemalloc.reset_peak()
+
+    def sair_fase(self, nome):
+        _, inicio, pico_anterior, rss_inicio = self._pilha.pop()
+        pico = max(tracemalloc.get_traced_memory()[1], pico_anterior)
+        self.pico_total = max(self.pico_total, pico)
+        if self._pilha:
+            self._pilha[-1][2] = max(self._pilha[-1][2], pico)
+        pico_fase = pico - inicio
+
+        registro = self.fases.setdefault(nome, {'pico_bytes': 0, 'crescimento_rss_mb': 0.0, 'alocadores': []})
+        registro['crescimento_rss_mb'] = max(registro['crescimento_rss_mb'], pico_rss_mb() - rss_inicio)
+        # Só tira uma nova foto quando o recorde da fase cresce mais de 10%,
+        # para que fases repetidas a cada geração não paguem o snapshot sempre
+        if pico_fase > registro['pico_bytes'] * 1.1:
+            registro['alocadores'] = self._maiores_alocadores()
+        registro['pico_bytes'] = max(registro['pico_bytes'], pico_fase)
+
+    def _maiores_alocadores(self):
+        estatisticas = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]).statistics('lineno')
+        return [
+            {'local': f"{e.traceback[0].filename}:{e.traceback[0].lineno}",
+             'bytes': e.size,
+             'blocos': e.count}
+            for e in estatisticas[:self.top]
+        ]
+
+    def relatorio(self):
+        """
+        Returns:
+            dict: Pico total rastreado, pico de RSS do processo e o
+                detalhamento por fase
+        """
+        self._atualizar_pico_total()
+        return {
+            'pico_tracemalloc_mb': self.pico_total / 2**20,
+            'pico_rss_mb': pico_rss_mb(),
+            'fases': {
+                nome: {
+                    'pico_mb': registro['pico_bytes'] / 2**20,
+                    'crescimento_rss_mb': registro['crescimento_rss_mb'],
+                    'alocadores': registro['alocadores'],
+                }
+                for nome, registro in self.fases.items()
+            },
+        }
+
+def executar_com_memoria(solver, *args, top=5, **kwargs):
+    """
+    Executa um solver que aceita o parâmetro instrumentacao com a medição de
+    memória ligada e devolve o resultado junto com o relatório.
+
+    Args:
+        solver (callable): Função do solver (ex.: resolver_caixeiro_viajante_guloso)
+        top (int): Quantidade de alocadores por fase no relatório
+
+    Returns:
+        tuple: (resultado do solver, relatório da instrumentação)
+    """
+    medidor = MedidorMemoria(top=top)
+    instrumentacao = Instrumentacao(saidas=kwargs.pop('saidas', []), memoria=medidor)
+    medidor.iniciar()
+    try:
+        resultado = solver(*args, instrumentacao=instrumentacao, **kwargs)
+    finally:
+        medidor.parar()
+    return resultado, instrumentacao.relatorio()
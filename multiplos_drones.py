@@ -0,0 +1,242 @@
+import heapq
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from instrumentacao import Instrumentacao, instrumentacao_padrao
+from distancias import OraculoDistancias, custo_rota, matriz_distancias_numpy, matriz_simetrica
+
+# Viagens com até esta quantidade de pontos (base incluída) são otimizadas por força bruta
+LIMITE_FORCA_BRUTA = 10
+
+def _custos_sequencia(matriz, sequencia, deposito):
+    # Ida da base, volta para a base e custo de cada trecho consecutivo da sequência
+    if isinstance(matriz, OraculoDistancias):
+        base = np.full(len(sequencia), deposito)
+        ida = matriz.distancias_pares(base, sequencia)
+        volta = matriz.distancias_pares(sequencia, base)
+        trechos = matriz.distancias_pares(sequencia[:-1], sequencia[1:])
+    else:
+        ida = matriz[deposito, sequencia]
+        volta = matriz[sequencia, deposito]
+        trechos = matriz[sequencia[:-1], sequencia[1:]]
+    return ida.astype(np.float64), volta.astype(np.float64), trechos.astype(np.float64)
+
+def dividir_percurso(percurso, matriz_distancias, deposito=0, alcance=None, capacidade=None, demandas=None):
+    """
+    Divide um percurso gigante em viagens viáveis de drone (cada uma sai da
+    base e volta para ela) de forma ótima para a ordem dada: é o "split" de
+    Prins, uma programação dinâmica sobre os cortes da sequência.
+
+    Com as somas de prefixo dos trechos e das demandas, o custo e a carga
+    de qualquer viagem (i, j] saem em O(1). Para cada corte i as viagens
+    candidatas são as j até o limite de carga e de alcance (achados por
+    busca binária nos prefixos) e são avaliadas num único passo
+    vetorizado, então o total é O(n * k), com k o maior número de entregas
+    por viagem.
+
+    Args:
+        percurso (list): Percurso gigante (com ou sem a base)
+        matriz_distancias: Lista de listas, np.ndarray ou OraculoDistancias
+        deposito (int): Índice da base
+        alcance (float, opcional): Distância máxima de uma viagem (bateria)
+        capacidade (float, opcional): Carga máxima de uma viagem
+        demandas (array, opcional): Carga de cada cidade (padrão: 1 por entrega)
+
+    Returns:
+        tuple: (viagens, custo total), cada viagem como lista que começa na base
+    """
+    matriz = matriz_distancias
+    if not isinstance(matriz, OraculoDistancias):
+        matriz = np.asarray(matriz)
+    percurso = [int(c) for c in percurso]
+    if deposito in percurso:
+        posicao = percurso.index(deposito)
+        percurso = percurso[posicao + 1:] + percurso[:posicao]
+    sequencia = np.asarray(percurso, dtype=np.int64)
+    m = len(sequencia)
+    if m == 0:
+        return [], 0.0
+
+    ida, volta, trechos = _custos_sequencia(matriz, sequencia, deposito)
+    # Trechos de custo infinito (ex.: vento contra) são cortes obrigatórios: ficam fora das somas de
+    # prefixo, onde inf - inf daria NaN, e nenhuma viagem pode atravessá-los
+    bloqueados = ~np.isfinite(trechos)
+    prefixo = np.concatenate([[0.0], np.cumsum(np.where(bloqueados, 0.0, trechos))])
+    prefixo_bloqueios = np.concatenate([[0], np.cumsum(bloqueados)])
+    cargas = np.ones(m) if demandas is None else np.asarray(demandas, dtype=np.float64)[sequencia]
+    prefixo_carga = np.concatenate([[0.0], np.cumsum(cargas)])
+    alcance = np.inf if alcance is None else alcance
+    capacidade = np.inf if capacidade is None else capacidade
+
+    inviaveis = ~np.isfinite(ida + volta) | (ida + volta > alcance) | (cargas > capacidade)
+    if inviaveis.any():
+        cidade = int(sequencia[np.argmax(inviaveis)])
+        raise ValueError(f"A cidade {cidade} não cabe sozinha numa viagem (alcance ou capacidade)")
+
+    # valor[j]: menor custo para atender as j primeiras entregas; anterior[j]: corte que o alcança
+    valor = np.full(m + 1, np.inf)
+    valor[0] = 0.0
+    anterior = np.zeros(m + 1, dtype=np.int64)
+    for i in range(m):
+        # A viagem (i, j] atende sequencia[i .. j - 1]
+        fim_carga = np.searchsorted(prefixo_carga, prefixo_carga[i] + capacidade, side='right') - 1
+        fim_alcance = np.searchsorted(prefixo, prefixo[i] + alcance, side='right')
+        fim_bloqueio = np.searchsorted(prefixo_bloqueios, prefixo_bloqueios[i], side='right')
+        fim = min(fim_carga, fim_alcance, fim_bloqueio, m)
+        ultimos = np.arange(i, fim)
+        viagem = ida[i] + prefixo[ultimos] - prefixo[i] + volta[ultimos]
+        custos = np.where(viagem <= alcance, valor[i] + viagem, np.inf)
+        melhora = custos < valor[ultimos + 1]
+        valor[ultimos[melhora] + 1] = custos[melhora]
+        anterior[ultimos[melhora] + 1] = i
+
+    viagens = []
+    j = m
+    while j > 0:
+        i = int(anterior[j])
+        viagens.append([deposito] + sequencia[i:j].tolist())
+        j = i
+    viagens.reverse()
+    return viagens, float(valor[m])
+
+def _submatriz(matriz, cidades):
+    cidades = np.asarray(cidades)
+    if isinstance(matriz, OraculoDistancias):
+        return matriz.distancias_bloco(cidades, cidades)
+    return np.asarray(matriz)[np.ix_(cidades, cidades)]
+
+def melhorar_viagem(submatriz):
+    """
+    Otimiza uma viagem isolada (índices locais, base na posição 0): força
+    bruta quando ela é pequena e busca local 2-opt + Or-opt nas demais.
+    Executado nos processos do pool.
+
+    Returns:
+        list: Ordem local começando pela base
+    """
+    n = len(submatriz)
+    if n <= 3:
+        return list(range(n))
+    if n <= LIMITE_FORCA_BRUTA:
+        from alg_forcabruta_lote import resolver_lote
+        percursos, _ = resolver_lote(submatriz[None])
+        return percursos[0].tolist()
+    from busca_local import melhorar_rota
+    ordem, _ = melhorar_rota(list(range(n)), submatriz)
+    posicao = ordem.index(0)
+    return ordem[posicao:] + ordem[:posicao]
+
+def distribuir_viagens(custos, drones):
+    """
+    Reparte as viagens entre os drones pela regra LPT (a viagem mais longa
+    vai para o drone menos ocupado), que limita o tempo do último drone a
+    4/3 do ótimo.
+
+    Returns:
+        list: Índices das viagens de cada drone
+    """
+    ocupacao = [(0.0, drone) for drone in range(drones)]
+    atribuicao = [[] for _ in range(drones)]
+    for viagem in sorted(range(len(custos)), key=lambda v: -custos[v]):
+        carga, drone = heapq.heappop(ocupacao)
+        atribuicao[drone].append(viagem)
+        heapq.heappush(ocupacao, (carga + custos[viagem], drone))
+    return atribuicao
+
+def resolver_multiplos_drones(cidades, matriz_distancias=None, deposito=0, alcance=None, capacidade=None,
+                              demandas=None, percurso=None, drones=None, processos=None, instrumentacao=None):
+    """
+    Planeja as entregas de vários drones em "rota primeiro, agrupa depois":
+    um percurso gigante (de qualquer solver; por padrão Lin-Kernighan a
+    partir do guloso, ou ILS com custos assimétricos) é dividido de forma
+    ótima em viagens que respeitam o alcance da bateria e a carga máxima,
+    e cada viagem é depois otimizada sozinha num pool de processos.
+    Otimizar uma viagem nunca aumenta seu comprimento, então ela continua
+    dentro do alcance.
+
+    Args:
+        cidades (list): Lista de coordenadas (x, y) das cidades, base incluída
+        matriz_distancias (opcional): Matriz de custos (lista de listas,
+            np.ndarray ou OraculoDistancias)
+        deposito (int): Índice da base
+        alcance (float, opcional): Distância máxima de uma viagem
+        capacidade (float, opcional): Carga máxima de uma viagem
+        demandas (array, opcional): Carga de cada cidade (padrão: 1)
+        percurso (list, opcional): Percurso gigante já calculado
+        drones (int, opcional): Reparte as viagens entre esse número de drones
+        processos (int, opcional): Processos do pool (padrão: número de
+            CPUs; 1 otimiza tudo no processo atual)
+        instrumentacao (Instrumentacao, opcional): Cronômetros e eventos
+
+    Returns:
+        tuple: (viagens, custo total) e, com drones informado, também a
+            lista de viagens de cada drone
+    """
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    inicio = time.perf_counter()
+    if matriz_distancias is None:
+        from alg_ils import LIMITE_MATRIZ
+        if len(cidades) <= LIMITE_MATRIZ:
+            matriz_distancias = matriz_distancias_numpy(cidades)
+        else:
+            matriz_distancias = OraculoDistancias(cidades)
+
+    if percurso is None:
+        with instrumentacao.fase('percurso_gigante'):
+            silenciosa = Instrumentacao(saidas=[], medir=False)
+            if matriz_simetrica(matriz_distancias):
+                from alg_lin_kernighan import resolver_caixeiro_viajante_lk
+                percurso, _ = resolver_caixeiro_viajante_lk(cidades, matriz_distancias, instrumentacao=silenciosa)
+            else:
+                # Lin-Kernighan supõe custos simétricos (ex.: sem vento); o ILS respeita o sentido das arestas
+                from alg_ils import resolver_caixeiro_viajante_ils
+                percurso, _ = resolver_caixeiro_viajante_ils(cidades, matriz_distancias, tempo_limite=float('inf'),
+                                                             max_iteracoes=5 * len(cidades), instrumentacao=silenciosa)
+
+    with instrumentacao.fase('divisao'):
+        viagens, _ = dividir_percurso(percurso, matriz_distancias, deposito, alcance, capacidade, demandas)
+    instrumentacao.contar('viagens', len(viagens))
+
+    with instrumentacao.fase('melhoria'):
+        submatrizes = [_submatriz(matriz_distancias, viagem) for viagem in viagens]
+        ordens = [None] * len(viagens)
+        # As viagens pequenas são resolvidas de forma exata todas juntas, num único lote vetorizado
+        pequenas = [v for v, submatriz in enumerate(submatrizes) if len(submatriz) <= LIMITE_FORCA_BRUTA]
+        if pequenas:
+            from alg_forcabruta_lote import resolver_caixeiro_viajante_forca_bruta_lote
+            percursos, _ = resolver_caixeiro_viajante_forca_bruta_lote(
+                matrizes=[submatrizes[v] for v in pequenas], instrumentacao=Instrumentacao(saidas=[], medir=False))
+            for v, ordem in zip(pequenas, percursos):
+                ordens[v] = ordem
+        grandes = [v for v in range(len(viagens)) if ordens[v] is None]
+        processos = processos or os.cpu_count() or 1
+        if processos == 1 or len(grandes) <= 1:
+            resultados = [melhorar_viagem(submatrizes[v]) for v in grandes]
+        else:
+            with ProcessPoolExecutor(max_workers=processos) as executor:
+                resultados = list(executor.map(melhorar_viagem, [submatrizes[v] for v in grandes],
+                                               chunksize=max(1, len(grandes) // (4 * processos))))
+        for v, ordem in zip(grandes, resultados):
+            ordens[v] = ordem
+        viagens = [[viagem[i] for i in ordem] for viagem, ordem in zip(viagens, ordens)]
+
+    custos = [custo_rota(viagem, matriz_distancias) for viagem in viagens]
+    custo_total = sum(custos)
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('drones.fim', viagens=len(viagens), custo=custo_total,
+                              tempo=time.perf_counter() - inicio)
+    if drones is None:
+        return viagens, custo_total
+    return viagens, custo_total, [[viagens[v] for v in lista] for lista in distribuir_viagens(custos, drones)]
+
+if __name__ == "__main__":
+    from ler_arquivo_tsp import ler_instancia_tsp
+    from distancias import matriz_distancias_instancia
+
+    instancia = ler_instancia_tsp('tsp/berlin52.tsp')
+    matriz = matriz_distancias_instancia(instancia, 'tsplib')
+    viagens, custo, por_drone = resolver_multiplos_drones(instancia.cidades(), matriz, alcance=3000,
+                                                          capacidade=8, drones=3)
+    for drone, lista in enumerate(por_drone):
+        print(f"Drone {drone + 1}: {lista}")
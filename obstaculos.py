@@ -0,0 +1,376 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from instrumentacao import instrumentacao_padrao
+from cache_instancias import DIRETORIO_CACHE, TAMANHO_MAXIMO_CACHE, CacheInstancias
+
+# Limite de elementos dos arrays temporários (segmentos x arestas) do teste de visibilidade
+_ELEMENTOS_BLOCO = 1 << 22
+
+def _produto_vetorial(u, v):
+    return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+class MapaObstaculos:
+    """
+    Zonas de voo proibido como polígonos simples. O grafo de visibilidade
+    usa como nós apenas os vértices convexos de cada polígono, afastados
+    por `margem` para fora (o ponto em que as arestas deslocadas de margem
+    se encontram): um caminho mínimo em volta de polígonos só dobra nesses
+    vértices, e com os nós fora das bordas o teste de visibilidade se
+    reduz quase sempre a "o segmento não cruza nenhuma aresta" (segmentos
+    que só tocam vértices ou bordas são conferidos à parte).
+
+    Args:
+        poligonos (list): Cada polígono como lista de vértices (x, y)
+        margem (float, opcional): Distância de segurança das bordas; por
+            padrão um milionésimo da diagonal da área dos obstáculos. Cidades
+            dentro dessa faixa são aceitas, mas o caminho até elas pode
+            cortar a faixa
+    """
+    def __init__(self, poligonos, margem=None):
+        self.poligonos = []
+        for poligono in poligonos:
+            vertices = np.asarray(poligono, dtype=np.float64)[:, :2]
+            # Sentido anti-horário (área com sinal positiva)
+            if _produto_vetorial(vertices, np.roll(vertices, -1, axis=0)).sum() < 0:
+                vertices = vertices[::-1]
+            self.poligonos.append(vertices)
+        todos = np.concatenate(self.poligonos) if self.poligonos else np.zeros((0, 2))
+        if margem is None:
+            diagonal = float(np.hypot(*(todos.max(axis=0) - todos.min(axis=0)))) if len(todos) else 1.0
+            margem = 1e-6 * diagonal
+        self.margem = margem
+        self.inicio_arestas = todos
+        self.fim_arestas = np.concatenate([np.roll(v, -1, axis=0) for v in self.poligonos]) \
+            if self.poligonos else np.zeros((0, 2))
+        nos = [self._vertices_convexos(vertices) for vertices in self.poligonos]
+        nos = np.concatenate(nos) if nos else np.zeros((0, 2))
+        self.nos = nos[~self.dentro(nos)]
+
+    def _vertices_convexos(self, vertices):
+        anteriores = np.roll(vertices, 1, axis=0)
+        seguintes = np.roll(vertices, -1, axis=0)
+        entrada = vertices - anteriores
+        saida = seguintes - vertices
+        convexo = _produto_vetorial(entrada, saida) > 0
+        # Normais para fora das duas arestas (polígono anti-horário)
+        normal_entrada = np.stack([entrada[:, 1], -entrada[:, 0]], axis=1)
+        normal_entrada /= np.linalg.norm(normal_entrada, axis=1, keepdims=True)
+        normal_saida = np.stack([saida[:, 1], -saida[:, 0]], axis=1)
+        normal_saida /= np.linalg.norm(normal_saida, axis=1, keepdims=True)
+        bissetriz = normal_entrada + normal_saida
+        # Ponto de encontro das duas arestas deslocadas: margem / cos(metade do ângulo) na bissetriz
+        escala = 2.0 * self.margem / np.maximum((bissetriz * bissetriz).sum(axis=1), 1e-12)
+        return (vertices + bissetriz * escala[:, None])[convexo]
+
+    def dentro(self, pontos):
+        """True para os pontos no interior de algum polígono (teste do raio, vetorizado)."""
+        pontos = np.asarray(pontos, dtype=np.float64).reshape(-1, 2)
+        dentro = np.zeros(len(pontos), dtype=bool)
+        for vertices in self.poligonos:
+            a = vertices[None, :, :]
+            b = np.roll(vertices, -1, axis=0)[None, :, :]
+            x, y = pontos[:, 0, None], pontos[:, 1, None]
+            cruza = (a[..., 1] > y) != (b[..., 1] > y)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_corte = a[..., 0] + (y - a[..., 1]) * (b[..., 0] - a[..., 0]) / (b[..., 1] - a[..., 1])
+            dentro ^= (np.count_nonzero(cruza & (x < x_corte), axis=1) % 2).astype(bool)
+        return dentro
+
+    def _atravessa(self, p, q):
+        # Segmento que só toca os polígonos (em vértices ou ao longo de bordas): os pontos de contato o
+        # dividem em trechos, e ele atravessa uma zona se o meio de algum trecho estiver dentro dela
+        segmento = q - p
+        comprimento = float(segmento @ segmento)
+        if comprimento == 0.0:
+            return False
+        vertices = self.inicio_arestas
+        tolerancia = 1e-9 * comprimento
+        no_segmento = np.abs(_produto_vetorial(segmento, vertices - p)) <= tolerancia
+        t = (vertices[no_segmento] - p) @ segmento / comprimento
+        cortes = np.unique(np.concatenate([[0.0, 1.0], t[(t > 0.0) & (t < 1.0)]]))
+        meios = p + ((cortes[:-1] + cortes[1:]) / 2)[:, None] * segmento
+        # Trechos sobre uma borda (voo rente à zona) não contam como travessia
+        a, aresta = self.inicio_arestas, self.fim_arestas - self.inicio_arestas
+        relativo = meios[:, None, :] - a[None, :, :]
+        u = np.clip((relativo * aresta).sum(axis=2) / np.maximum((aresta * aresta).sum(axis=1), 1e-300), 0.0, 1.0)
+        afastamento = relativo - u[..., None] * aresta
+        na_borda = ((afastamento * afastamento).sum(axis=2) <= tolerancia).any(axis=1)
+        return bool((self.dentro(meios) & ~na_borda).any())
+
+    def visiveis(self, origens, destinos):
+        """
+        Matriz booleana m x c: True quando o segmento de origens[i] a
+        destinos[j] não passa pelo interior de nenhum obstáculo. Cruzamentos
+        próprios com uma aresta bloqueiam direto; segmentos que apenas tocam
+        vértices ou bordas (comuns com coordenadas inteiras e zonas alinhadas
+        aos eixos) são conferidos pelos pontos médios entre os contatos.
+        Calculada em blocos de origens para limitar a memória.
+        """
+        origens = np.asarray(origens, dtype=np.float64).reshape(-1, 2)
+        destinos = np.asarray(destinos, dtype=np.float64).reshape(-1, 2)
+        resultado = np.ones((len(origens), len(destinos)), dtype=bool)
+        if len(self.inicio_arestas) == 0:
+            return resultado
+        a, b = self.inicio_arestas, self.fim_arestas
+        aresta = b - a
+        linhas = max(1, _ELEMENTOS_BLOCO // max(1, len(destinos) * len(a)))
+        q = destinos[None, :, None, :]
+        for inicio in range(0, len(origens), linhas):
+            p = origens[inicio:inicio + linhas, None, None, :]
+            segmento = q - p
+            lado_p = _produto_vetorial(aresta, p - a)
+            lado_q = _produto_vetorial(aresta, q - a)
+            lado_a = _produto_vetorial(segmento, a - p)
+            lado_b = _produto_vetorial(segmento, b - p)
+            cruza = ((lado_p * lado_q < 0) & (lado_a * lado_b < 0)).any(axis=2)
+            toca = ((lado_p * lado_q <= 0) & (lado_a * lado_b <= 0)).any(axis=2) & ~cruza
+            resultado[inicio:inicio + linhas] = ~cruza
+            for i, j in zip(*np.nonzero(toca)):
+                if self._atravessa(origens[inicio + i], destinos[j]):
+                    resultado[inicio + i, j] = False
+        return resultado
+
+    def chave(self):
+        """SHA-256 dos polígonos e da margem, que identifica o conjunto de obstáculos no cache."""
+        resumo = hashlib.sha256(np.float64(self.margem).tobytes())
+        for vertices in self.poligonos:
+            resumo.update(np.int64(len(vertices)).tobytes())
+            resumo.update(np.ascontiguousarray(vertices).tobytes())
+        return resumo.hexdigest()
+
+def _custos_diretos(origens, destinos, visiveis):
+    distancias = np.hypot(origens[:, 0, None] - destinos[None, :, 0], origens[:, 1, None] - destinos[None, :, 1])
+    return np.where(visiveis, distancias, np.inf)
+
+def dijkstra_denso(pesos, inicial):
+    """
+    Dijkstra sobre um grafo denso dado por matriz de pesos (inf = sem
+    aresta), com seleção do próximo nó por argmin vetorizado: O(V^2) em
+    NumPy, mais rápido que o heap quando quase todo par de nós se enxerga.
+
+    Args:
+        pesos (np.ndarray): Matriz V x V
+        inicial (np.ndarray): Distância inicial de cada nó (inf para os não alcançados)
+
+    Returns:
+        tuple: (distâncias, antecessor de cada nó; -1 para os que saem direto da origem)
+    """
+    distancia = inicial.astype(np.float64).copy()
+    antecessor = np.full(len(distancia), -1, dtype=np.int32)
+    fechado = np.zeros(len(distancia), dtype=bool)
+    for _ in range(len(distancia)):
+        abertas = np.where(fechado, np.inf, distancia)
+        v = int(np.argmin(abertas))
+        if not np.isfinite(abertas[v]):
+            break
+        fechado[v] = True
+        candidatas = distancia[v] + pesos[v]
+        melhora = (candidatas < distancia) & ~fechado
+        distancia[melhora] = candidatas[melhora]
+        antecessor[melhora] = v
+    return distancia, antecessor
+
+# Grafo de visibilidade de cada processo do pool, definido uma única vez pelo inicializador
+_TRABALHADOR = {}
+
+def _inicializar_trabalhador(pesos_nos, cidade_no, cidade_cidade):
+    _TRABALHADOR['pesos_nos'] = pesos_nos
+    _TRABALHADOR['cidade_no'] = cidade_no
+    _TRABALHADOR['cidade_cidade'] = cidade_cidade
+
+def _caminhos_de(origens):
+    # Dijkstra a partir de cada cidade: ela entra no grafo dos vértices pelas arestas que enxerga
+    pesos_nos = _TRABALHADOR['pesos_nos']
+    cidade_no = _TRABALHADOR['cidade_no']
+    cidade_cidade = _TRABALHADOR['cidade_cidade']
+    custos, antecessores, ultimos = [], [], []
+    for origem in origens:
+        distancia, antecessor = dijkstra_denso(pesos_nos, cidade_no[origem])
+        # Chegada a cada cidade: direto ou pelo melhor último vértice
+        via = distancia[:, None] + cidade_no.T
+        ultimo = np.argmin(via, axis=0).astype(np.int32) if len(distancia) else \
+            np.full(len(cidade_cidade), -1, dtype=np.int32)
+        custo_via = via[ultimo, np.arange(len(cidade_cidade))] if len(distancia) else np.inf
+        direto = cidade_cidade[origem]
+        usa_direto = direto <= custo_via
+        custo = np.where(usa_direto, direto, custo_via)
+        ultimo[usa_direto] = -1
+        custo[origem] = 0.0
+        ultimo[origem] = -1
+        custos.append(custo)
+        antecessores.append(antecessor)
+        ultimos.append(ultimo)
+    return np.array(custos), np.array(antecessores).reshape(len(origens), -1), np.array(ultimos)
+
+class CustosObstaculos:
+    """
+    Custos de voo entre as cidades contornando os obstáculos, com a
+    geometria dos caminhos. `matriz` serve para qualquer solver no lugar da
+    matriz euclidiana.
+
+    Attributes:
+        matriz (np.ndarray): Comprimento do caminho mínimo entre cada par
+        nos (np.ndarray): Coordenadas dos vértices do grafo de visibilidade
+        antecessores (np.ndarray): Para cada cidade de origem, o vértice
+            anterior a cada vértice no caminho mínimo (-1: sai da origem)
+        ultimos (np.ndarray): Para cada par, o último vértice antes do
+            destino (-1: segmento direto)
+    """
+    def __init__(self, cidades, matriz, nos, antecessores, ultimos):
+        self.cidades = np.asarray(cidades, dtype=np.float64)[:, :2]
+        self.matriz = matriz
+        self.nos = nos
+        self.antecessores = antecessores
+        self.ultimos = ultimos
+
+    def caminho(self, i, j):
+        """
+        Pontos do caminho de voo da cidade i até a cidade j.
+
+        Returns:
+            list: Tuplas (x, y), começando em i e terminando em j
+        """
+        vertices = []
+        v = int(self.ultimos[i, j])
+        while v >= 0:
+            vertices.append(v)
+            v = int(self.antecessores[i, v])
+        pontos = [tuple(self.cidades[i])] + [tuple(self.nos[v]) for v in reversed(vertices)]
+        return pontos + [tuple(self.cidades[j])]
+
+    def geometria(self, percurso):
+        """Linha poligonal completa de um percurso fechado, para desenhar a rota voada."""
+        pontos = []
+        for a, b in zip(percurso, list(percurso[1:]) + list(percurso[:1])):
+            pontos.extend(self.caminho(a, b)[:-1])
+        return pontos + pontos[:1]
+
+class CacheObstaculos(CacheInstancias):
+    """
+    Cache em disco dos custos com obstáculos. Cada conjunto de obstáculos
+    tem um diretório (pelo hash dos polígonos e da margem) e, dentro dele,
+    um arquivo .npz por conjunto de cidades; o despejo das entradas menos
+    usadas é o mesmo de CacheInstancias.
+    """
+    def __init__(self, diretorio=None, tamanho_maximo=TAMANHO_MAXIMO_CACHE):
+        super().__init__(diretorio or os.path.join(DIRETORIO_CACHE, 'obstaculos'), tamanho_maximo)
+
+    def _arquivo(self, mapa, cidades):
+        chave_cidades = hashlib.sha256(np.ascontiguousarray(cidades, dtype=np.float64).tobytes()).hexdigest()
+        entrada = self._diretorio_entrada(mapa.chave())
+        return entrada, os.path.join(entrada, f'custos_{chave_cidades[:32]}.npz')
+
+    def carregar(self, mapa, cidades):
+        entrada, arquivo = self._arquivo(mapa, cidades)
+        if not os.path.exists(arquivo):
+            return None
+        self._marcar_uso(entrada)
+        with np.load(arquivo) as dados:
+            return CustosObstaculos(cidades, dados['matriz'], dados['nos'], dados['antecessores'], dados['ultimos'])
+
+    def salvar(self, mapa, custos):
+        entrada, arquivo = self._arquivo(mapa, custos.cidades)
+        os.makedirs(entrada, exist_ok=True)
+        temporario = arquivo + '.tmp'
+        with open(temporario, 'wb') as saida:
+            np.savez(saida, matriz=custos.matriz, nos=custos.nos, antecessores=custos.antecessores,
+                     ultimos=custos.ultimos)
+        os.replace(temporario, arquivo)
+        self._despejar(manter=entrada)
+
+def custos_com_obstaculos(cidades, obstaculos, margem=None, processos=None, cache=True, instrumentacao=None):
+    """
+    Pré-calcula os custos de voo entre todas as cidades contornando as
+    zonas proibidas:
+
+    1. Grafo de visibilidade entre os vértices convexos (afastados pela
+       margem) e entre cada cidade e esses vértices
+    2. Um Dijkstra por cidade de origem, distribuídos num pool de
+       processos que recebe o grafo uma única vez pelo inicializador
+    3. Matriz de custos e geometria dos caminhos salvas no cache em disco,
+       indexado pelo conjunto de obstáculos (e pelas cidades)
+
+    Args:
+        cidades (list): Coordenadas (x, y) das cidades
+        obstaculos (list ou MapaObstaculos): Polígonos das zonas proibidas
+        margem (float, opcional): Distância de segurança (ver MapaObstaculos)
+        processos (int, opcional): Processos do pool (padrão: número de
+            CPUs; 1 calcula no processo atual)
+        cache (bool ou CacheObstaculos): Usa o cache padrão, um cache dado
+            ou nenhum (False)
+        instrumentacao (Instrumentacao, opcional): Cronômetros e eventos
+
+    Returns:
+        CustosObstaculos: Matriz de custos e caminhos
+    """
+    instrumentacao = instrumentacao_padrao(instrumentacao)
+    inicio = time.perf_counter()
+    mapa = obstaculos if isinstance(obstaculos, MapaObstaculos) else MapaObstaculos(obstaculos, margem)
+    coordenadas = np.asarray(cidades, dtype=np.float64)[:, :2]
+    if cache is True:
+        cache = CacheObstaculos()
+    if cache:
+        custos = cache.carregar(mapa, coordenadas)
+        if custos is not None:
+            instrumentacao.contar('cache_obstaculos')
+            return custos
+
+    dentro = mapa.dentro(coordenadas)
+    if dentro.any():
+        raise ValueError(f"A cidade {int(np.argmax(dentro))} está dentro de uma zona proibida")
+
+    with instrumentacao.fase('visibilidade'):
+        nos = mapa.nos
+        pesos_nos = _custos_diretos(nos, nos, mapa.visiveis(nos, nos))
+        np.fill_diagonal(pesos_nos, np.inf)
+        cidade_no = _custos_diretos(coordenadas, nos, mapa.visiveis(coordenadas, nos))
+        cidade_cidade = _custos_diretos(coordenadas, coordenadas, mapa.visiveis(coordenadas, coordenadas))
+
+    with instrumentacao.fase('dijkstra'):
+        n = len(coordenadas)
+        processos = processos or os.cpu_count() or 1
+        lotes = np.array_split(np.arange(n), max(1, min(n, 4 * processos)))
+        if processos == 1:
+            _inicializar_trabalhador(pesos_nos, cidade_no, cidade_cidade)
+            resultados = [_caminhos_de(lote) for lote in lotes]
+        else:
+            with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_trabalhador,
+                                     initargs=(pesos_nos, cidade_no, cidade_cidade)) as executor:
+                resultados = list(executor.map(_caminhos_de, lotes))
+        matriz = np.concatenate([custos for custos, _, _ in resultados])
+        antecessores = np.concatenate([antecessor for _, antecessor, _ in resultados])
+        ultimos = np.concatenate([ultimo for _, _, ultimo in resultados])
+    if np.isinf(matriz).any():
+        raise ValueError("Há cidades isoladas pelos obstáculos")
+
+    custos = CustosObstaculos(coordenadas, matriz, nos, antecessores, ultimos)
+    if cache:
+        cache.salvar(mapa, custos)
+    if instrumentacao.emitindo:
+        instrumentacao.emitir('obstaculos.fim', cidades=n, vertices=len(nos), tempo=time.perf_counter() - inicio)
+    return custos
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+    from alg_guloso import gerar_cidades_aleatorias
+    from alg_ils import resolver_caixeiro_viajante_ils
+
+    obstaculos = [
+        [(20, 20), (45, 20), (45, 30), (30, 30), (30, 60), (20, 60)],
+        [(60, 50), (80, 40), (85, 70), (65, 75)],
+        [(40, 75), (55, 85), (45, 95)],
+    ]
+    mapa = MapaObstaculos(obstaculos, margem=0.5)
+    cidades = [c for c in gerar_cidades_aleatorias(120, 0, 100) if not mapa.dentro(c)[0]]
+    custos = custos_com_obstaculos(cidades, mapa, cache=False)
+    percurso, distancia = resolver_caixeiro_viajante_ils(cidades, custos.matriz, tempo_limite=3.0, semente=0)
+
+    for poligono in obstaculos:
+        plt.fill(*zip(*poligono), color='gray', alpha=0.5)
+    plt.plot(*zip(*custos.geometria(percurso)), 'r-')
+    plt.scatter(*zip(*cidades), s=15)
+    plt.title(f'Rota contornando zonas proibidas - Custo: {distancia:.2f}')
+    plt.show()
@@ -0,0 +1,283 @@
+import math
+import numpy as np
+
+class Percurso:
+    """
+    Percurso cíclico guardado em dois arrays: a ordem de visita e a posição
+    de cada cidade nessa ordem. Próximo, anterior e "b está entre a e c"
+    custam O(1); a inversão de um trecho inverte sempre o lado mais curto
+    do ciclo.
+
+    Args:
+        ordem (list): Índices das cidades na ordem de visita
+        sentido_fixo (bool): Inverte sempre o trecho pedido, nunca o
+            complemento, para que o sentido de percurso se mantenha (custos
+            assimétricos)
+    """
+    def __init__(self, ordem, sentido_fixo=False):
+        self.ordem = np.array(ordem, dtype=np.int64)
+        self.n = len(self.ordem)
+        self.sentido_fixo = sentido_fixo
+        self.posicao = np.empty(self.n, dtype=np.int64)
+        self.posicao[self.ordem] = np.arange(self.n)
+
+    def __len__(self):
+        return self.n
+
+    def proximo(self, cidade):
+        p = self.posicao[cidade] + 1
+        return int(self.ordem[p if p < self.n else 0])
+
+    def anterior(self, cidade):
+        return int(self.ordem[self.posicao[cidade] - 1])
+
+    def entre(self, a, b, c):
+        """
+        True se, partindo de a no sentido do percurso, b é visitado antes
+        (ou junto) de c.
+        """
+        pa, pb, pc = self.posicao[a], self.posicao[b], self.posicao[c]
+        if pa <= pc:
+            return pa <= pb <= pc
+        return pb >= pa or pb <= pc
+
+    def inverter(self, a, b):
+        """
+        Inverte o trecho que vai de a até b no sentido do percurso. Quando o
+        trecho passa da metade do ciclo, inverte o complemento, que resulta
+        no mesmo ciclo percorrido no sentido oposto (exceto com sentido_fixo).
+        """
+        n = self.n
+        i = int(self.posicao[a])
+        j = int(self.posicao[b])
+        tamanho = (j - i) % n + 1
+        if 2 * tamanho > n and not self.sentido_fixo:
+            i, j = (j + 1) % n, (i - 1) % n
+            tamanho = n - tamanho
+        if tamanho < 2:
+            return
+        if i <= j:
+            trecho = self.ordem[i:j + 1][::-1].copy()
+            self.ordem[i:j + 1] = trecho
+            self.posicao[trecho] = np.arange(i, j + 1)
+        else:
+            indices = (i + np.arange(tamanho)) % n
+            trecho = self.ordem[indices[::-1]]
+            self.ordem[indices] = trecho
+            self.posicao[trecho] = indices
+
+    def mover_2opt(self, a, b, c, d):
+        """
+        Troca as arestas (a, b) e (c, d) pelas arestas (a, c) e (b, d). As
+        quatro cidades aparecem na ordem cíclica a, b, ..., c, d em um dos
+        dois sentidos do percurso.
+        """
+        if self.proximo(a) == b:
+            self.inverter(b, c)
+        else:
+            self.inverter(a, d)
+
+    def trocar(self, a, b):
+        """
+        Troca as posições das cidades a e b.
+        """
+        pa, pb = self.posicao[a], self.posicao[b]
+        self.ordem[pa], self.ordem[pb] = b, a
+        self.posicao[a], self.posicao[b] = pb, pa
+
+    def como_lista(self):
+        return self.ordem.tolist()
+
+    def copia(self):
+        copia = Percurso.__new__(Percurso)
+        copia.ordem = self.ordem.copy()
+        copia.posicao = self.posicao.copy()
+        copia.n = self.n
+        copia.sentido_fixo = self.sentido_fixo
+        return copia
+
+class PercursoDoisNiveis:
+    """
+    Lista de dois níveis para percursos muito grandes: as cidades ficam em
+    cerca de sqrt(n) blocos, cada um com um bit de inversão. Inverter um
+    trecho parte no máximo dois blocos e inverte a ordem dos blocos
+    intermediários só trocando seus bits, em O(sqrt(n)) amortizado em vez
+    de O(n). Tem a mesma interface de Percurso.
+
+    Args:
+        ordem (list): Índices das cidades na ordem de visita
+    """
+    class _Bloco:
+        __slots__ = ('cidades', 'invertido', 'ordinal')
+
+        def __init__(self, cidades, ordinal):
+            self.cidades = cidades
+            self.invertido = False
+            self.ordinal = ordinal
+
+    def __init__(self, ordem):
+        ordem = [int(c) for c in ordem]
+        self.n = len(ordem)
+        self.tamanho_bloco = max(8, int(math.sqrt(self.n)))
+        self.bloco_de = [None] * self.n
+        self.indice = [0] * self.n
+        self._reconstruir(ordem)
+
+    def __len__(self):
+        return self.n
+
+    def _reconstruir(self, ordem):
+        passo = self.tamanho_bloco
+        self.blocos = []
+        for inicio in range(0, self.n, passo):
+            bloco = self._Bloco(ordem[inicio:inicio + passo], len(self.blocos))
+            self.blocos.append(bloco)
+            self._reindexar(bloco)
+
+    def _reindexar(self, bloco):
+        for k, cidade in enumerate(bloco.cidades):
+            self.bloco_de[cidade] = bloco
+            self.indice[cidade] = k
+
+    def _posicao_no_bloco(self, cidade):
+        bloco = self.bloco_de[cidade]
+        k = self.indice[cidade]
+        return len(bloco.cidades) - 1 - k if bloco.invertido else k
+
+    def _cidade_no_bloco(self, bloco, k):
+        return bloco.cidades[len(bloco.cidades) - 1 - k if bloco.invertido else k]
+
+    def proximo(self, cidade):
+        bloco = self.bloco_de[cidade]
+        k = self._posicao_no_bloco(cidade)
+        if k + 1 < len(bloco.cidades):
+            return self._cidade_no_bloco(bloco, k + 1)
+        seguinte = self.blocos[(bloco.ordinal + 1) % len(self.blocos)]
+        return self._cidade_no_bloco(seguinte, 0)
+
+    def anterior(self, cidade):
+        bloco = self.bloco_de[cidade]
+        k = self._posicao_no_bloco(cidade)
+        if k > 0:
+            return self._cidade_no_bloco(bloco, k - 1)
+        anterior = self.blocos[bloco.ordinal - 1]
+        return self._cidade_no_bloco(anterior, len(anterior.cidades) - 1)
+
+    def _chave(self, cidade):
+        return (self.bloco_de[cidade].ordinal, self._posicao_no_bloco(cidade))
+
+    def entre(self, a, b, c):
+        pa, pb, pc = self._chave(a), self._chave(b), self._chave(c)
+        if pa <= pc:
+            return pa <= pb <= pc
+        return pb >= pa or pb <= pc
+
+    def _normalizar(self, bloco):
+        # Desfaz o bit de inversão reescrevendo a lista do bloco
+        if bloco.invertido:
+            bloco.cidades.reverse()
+            bloco.invertido = False
+            self._reindexar(bloco)
+
+    def _dividir_antes(self, cidade):
+        """
+        Garante que a cidade seja a primeira do seu bloco no sentido do percurso.
+        """
+        bloco = self.bloco_de[cidade]
+        self._normalizar(bloco)
+        k = self.indice[cidade]
+        if k == 0:
+            return
+        novo = self._Bloco(bloco.cidades[k:], bloco.ordinal + 1)
+        del bloco.cidades[k:]
+        self.blocos.insert(bloco.ordinal + 1, novo)
+        self._reindexar(novo)
+        for ordinal in range(bloco.ordinal + 2, len(self.blocos)):
+            self.blocos[ordinal].ordinal = ordinal
+
+    def inverter(self, a, b):
+        """
+        Inverte o trecho que vai de a até b no sentido do percurso.
+        """
+        bloco_a, bloco_b = self.bloco_de[a], self.bloco_de[b]
+        ka, kb = self._posicao_no_bloco(a), self._posicao_no_bloco(b)
+
+        # Trecho dentro de um único bloco: inversão direta na lista do bloco
+        if bloco_a is bloco_b and ka <= kb:
+            self._normalizar(bloco_a)
+            i, j = self.indice[a], self.indice[b]
+            bloco_a.cidades[i:j + 1] = bloco_a.cidades[i:j + 1][::-1]
+            for k in range(i, j + 1):
+                self.indice[bloco_a.cidades[k]] = k
+            return
+
+        depois_de_b = self.proximo(b)
+        if depois_de_b == a:
+            # O trecho é o ciclo inteiro
+            return
+        self._dividir_antes(a)
+        self._dividir_antes(depois_de_b)
+
+        primeiro = self.bloco_de[a].ordinal
+        ultimo = self.bloco_de[b].ordinal
+        total = len(self.blocos)
+        quantidade = (ultimo - primeiro) % total + 1
+        # Inverter o complemento dá o mesmo ciclo e evita a volta pelo fim da lista
+        if primeiro > ultimo or 2 * quantidade > total:
+            primeiro = self.bloco_de[depois_de_b].ordinal
+            ultimo = self.bloco_de[self.anterior(a)].ordinal
+            if primeiro > ultimo:
+                # O complemento também dá a volta: gira a lista de blocos
+                self.blocos = self.blocos[primeiro:] + self.blocos[:primeiro]
+                for ordinal, bloco in enumerate(self.blocos):
+                    bloco.ordinal = ordinal
+                ultimo = (ultimo - primeiro) % total
+                primeiro = 0
+
+        trecho = self.blocos[primeiro:ultimo + 1]
+        trecho.reverse()
+        for deslocamento, bloco in enumerate(trecho):
+            bloco.invertido = not bloco.invertido
+            bloco.ordinal = primeiro + deslocamento
+        self.blocos[primeiro:ultimo + 1] = trecho
+
+        # Muitas divisões deixam blocos pequenos demais: reequilibra
+        if len(self.blocos) > 2 * (self.n // self.tamanho_bloco + 1):
+            self._reconstruir(self.como_lista())
+
+    def mover_2opt(self, a, b, c, d):
+        if self.proximo(a) == b:
+            self.inverter(b, c)
+        else:
+            self.inverter(a, d)
+
+    def trocar(self, a, b):
+        bloco_a, bloco_b = self.bloco_de[a], self.bloco_de[b]
+        ia, ib = self.indice[a], self.indice[b]
+        bloco_a.cidades[ia], bloco_b.cidades[ib] = b, a
+        self.bloco_de[a], self.bloco_de[b] = bloco_b, bloco_a
+        self.indice[a], self.indice[b] = ib, ia
+
+    def como_lista(self):
+        ordem = []
+        for bloco in self.blocos:
+            ordem.extend(reversed(bloco.cidades) if bloco.invertido else bloco.cidades)
+        return ordem
+
+    def copia(self):
+        return PercursoDoisNiveis(self.como_lista())
+
+def criar_percurso(ordem, limite_dois_niveis=50000):
+    """
+    Escolhe a representação do percurso pelo tamanho da instância.
+
+    Args:
+        ordem (list): Índices das cidades na ordem de visita
+        limite_dois_niveis (int): A partir deste n usa a lista de dois níveis
+
+    Returns:
+        Percurso ou PercursoDoisNiveis
+    """
+    if len(ordem) >= limite_dois_niveis:
+        return PercursoDoisNiveis(ordem)
+    return Percurso(ordem)
@@ -0,0 +1,275 @@
+import numpy as np
+from instrumentacao import instrumentacao_padrao
+from distancias import custo_rota, distancias_tsplib, matriz_distancias_numpy, matriz_distancias_tsplib, \
+    matriz_simetrica
+from percurso import Percurso
+from busca_local import busca_local
+
+class _VizinhosSobDemanda:
+    """
+    Listas de candidatos da busca local calculadas só para as cidades que a
+    busca de fato examina, a partir da linha da matriz. Toda inserção ou
+    remoção invalida o cache, já que a cidade nova pode entrar na lista de
+    qualquer outra.
+    """
+    def __init__(self, rota, k):
+        self.rota = rota
+        self.k = k
+        self._listas = {}
+
+    def __getitem__(self, a):
+        lista = self._listas.get(a)
+        if lista is None:
+            m = self.rota.tamanho
+            linha = self.rota._matriz[a, :m].copy()
+            linha[a] = np.inf
+            k = min(self.k, m - 1)
+            escolhidos = np.argpartition(linha, k - 1)[:k]
+            lista = escolhidos[np.argsort(linha[escolhidos], kind='stable')].tolist()
+            self._listas[a] = lista
+        return lista
+
+    def limpar(self):
+        self._listas.clear()
+
+class RotaDinamica:
+    """
+    Rota já planejada que aceita entregas novas e cancelamentos sem
+    recomeçar do zero. Cada ponto entra pela inserção mais barata e sai
+    ligando os dois vizinhos; depois uma busca local 2-opt + Or-opt começa
+    apenas nas cidades afetadas e nos vizinhos mais próximos delas.
+
+    A matriz de custos tem folga para novas cidades: uma entrega nova custa
+    uma linha de distâncias (O(n)) e um cancelamento move a última cidade
+    para a posição liberada, mantendo os índices internos contíguos. Os
+    pontos são identificados por ids estáveis: os índices originais das
+    cidades e, para as entregas novas, o id devolvido por inserir.
+
+    Args:
+        cidades (array): Coordenadas (x, y) das cidades da rota atual
+        percurso (list): Rota atual (índices de cidades)
+        matriz_distancias (np.ndarray, opcional): Matriz já calculada e
+            simétrica (as distâncias dos pontos novos valem nos dois sentidos)
+        tipo_aresta (str, opcional): EDGE_WEIGHT_TYPE da TSPLIB para as
+            distâncias novas; por padrão euclidiana sem arredondamento
+        k (int): Tamanho das listas de vizinhos da busca local
+        instrumentacao (Instrumentacao, opcional): Cronômetros e eventos
+    """
+    def __init__(self, cidades, percurso, matriz_distancias=None, tipo_aresta=None, k=10, instrumentacao=None):
+        coordenadas = np.asarray(cidades, dtype=np.float64)[:, :2]
+        n = len(coordenadas)
+        self.tipo_aresta = tipo_aresta
+        self.k = k
+        self.instrumentacao = instrumentacao_padrao(instrumentacao)
+        if matriz_distancias is None:
+            if tipo_aresta is None:
+                matriz_distancias = matriz_distancias_numpy(coordenadas)
+            else:
+                matriz_distancias = matriz_distancias_tsplib(coordenadas, tipo_aresta, 'float64')
+        # Os pontos novos ganham uma única linha de distâncias, e a busca local supõe c(a, b) == c(b, a)
+        elif not matriz_simetrica(matriz_distancias):
+            raise ValueError("RotaDinamica supõe custos simétricos (sem vento ou custos assimétricos)")
+
+        capacidade = n + max(16, n // 4)
+        self._coordenadas = np.zeros((capacidade, 2))
+        self._coordenadas[:n] = coordenadas
+        self._matriz = np.zeros((capacidade, capacidade))
+        self._matriz[:n, :n] = np.asarray(matriz_distancias, dtype=np.float64)
+        self.tamanho = n
+        self._ids = list(range(n))
+        self._posicoes = {i: i for i in range(n)}
+        self._proximo_id = n
+        self._ordem = [int(cidade) for cidade in percurso]
+        self.custo = custo_rota(self._ordem, self.matriz)
+        self.vizinhos = _VizinhosSobDemanda(self, k)
+
+    @property
+    def matriz(self):
+        """Visão n x n da matriz de custos das cidades atuais (sem cópia)."""
+        return self._matriz[:self.tamanho, :self.tamanho]
+
+    def rota(self):
+        """Rota atual como lista de ids."""
+        return [self._ids[i] for i in self._ordem]
+
+    def coordenada(self, identificador):
+        return tuple(self._coordenadas[self._posicoes[identificador]])
+
+    def _crescer(self):
+        # Realoca com 50% de folga; o custo amortizado por inserção continua O(n)
+        m = self.tamanho
+        capacidade = m + max(16, m // 2)
+        matriz = np.zeros((capacidade, capacidade))
+        matriz[:m, :m] = self._matriz[:m, :m]
+        coordenadas = np.zeros((capacidade, 2))
+        coordenadas[:m] = self._coordenadas[:m]
+        self._matriz = matriz
+        self._coordenadas = coordenadas
+
+    def _linha_nova(self, coordenada):
+        atuais = self._coordenadas[:self.tamanho]
+        if self.tipo_aresta is None:
+            return np.hypot(atuais[:, 0] - coordenada[0], atuais[:, 1] - coordenada[1])
+        return distancias_tsplib(np.asarray([coordenada]), atuais, self.tipo_aresta)[0]
+
+    def inserir(self, coordenada, reparar=True):
+        """
+        Acrescenta uma entrega na posição de inserção mais barata.
+
+        Args:
+            coordenada (tuple): (x, y) do ponto novo
+            reparar (bool): Roda a busca local localizada logo em seguida
+
+        Returns:
+            int: Id do ponto novo
+        """
+        with self.instrumentacao.fase('insercao'):
+            m = self.tamanho
+            if m == len(self._matriz):
+                self._crescer()
+            linha = self._linha_nova(coordenada)
+            self._matriz[m, :m] = linha
+            self._matriz[:m, m] = linha
+            self._matriz[m, m] = 0.0
+            self._coordenadas[m] = coordenada[:2]
+            identificador = self._proximo_id
+            self._proximo_id += 1
+            self._ids.append(identificador)
+            self._posicoes[identificador] = m
+            self.tamanho = m + 1
+
+            if len(self._ordem) < 2:
+                # Rota vazia (todas as entregas canceladas) ou com uma cidade: só há um lugar possível
+                afetadas = [identificador] + [self._ids[cidade] for cidade in self._ordem]
+                self.custo += 2 * float(linha[self._ordem[0]]) if self._ordem else 0.0
+                self._ordem.append(m)
+            else:
+                ordem = np.asarray(self._ordem)
+                seguintes = np.roll(ordem, -1)
+                acrescimos = linha[ordem] + linha[seguintes] - self._matriz[ordem, seguintes]
+                posicao = int(np.argmin(acrescimos))
+                self._ordem.insert(posicao + 1, m)
+                self.custo += float(acrescimos[posicao])
+                afetadas = [identificador, self._ids[int(ordem[posicao])], self._ids[int(seguintes[posicao])]]
+            self.vizinhos.limpar()
+        if reparar:
+            self._reparar(afetadas)
+        self.instrumentacao.contar('insercoes')
+        return identificador
+
+    def remover(self, identificador, reparar=True):
+        """
+        Retira uma entrega da rota, ligando diretamente seus dois vizinhos.
+
+        Returns:
+            tuple: Ids dos dois vizinhos que passaram a ficar ligados
+        """
+        with self.instrumentacao.fase('remocao'):
+            removida = self._posicoes.pop(identificador)
+            posicao = self._ordem.index(removida)
+            anterior = self._ordem[posicao - 1]
+            seguinte = self._ordem[(posicao + 1) % len(self._ordem)]
+            self.custo += float(self._matriz[anterior, seguinte] - self._matriz[anterior, removida]
+                                - self._matriz[removida, seguinte])
+            del self._ordem[posicao]
+            vizinhos = (self._ids[anterior], self._ids[seguinte])
+
+            # A última cidade ocupa a posição liberada
+            ultima = self.tamanho - 1
+            if removida != ultima:
+                self._matriz[removida, :ultima] = self._matriz[ultima, :ultima]
+                self._matriz[:ultima, removida] = self._matriz[:ultima, ultima]
+                self._matriz[removida, removida] = 0.0
+                self._coordenadas[removida] = self._coordenadas[ultima]
+                self._ids[removida] = self._ids[ultima]
+                self._posicoes[self._ids[removida]] = removida
+                self._ordem[self._ordem.index(ultima)] = removida
+            self._ids.pop()
+            self.tamanho = ultima
+            self.vizinhos.limpar()
+        if reparar:
+            self._reparar(vizinhos)
+        self.instrumentacao.contar('remocoes')
+        return vizinhos
+
+    def atualizar(self, inserir=(), remover=()):
+        """
+        Aplica um lote de cancelamentos e entregas novas e faz uma única
+        busca local sobre todas as cidades afetadas.
+
+        Args:
+            inserir (iterable): Coordenadas (x, y) dos pontos novos
+            remover (iterable): Ids dos pontos cancelados
+
+        Returns:
+            list: Ids dos pontos novos, na ordem de `inserir`
+        """
+        afetadas = []
+        for identificador in remover:
+            afetadas.extend(self.remover(identificador, reparar=False))
+        novos = []
+        for coordenada in inserir:
+            identificador = self.inserir(coordenada, reparar=False)
+            novos.append(identificador)
+            afetadas.append(identificador)
+        self._reparar([i for i in afetadas if i in self._posicoes])
+        return novos
+
+    def _reparar(self, afetadas):
+        """
+        Busca local 2-opt + Or-opt que começa só nas cidades afetadas e nos
+        seus vizinhos mais próximos; os "don't look bits" mantêm o resto da
+        rota parado enquanto nada muda perto dele.
+        """
+        if self.tamanho < 5:
+            return
+        ativos = set()
+        for identificador in afetadas:
+            cidade = self._posicoes[identificador]
+            ativos.add(cidade)
+            ativos.update(self.vizinhos[cidade])
+        with self.instrumentacao.fase('busca_local'):
+            percurso = Percurso(self._ordem)
+            ganho = busca_local(percurso, self.matriz, self.vizinhos, ativos=ativos, simetrica=True)
+            self._ordem = percurso.como_lista()
+        self.custo -= ganho
+        if self.instrumentacao.emitindo:
+            self.instrumentacao.emitir('reparo.busca_local', ativos=len(ativos), ganho=ganho, custo=self.custo)
+
+def reparar_rota(cidades, percurso, inserir=(), remover=(), matriz_distancias=None, tipo_aresta=None, k=10):
+    """
+    Versão de uma chamada só de RotaDinamica.atualizar, para quem não mantém
+    a rota em memória entre um pedido e outro.
+
+    Args:
+        cidades (array): Coordenadas das cidades da rota atual
+        percurso (list): Rota atual (índices de cidades)
+        inserir (iterable): Coordenadas (x, y) das entregas novas
+        remover (iterable): Índices das cidades canceladas
+        matriz_distancias (np.ndarray, opcional): Matriz simétrica já calculada
+        tipo_aresta (str, opcional): EDGE_WEIGHT_TYPE das distâncias novas
+        k (int): Tamanho das listas de vizinhos
+
+    Returns:
+        tuple: (rota em ids, custo, ids das entregas novas); os ids das
+            cidades originais são os seus índices
+    """
+    rota = RotaDinamica(cidades, percurso, matriz_distancias, tipo_aresta, k)
+    novos = rota.atualizar(inserir, remover)
+    return rota.rota(), rota.custo, novos
+
+if __name__ == "__main__":
+    import random
+    from ler_arquivo_tsp import ler_instancia_tsp
+    from distancias import matriz_distancias_instancia
+    from alg_ils import resolver_caixeiro_viajante_ils
+
+    instancia = ler_instancia_tsp('tsp/bier127.tsp')
+    matriz = matriz_distancias_instancia(instancia, 'tsplib')
+    percurso, distancia = resolver_caixeiro_viajante_ils(instancia.cidades(), matriz, tempo_limite=2.0, semente=0)
+    rota = RotaDinamica(instancia.cidades(), percurso, matriz, tipo_aresta='EUC_2D')
+    random.seed(0)
+    xs, ys = instancia.coordenadas[:, 0], instancia.coordenadas[:, 1]
+    novos = [(random.uniform(xs.min(), xs.max()), random.uniform(ys.min(), ys.max())) for _ in range(10)]
+    rota.atualizar(inserir=novos, remover=random.sample(range(127), 10))
+    print(f"Custo antes: {distancia}, depois de 10 entregas novas e 10 cancelamentos: {rota.custo}")
@@ -0,0 +1,486 @@
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Problemas com até esta quantidade de cidades são agrupados em lotes antes de ir para o pool
+LIMITE_LOTE = 200
+TAMANHO_LOTE = 16
+ESPERA_LOTE = 0.005
+MATRIZES_POR_PROCESSO = 16
+INSTANCIAS_EM_CACHE = 64
+JANELA_LATENCIAS = 1000
+# Posições da tabela compartilhada de cancelamentos (a tarefa t usa a posição t % CANCELAMENTOS)
+CANCELAMENTOS = 4096
+
+_MOTIVOS_HTTP = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                 409: 'Conflict', 500: 'Internal Server Error', 504: 'Gateway Timeout'}
+
+class CacheLRU:
+    """
+    Dicionário com capacidade fixa que descarta a entrada usada há mais
+    tempo, contando acertos e faltas.
+    """
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._dados = OrderedDict()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave, criar):
+        if chave in self._dados:
+            self._dados.move_to_end(chave)
+            self.acertos += 1
+            return self._dados[chave]
+        self.faltas += 1
+        valor = criar()
+        self._dados[chave] = valor
+        if len(self._dados) > self.capacidade:
+            self._dados.popitem(last=False)
+        return valor
+
+    def __len__(self):
+        return len(self._dados)
+
+# --- Processos do pool -------------------------------------------------------------------------------
+
+_MATRIZES = CacheLRU(MATRIZES_POR_PROCESSO)
+_CANCELADAS = None
+
+def _aquecer(canceladas=None):
+    # Importa os solvers uma única vez por processo, antes do primeiro pedido
+    global _CANCELADAS
+    _CANCELADAS = canceladas
+    import alg_decomposicao
+    import alg_ils
+    import alg_lin_kernighan
+    import cache_instancias
+
+def _resolver_ils(coordenadas, matriz, semente, tempo_limite=1.0, **parametros):
+    from alg_ils import resolver_caixeiro_viajante_ils
+    from alg_decomposicao import _silenciosa
+    percurso, _ = resolver_caixeiro_viajante_ils(coordenadas, matriz, tempo_limite=tempo_limite, semente=semente,
+                                                 instrumentacao=_silenciosa(), **parametros)
+    return percurso
+
+def _solvers():
+    from alg_decomposicao import SOLVERS_CLUSTER
+    # O ILS do serviço para pelo tempo, que o prazo do pedido pode encurtar
+    return dict(SOLVERS_CLUSTER, ils=_resolver_ils)
+
+# Solvers cujo parâmetro tempo_limite é limitado pelo tempo que resta até o prazo
+SOLVERS_POR_TEMPO = ('ils', 'lk')
+# Tempo padrão de cada solver limitado por tempo (0: o LK não reinicia sem tempo_limite)
+TEMPO_PADRAO = {'ils': 1.0, 'lk': 0.0}
+# Solvers com criterio_parada, por onde o prazo e o cancelamento interrompem a execução
+SOLVERS_INTERROMPIVEIS = ('ils', 'lk', 'genetico', 'formigas')
+
+def _interrompida(identificador, limite):
+    if limite is not None and time.monotonic() >= limite:
+        return True
+    return _CANCELADAS is not None and _CANCELADAS[identificador % CANCELAMENTOS] == identificador
+
+def _matriz(problema):
+    chave, coordenadas, caminho, tipo = problema['chave'], problema['coordenadas'], problema['caminho'], \
+        problema['tipo']
+
+    def criar():
+        if caminho is not None:
+            from cache_instancias import carregar_matriz
+            return carregar_matriz(caminho, tipo)
+        from alg_ils import LIMITE_MATRIZ
+        from distancias import OraculoDistancias, matriz_distancias_numpy
+        if len(coordenadas) <= LIMITE_MATRIZ:
+            return matriz_distancias_numpy(coordenadas)
+        return OraculoDistancias(coordenadas)
+
+    acertos = _MATRIZES.acertos
+    matriz = _MATRIZES.obter((chave, tipo), criar)
+    return matriz, _MATRIZES.acertos > acertos
+
+def _executar_lote(problemas):
+    """
+    Executado nos processos do pool: resolve um lote de problemas em
+    sequência, reaproveitando as matrizes do cache do processo. O erro de
+    um problema não derruba os outros do lote. Problemas com prazo vencido
+    ou cancelados são pulados, e os solvers iterativos param assim que isso
+    acontece durante a execução, liberando o processo.
+    """
+    from distancias import custo_rota
+    solvers = _solvers()
+    resultados = []
+    inicio_lote = time.monotonic()
+    for problema in problemas:
+        inicio = time.perf_counter()
+        restante = problema.get('restante')
+        limite = None if restante is None else inicio_lote + restante
+        if _interrompida(problema.get('id', 0), limite):
+            resultados.append({'erro': 'Interrompida antes da execução'})
+            continue
+        try:
+            matriz, em_cache = _matriz(problema)
+            coordenadas = problema['coordenadas']
+            parametros = problema['parametros']
+            if problema['solver'] in SOLVERS_INTERROMPIVEIS:
+                parametros = dict(parametros, criterio_parada=lambda _, identificador=problema['id']:
+                                  _interrompida(identificador, limite))
+            if len(coordenadas) < 4:
+                percurso = list(range(len(coordenadas)))
+            else:
+                percurso = solvers[problema['solver']](coordenadas, matriz, problema['semente'], **parametros)
+            percurso = [int(cidade) for cidade in percurso]
+            resultados.append({'percurso': percurso, 'distancia': float(custo_rota(percurso, matriz)),
+                               'matriz_em_cache': em_cache, 'tempo_solver': time.perf_counter() - inicio})
+        except Exception as erro:
+            resultados.append({'erro': f"{type(erro).__name__}: {erro}"})
+    return resultados
+
+# --- Processo principal ------------------------------------------------------------------------------
+
+class Tarefa:
+    """Um pedido de roteamento e o seu estado: na_fila, executando, concluida, cancelada, expirada ou erro."""
+    def __init__(self, identificador, problema, prazo):
+        self.id = identificador
+        self.problema = problema
+        self.criada = time.monotonic()
+        self.prazo = None if prazo is None else self.criada + prazo
+        self.estado = 'na_fila'
+        self.resultado = None
+        self.concluida = asyncio.get_running_loop().create_future()
+
+    def restante(self):
+        return None if self.prazo is None else self.prazo - time.monotonic()
+
+    def finalizar(self, estado, resultado=None):
+        if self.concluida.done():
+            return False
+        self.estado = estado
+        self.resultado = resultado
+        self.concluida.set_result(None)
+        return True
+
+    def resposta(self):
+        resposta = {'id': self.id, 'estado': self.estado}
+        if self.resultado is not None:
+            resposta.update(self.resultado)
+        return resposta
+
+class ServicoRotas:
+    """
+    Serviço de roteamento de longa duração: recebe pedidos em HTTP/JSON
+    (localhost ou socket Unix) e os despacha para um pool de processos já
+    aquecido, que mantém as matrizes de custos em cache LRU. As instâncias
+    TSPLIB lidas ficam num segundo LRU no processo principal.
+
+    Pedidos pequenos são agrupados em lotes (até tamanho_lote pedidos ou
+    espera_lote segundos) para dividir o custo de cada ida ao pool; os que
+    têm orçamento de tempo (ILS, Lin-Kernighan com tempo_limite) vão
+    sozinhos, já que num lote rodariam em sequência enquanto outros
+    processos ficam ociosos. Cada pedido pode ter um prazo: se vencer ainda na fila, o pedido nem é
+    executado; se vencer durante a execução, a resposta é 504 e o
+    resultado é descartado. O tempo dos solvers limitados por tempo (ILS,
+    Lin-Kernighan) é encurtado para caber no prazo. A fila própria, com no
+    máximo um lote por processo em execução, é o que permite cancelar e
+    expirar pedidos antes que cheguem ao pool.
+
+    Args:
+        processos (int, opcional): Processos do pool (padrão: número de CPUs)
+        tamanho_lote (int): Máximo de pedidos pequenos por lote
+        espera_lote (float): Quanto um pedido pequeno espera por companhia
+        limite_lote (int): Maior número de cidades de um pedido agrupável
+    """
+    def __init__(self, processos=None, tamanho_lote=TAMANHO_LOTE, espera_lote=ESPERA_LOTE, limite_lote=LIMITE_LOTE):
+        self.processos = processos or os.cpu_count() or 1
+        self.tamanho_lote = tamanho_lote
+        self.espera_lote = espera_lote
+        self.limite_lote = limite_lote
+        self.instancias = CacheLRU(INSTANCIAS_EM_CACHE)
+        self.tarefas = OrderedDict()
+        self._fila = deque()
+        self._ids = itertools.count(1)
+        self._latencias = deque(maxlen=JANELA_LATENCIAS)
+        self.contadores = {'recebidas': 0, 'concluidas': 0, 'canceladas': 0, 'expiradas': 0, 'erros': 0,
+                           'lotes': 0, 'pedidos_em_lotes': 0, 'matrizes_em_cache': 0}
+        self.em_execucao = 0
+        self._pool = None
+        self._servidor = None
+
+    async def iniciar(self, host='127.0.0.1', porta=8765, caminho_socket=None):
+        # Tabela em memória compartilhada pela qual os processos enxergam os cancelamentos
+        self._canceladas = multiprocessing.Array('q', CANCELAMENTOS, lock=False)
+        self._pool = ProcessPoolExecutor(max_workers=self.processos, initializer=_aquecer,
+                                         initargs=(self._canceladas,))
+        loop = asyncio.get_running_loop()
+        # Sobe todos os processos agora, e não no primeiro pedido
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _executar_lote, []) for _ in range(self.processos)))
+        self._vagas = asyncio.Semaphore(self.processos)
+        self._novidade = asyncio.Event()
+        self._despachante = asyncio.create_task(self._despachar())
+        if caminho_socket:
+            self._servidor = await asyncio.start_unix_server(self._atender, path=caminho_socket)
+        else:
+            self._servidor = await asyncio.start_server(self._atender, host, porta)
+        return self._servidor
+
+    async def encerrar(self):
+        self._despachante.cancel()
+        self._servidor.close()
+        await self._servidor.wait_closed()
+        self._pool.shutdown(cancel_futures=True)
+
+    # --- Fila e lotes ---
+
+    def _problema(self, dados):
+        solver = dados.get('solver', 'lk')
+        if solver not in _solvers():
+            raise ValueError(f"Solver desconhecido: {solver}")
+        if 'instancia' in dados:
+            tipo = dados.get('tipo', 'tsplib')
+            caminho = dados['instancia']
+            from cache_instancias import cache_padrao
+            chave = cache_padrao().chave(caminho)
+            instancia = self.instancias.obter((chave, caminho), lambda: cache_padrao().carregar_instancia(caminho))
+            if instancia.coordenadas is None:
+                raise ValueError("Instâncias sem coordenadas não são atendidas pelo serviço")
+            coordenadas = np.asarray(instancia.coordenadas[:, :2], dtype=np.float64)
+        elif 'cidades' in dados:
+            caminho, tipo = None, 'euclidiana'
+            coordenadas = np.asarray(dados['cidades'], dtype=np.float64)
+            if coordenadas.ndim != 2 or coordenadas.shape[1] < 2 or len(coordenadas) < 1:
+                raise ValueError("'cidades' deve ser uma lista não vazia de pontos [x, y]")
+            coordenadas = coordenadas[:, :2]
+            chave = hashlib.sha256(coordenadas.tobytes()).hexdigest()
+        else:
+            raise ValueError("O pedido precisa de 'cidades' ou 'instancia'")
+        return {'chave': chave, 'coordenadas': coordenadas, 'caminho': caminho, 'tipo': tipo, 'solver': solver,
+                'parametros': dict(dados.get('parametros', {})), 'semente': dados.get('semente')}
+
+    def submeter(self, dados):
+        prazo = dados.get('prazo')
+        tarefa = Tarefa(next(self._ids), self._problema(dados), None if prazo is None else float(prazo))
+        self.tarefas[tarefa.id] = tarefa
+        # Guarda só as tarefas mais recentes para consulta posterior
+        while len(self.tarefas) > 10 * JANELA_LATENCIAS:
+            self.tarefas.popitem(last=False)
+        self._fila.append(tarefa)
+        self.contadores['recebidas'] += 1
+        self._novidade.set()
+        return tarefa
+
+    def cancelar(self, tarefa, estado='cancelada'):
+        """
+        Cancela uma tarefa. Na fila ela simplesmente sai; em execução ela é
+        marcada na tabela compartilhada, o solver para no próximo critério
+        de parada e o resultado é descartado.
+        """
+        if tarefa.estado == 'executando':
+            self._canceladas[tarefa.id % CANCELAMENTOS] = tarefa.id
+        if tarefa.finalizar(estado):
+            self.contadores['canceladas' if estado == 'cancelada' else 'expiradas'] += 1
+            if tarefa in self._fila:
+                self._fila.remove(tarefa)
+            return True
+        return False
+
+    def _agrupavel(self, tarefa):
+        # Pedidos com orçamento de tempo vão sozinhos: num lote eles rodariam um depois do outro
+        problema = tarefa.problema
+        if len(problema['coordenadas']) > self.limite_lote:
+            return False
+        if problema['solver'] in SOLVERS_POR_TEMPO:
+            return not problema['parametros'].get('tempo_limite', TEMPO_PADRAO[problema['solver']])
+        return True
+
+    def _proximo_lote(self):
+        while self._fila:
+            tarefa = self._fila[0]
+            restante = tarefa.restante()
+            if restante is not None and restante <= 0:
+                self.cancelar(tarefa, 'expirada')
+                continue
+            break
+        if not self._fila:
+            return []
+        primeira = self._fila.popleft()
+        if not self._agrupavel(primeira):
+            return [primeira]
+        lote = [primeira]
+        for tarefa in list(self._fila):
+            if len(lote) >= self.tamanho_lote:
+                break
+            if self._agrupavel(tarefa):
+                self._fila.remove(tarefa)
+                lote.append(tarefa)
+        return lote
+
+    async def _despachar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._fila:
+                self._novidade.clear()
+                await self._novidade.wait()
+                continue
+            # Pedido pequeno à frente: espera um pouco para juntar outros no mesmo lote
+            cabeca = self._fila[0]
+            if self._agrupavel(cabeca) and len(self._fila) < self.tamanho_lote:
+                espera = cabeca.criada + self.espera_lote - time.monotonic()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+            await self._vagas.acquire()
+            lote = self._proximo_lote()
+            if not lote:
+                self._vagas.release()
+                continue
+            problemas = []
+            for tarefa in lote:
+                tarefa.estado = 'executando'
+                restante = tarefa.restante()
+                problema = dict(tarefa.problema, id=tarefa.id, restante=restante)
+                if problema['solver'] in SOLVERS_POR_TEMPO and restante is not None:
+                    parametros = dict(problema['parametros'])
+                    limite = parametros.get('tempo_limite', TEMPO_PADRAO[problema['solver']])
+                    parametros['tempo_limite'] = max(0.0, min(limite, 0.8 * restante))
+                    problema['parametros'] = parametros
+                problemas.append(problema)
+            if len(lote) > 1:
+                self.contadores['lotes'] += 1
+                self.contadores['pedidos_em_lotes'] += len(lote)
+            self.em_execucao += len(lote)
+            futuro = loop.run_in_executor(self._pool, _executar_lote, problemas)
+            futuro.add_done_callback(lambda futuro, lote=lote: self._concluir(lote, futuro))
+
+    def _concluir(self, lote, futuro):
+        self._vagas.release()
+        self.em_execucao -= len(lote)
+        try:
+            resultados = futuro.result()
+        except Exception as erro:
+            resultados = [{'erro': f"{type(erro).__name__}: {erro}"}] * len(lote)
+        agora = time.monotonic()
+        for tarefa, resultado in zip(lote, resultados):
+            if tarefa.concluida.done():
+                continue
+            if tarefa.prazo is not None and agora > tarefa.prazo:
+                self.cancelar(tarefa, 'expirada')
+                continue
+            if 'erro' in resultado:
+                self.contadores['erros'] += 1
+                tarefa.finalizar('erro', resultado)
+                continue
+            self.contadores['concluidas'] += 1
+            self.contadores['matrizes_em_cache'] += resultado.pop('matriz_em_cache')
+            resultado['latencia'] = agora - tarefa.criada
+            self._latencias.append(resultado['latencia'])
+            tarefa.finalizar('concluida', resultado)
+
+    def metricas(self):
+        latencias = np.array(self._latencias)
+        percentis = np.percentile(latencias, [50, 95, 99]).tolist() if len(latencias) else [None] * 3
+        return {
+            'profundidade_fila': len(self._fila),
+            'em_execucao': self.em_execucao,
+            'processos': self.processos,
+            'latencia_p50': percentis[0],
+            'latencia_p95': percentis[1],
+            'latencia_p99': percentis[2],
+            'instancias_em_cache': len(self.instancias),
+            'acertos_cache_instancias': self.instancias.acertos,
+            **self.contadores,
+        }
+
+    # --- HTTP ---
+
+    async def _esperar(self, tarefa, leitor):
+        # Espera o resultado, o prazo ou a desconexão do cliente (que cancela o pedido)
+        desconexao = asyncio.ensure_future(leitor.read(1))
+        try:
+            await asyncio.wait({tarefa.concluida, desconexao}, timeout=tarefa.restante(),
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            desconexao.cancel()
+        if not tarefa.concluida.done():
+            self.cancelar(tarefa, 'cancelada' if desconexao.done() else 'expirada')
+
+    async def _rotear(self, metodo, caminho, corpo, leitor):
+        partes = caminho.strip('/').split('/')
+        if caminho == '/metricas' and metodo == 'GET':
+            return 200, self.metricas()
+        if caminho in ('/resolver', '/tarefas') and metodo == 'POST':
+            try:
+                tarefa = self.submeter(json.loads(corpo or b'{}'))
+            except (ValueError, KeyError, TypeError, OSError) as erro:
+                return 400, {'erro': str(erro)}
+            if caminho == '/tarefas':
+                return 202, tarefa.resposta()
+            await self._esperar(tarefa, leitor)
+            return {'concluida': 200, 'expirada': 504, 'cancelada': 409, 'erro': 500}[tarefa.estado], \
+                tarefa.resposta()
+        if len(partes) == 2 and partes[0] == 'tarefas' and partes[1].isdigit():
+            tarefa = self.tarefas.get(int(partes[1]))
+            if tarefa is None:
+                return 404, {'erro': 'Tarefa desconhecida'}
+            if metodo == 'GET':
+                return 200, tarefa.resposta()
+            if metodo == 'DELETE':
+                return (200 if self.cancelar(tarefa) else 409), tarefa.resposta()
+            return 405, {'erro': 'Método não suportado'}
+        return 404, {'erro': 'Rota desconhecida'}
+
+    async def _atender(self, leitor, escritor):
+        try:
+            linha = await leitor.readline()
+            if not linha:
+                return
+            metodo, caminho, _ = linha.decode('latin-1').split(' ', 2)
+            cabecalhos = {}
+            while True:
+                linha = await leitor.readline()
+                if linha in (b'\r\n', b'\n', b''):
+                    break
+                nome, _, valor = linha.decode('latin-1').partition(':')
+                cabecalhos[nome.strip().lower()] = valor.strip()
+            corpo = await leitor.readexactly(int(cabecalhos.get('content-length', 0)))
+            status, resposta = await self._rotear(metodo, caminho, corpo, leitor)
+        except (ValueError, asyncio.IncompleteReadError) as erro:
+            status, resposta = 400, {'erro': str(erro)}
+        dados = json.dumps(resposta).encode()
+        escritor.write(f"HTTP/1.1 {status} {_MOTIVOS_HTTP[status]}\r\nContent-Type: application/json\r\n"
+                       f"Content-Length: {len(dados)}\r\nConnection: close\r\n\r\n".encode() + dados)
+        try:
+            await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+async def _executar_servico(args):
+    servico = ServicoRotas(args.processos, args.tamanho_lote, args.espera_lote)
+    servidor = await servico.iniciar(args.host, args.porta, args.socket)
+    endereco = args.socket or f"http://{args.host}:{args.porta}"
+    print(f"Serviço de rotas em {endereco} com {servico.processos} processos")
+    async with servidor:
+        await servidor.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço local de roteamento do FlyFood")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--socket', help="Caminho de um socket Unix no lugar da porta TCP")
+    parser.add_argument('--processos', type=int)
+    parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE)
+    parser.add_argument('--espera-lote', type=float, default=ESPERA_LOTE)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_executar_servico(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
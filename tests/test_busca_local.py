@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from busca_local import busca_local
+from distancias import custo_rota
+from percurso import Percurso
+
+@pytest.mark.parametrize('simetrica', [True, False])
+@pytest.mark.parametrize('semente', range(5))
+def test_ganho_da_busca_local_confere_com_custo(simetrica, semente):
+    gerador = np.random.default_rng(semente)
+    n = 60
+    coordenadas = gerador.uniform(0, 100, (n, 2))
+    matriz = np.linalg.norm(coordenadas[:, None] - coordenadas[None], axis=2)
+    if not simetrica:
+        matriz = matriz * gerador.uniform(0.5, 2.0, (n, n))
+        np.fill_diagonal(matriz, 0.0)
+    ordem = gerador.permutation(n).tolist()
+    percurso = Percurso(ordem)
+    ganho = busca_local(percurso, matriz, k=8, simetrica=simetrica)
+    final = percurso.como_lista()
+    assert sorted(final) == list(range(n))
+    assert ganho > 0
+    assert custo_rota(ordem, matriz) - custo_rota(final, matriz) == pytest.approx(ganho)
@@ -0,0 +1,44 @@
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from alg_forcabruta_lote import resolver_lote
+
+def _custo(matriz, percurso):
+    return sum(matriz[a, b] for a, b in zip(percurso, percurso[1:] + percurso[:1]))
+
+def _otimo_bruto(matriz):
+    n = len(matriz)
+    return min(_custo(matriz, [0] + list(resto)) for resto in permutations(range(1, n)))
+
+def _matrizes(gerador, b, n, simetrica):
+    coordenadas = gerador.uniform(0, 100, (b, n, 2))
+    matrizes = np.linalg.norm(coordenadas[:, :, None] - coordenadas[:, None], axis=3)
+    if not simetrica:
+        matrizes = matrizes * gerador.uniform(0.5, 2.0, (b, n, n))
+    return matrizes
+
+@pytest.mark.parametrize('metodo', ['permutacoes', 'held_karp'])
+@pytest.mark.parametrize('simetrica', [True, False])
+@pytest.mark.parametrize('n', range(2, 9))
+def test_lote_confere_com_forca_bruta(metodo, simetrica, n):
+    gerador = np.random.default_rng(n)
+    matrizes = _matrizes(gerador, 6, n, simetrica)
+    percursos, distancias = resolver_lote(matrizes, metodo)
+    for matriz, percurso, distancia in zip(matrizes, percursos.tolist(), distancias):
+        assert percurso[0] == 0
+        assert sorted(percurso) == list(range(n))
+        assert _custo(matriz, percurso) == pytest.approx(distancia)
+        assert distancia == pytest.approx(_otimo_bruto(matriz))
+
+@pytest.mark.parametrize('metodo', ['permutacoes', 'held_karp'])
+def test_sem_percurso_finito_devolve_permutacao(metodo):
+    gerador = np.random.default_rng(0)
+    matrizes = _matrizes(gerador, 2, 9, simetrica=False)
+    # Cidade 3 inalcançável na primeira instância
+    matrizes[0, :, 3] = np.inf
+    percursos, distancias = resolver_lote(matrizes, metodo)
+    assert np.isinf(distancias[0])
+    assert sorted(percursos[0].tolist()) == list(range(9))
+    assert distancias[1] == pytest.approx(_otimo_bruto(matrizes[1]))
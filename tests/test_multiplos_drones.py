@@ -0,0 +1,66 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from multiplos_drones import dividir_percurso
+
+def _custo_viagem(matriz, viagem):
+    return sum(matriz[a, b] for a, b in zip(viagem, viagem[1:] + viagem[:1]))
+
+def _divisao_bruta(sequencia, matriz, alcance, capacidade, demandas):
+    # Testa todos os 2^(m - 1) conjuntos de cortes da sequência
+    m = len(sequencia)
+    melhor = np.inf
+    for quantidade in range(m):
+        for cortes in combinations(range(1, m), quantidade):
+            limites = (0,) + cortes + (m,)
+            total = 0.0
+            for inicio, fim in zip(limites, limites[1:]):
+                viagem = [0] + sequencia[inicio:fim]
+                custo = _custo_viagem(matriz, viagem)
+                if custo > alcance or sum(demandas[c] for c in viagem[1:]) > capacidade:
+                    total = np.inf
+                    break
+                total += custo
+            melhor = min(melhor, total)
+    return melhor
+
+@pytest.mark.parametrize('semente', range(40))
+def test_divisao_otima_confere_com_forca_bruta(semente):
+    gerador = np.random.default_rng(semente)
+    n = int(gerador.integers(2, 10))
+    matriz = gerador.uniform(1, 10, (n, n))
+    # Trechos bloqueados (ex.: vento contra) entre entregas; a base sempre alcança todas
+    matriz[gerador.random((n, n)) < 0.15] = np.inf
+    matriz[0, :] = gerador.uniform(1, 10, n)
+    matriz[:, 0] = gerador.uniform(1, 10, n)
+    np.fill_diagonal(matriz, 0.0)
+    sequencia = gerador.permutation(np.arange(1, n)).tolist()
+    alcance = float(gerador.uniform(25, 60))
+    capacidade = float(gerador.integers(2, 6))
+    demandas = gerador.integers(1, 3, n).astype(float)
+    demandas[0] = 0.0
+
+    viagens, custo = dividir_percurso([0] + sequencia, matriz, alcance=alcance, capacidade=capacidade,
+                                      demandas=demandas)
+    assert custo == pytest.approx(_divisao_bruta(sequencia, matriz, alcance, capacidade, demandas))
+    assert [c for viagem in viagens for c in viagem[1:]] == sequencia
+    for viagem in viagens:
+        assert viagem[0] == 0
+        assert _custo_viagem(matriz, viagem) <= alcance + 1e-9
+        assert sum(demandas[c] for c in viagem[1:]) <= capacidade
+    assert sum(_custo_viagem(matriz, viagem) for viagem in viagens) == pytest.approx(custo)
+
+def test_trecho_infinito_forca_corte():
+    matriz = np.ones((4, 4))
+    np.fill_diagonal(matriz, 0.0)
+    matriz[1, 2] = np.inf
+    viagens, custo = dividir_percurso([0, 1, 2, 3], matriz, alcance=10)
+    assert viagens == [[0, 1], [0, 2, 3]]
+    assert custo == 5.0
+
+def test_cidade_fora_do_alcance():
+    matriz = np.array([[0.0, 1.0, 20.0], [1.0, 0.0, 1.0], [20.0, 1.0, 0.0]])
+    with pytest.raises(ValueError):
+        dividir_percurso([0, 1, 2], matriz, alcance=10)
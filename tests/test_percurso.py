@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from busca_local import mover_segmento
+from percurso import Percurso, PercursoDoisNiveis
+
+def _rotacionar(ordem, cidade):
+    i = ordem.index(cidade)
+    return ordem[i:] + ordem[:i]
+
+def _mesmo_ciclo(ordem, referencia, sentido_fixo=False):
+    # Mesma sequência cíclica; sem sentido fixo vale também o ciclo percorrido ao contrário
+    ordem = _rotacionar(list(ordem), referencia[0])
+    if ordem == referencia:
+        return True
+    return not sentido_fixo and [ordem[0]] + ordem[:0:-1] == referencia
+
+def _inverter_lista(ordem, a, b):
+    # Referência: inverte o trecho de a até b no sentido da lista cíclica
+    ordem = _rotacionar(ordem, a)
+    j = ordem.index(b)
+    return ordem[:j + 1][::-1] + ordem[j + 1:]
+
+def _mover_lista(ordem, s1, s2, x, direto):
+    ordem = _rotacionar(ordem, s1)
+    j = ordem.index(s2)
+    segmento, resto = ordem[:j + 1], ordem[j + 1:]
+    if not direto:
+        segmento = segmento[::-1]
+    i = resto.index(x)
+    return resto[:i + 1] + segmento + resto[i + 1:]
+
+def _conferir_vizinhanca(percurso, referencia):
+    n = len(referencia)
+    for i, cidade in enumerate(referencia):
+        assert percurso.proximo(cidade) == referencia[(i + 1) % n]
+        assert percurso.anterior(cidade) == referencia[i - 1]
+
+def _trecho(referencia, a, c):
+    ordem = _rotacionar(referencia, a)
+    return ordem[:ordem.index(c) + 1]
+
+ESTRUTURAS = [
+    pytest.param(lambda ordem: Percurso(ordem), False, id='percurso'),
+    pytest.param(lambda ordem: Percurso(ordem, sentido_fixo=True), True, id='percurso_sentido_fixo'),
+    pytest.param(lambda ordem: PercursoDoisNiveis(ordem), False, id='dois_niveis'),
+]
+
+@pytest.mark.parametrize('criar, sentido_fixo', ESTRUTURAS)
+@pytest.mark.parametrize('n', [5, 12, 64, 200])
+def test_inverter_confere_com_lista(criar, sentido_fixo, n):
+    gerador = random.Random(n)
+    referencia = list(range(n))
+    gerador.shuffle(referencia)
+    percurso = criar(referencia)
+    for _ in range(300):
+        a, b = gerador.sample(referencia, 2)
+        percurso.inverter(a, b)
+        referencia = _inverter_lista(referencia, a, b)
+        assert _mesmo_ciclo(percurso.como_lista(), referencia, sentido_fixo)
+        # Sem sentido fixo a estrutura pode ter invertido o complemento: acompanha o sentido dela
+        referencia = _rotacionar(percurso.como_lista(), referencia[0])
+        _conferir_vizinhanca(percurso, referencia)
+
+@pytest.mark.parametrize('criar, sentido_fixo', ESTRUTURAS)
+def test_entre_confere_com_lista(criar, sentido_fixo):
+    gerador = random.Random(1)
+    referencia = list(range(40))
+    gerador.shuffle(referencia)
+    percurso = criar(referencia)
+    for _ in range(50):
+        percurso.inverter(*gerador.sample(referencia, 2))
+    referencia = percurso.como_lista()
+    for _ in range(500):
+        a, b, c = gerador.sample(referencia, 3)
+        assert percurso.entre(a, b, c) == (b in _trecho(referencia, a, c))
+
+@pytest.mark.parametrize('criar, sentido_fixo', ESTRUTURAS)
+def test_trocar_confere_com_lista(criar, sentido_fixo):
+    gerador = random.Random(2)
+    referencia = list(range(30))
+    percurso = criar(referencia)
+    for _ in range(100):
+        a, b = gerador.sample(referencia, 2)
+        percurso.trocar(a, b)
+        i, j = referencia.index(a), referencia.index(b)
+        referencia[i], referencia[j] = b, a
+        assert _mesmo_ciclo(percurso.como_lista(), referencia, sentido_fixo)
+
+@pytest.mark.parametrize('criar, sentido_fixo', ESTRUTURAS)
+@pytest.mark.parametrize('direto', [True, False])
+def test_mover_segmento_confere_com_lista(criar, sentido_fixo, direto):
+    gerador = random.Random(3)
+    n = 25
+    referencia = list(range(n))
+    gerador.shuffle(referencia)
+    percurso = criar(referencia)
+    for _ in range(200):
+        referencia = _rotacionar(percurso.como_lista(), referencia[0])
+        inicio = gerador.randrange(n)
+        tamanho = gerador.randint(1, 4)
+        segmento = [referencia[(inicio + k) % n] for k in range(tamanho)]
+        # x fora do segmento e que não seja o anterior dele (a aresta (x, y) precisa sair do ciclo)
+        candidatos = [c for c in referencia if c not in segmento and c != percurso.anterior(segmento[0])]
+        x = gerador.choice(candidatos)
+        y = percurso.proximo(x)
+        mover_segmento(percurso, segmento[0], segmento[-1], x, y, direto)
+        esperado = _mover_lista(referencia, segmento[0], segmento[-1], x, direto)
+        assert _mesmo_ciclo(percurso.como_lista(), esperado, sentido_fixo)